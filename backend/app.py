@@ -3,7 +3,7 @@ load_dotenv()  # <-- must run before using os.getenv()
 
 import os
 import logging
-import boto3
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
@@ -24,11 +24,37 @@ origins = [
     "http://localhost:3000",
 ]   
 
+from services.health_monitor import get_s3_health_monitor
+from services.metrics import get_event_loop_monitor, get_metrics_registry
+from services.job_queue import TASK_EXECUTOR
+from services.job_worker import JOB_WORKERS, get_job_worker_pool
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Periodic S3 probe; requests only consult its cached result
+    s3_health = get_s3_health_monitor()
+    s3_health.start()
+    # Records how long the loop is blocked (event_loop_lag_seconds in /metrics)
+    loop_monitor = get_event_loop_monitor()
+    loop_monitor.start()
+    # Scoring runs in separate worker processes so extraction and SDK calls never block requests.
+    # They are started with `python -m worker`, or supervised here when JOB_WORKERS is set
+    worker_pool = None
+    if TASK_EXECUTOR == "queue" and JOB_WORKERS > 0:
+        worker_pool = get_job_worker_pool()
+        worker_pool.start()
+    yield
+    if worker_pool is not None:
+        await worker_pool.stop()
+    await loop_monitor.stop()
+    await s3_health.stop()
+
 # Create single FastAPI app instance
 app = FastAPI(
     title="AI Resume Screening Tool",
     description="AI-powered resume screening and scoring system using Gemini API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS
@@ -48,22 +74,23 @@ limiter = Limiter(key_func=get_client_ip)
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
-# Create boto3 session AFTER load_dotenv so envs exist
-session = boto3.session.Session(
-    aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-    aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
-    region_name=os.getenv("AWS_REGION")
-)
-s3 = session.client('s3')
-
 # Import and include routers after app exists
 from routers.resume_scoring_router import router as scoring_router
 app.include_router(scoring_router)
 
-# Health endpoint (accept GET and HEAD)
+# Health endpoint (accept GET and HEAD); reports cached dependency state without probing
 @app.api_route("/health", methods=["GET", "HEAD"])
 async def health():
-    return PlainTextResponse("ok")
+    s3_status = get_s3_health_monitor().status()
+    return {
+        "status": "ok" if s3_status["healthy"] is not False else "degraded",
+        "s3": s3_status
+    }
+
+# Prometheus scrape endpoint: stage/queue timings, Gemini requests and tokens, cache hits, loop lag
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(get_metrics_registry().render(), media_type="text/plain; version=0.0.4")
 
 # Root endpoint — allow GET and HEAD to avoid 405s on probes to /
 @app.api_route("/", methods=["GET", "HEAD"])
@@ -0,0 +1,144 @@
+"""Compare PDF extraction engines for speed and text yield.
+
+Extracts every PDF of a corpus with each engine, in-process and one file at a
+time, so the numbers are per-core costs without pool or network overhead.
+Without ``--corpus`` a synthetic corpus is generated. From ``backend/``:
+
+    python -m benchmarks.extraction_benchmark --corpus ~/resumes --engines pypdf2,pdfium --max-pages 5
+
+``agree`` is the mean word-level Jaccard similarity of each file's text with
+the first engine's, a quick check that a faster engine still reads the same
+words. Pick PDF_ENGINE and PDF_MAX_PAGES from the fastest acceptable row.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Must be set before the services are imported
+os.environ.setdefault("CACHE_DIR", os.path.join(tempfile.mkdtemp(prefix="extract-bench-"), "cache"))
+
+import numpy as np
+
+from benchmarks.synthetic_corpus import build_corpus
+from services.pdf_engines import PDF_MAX_PAGES, get_engine
+from services.prefilter_ranker import tokenize
+
+
+def load_corpus(directory: str) -> List[Tuple[str, bytes]]:
+    corpus = []
+    for path in sorted(glob.glob(os.path.join(os.path.expanduser(directory), "**", "*.pdf"), recursive=True)):
+        with open(path, "rb") as f:
+            corpus.append((os.path.relpath(path, directory), f.read()))
+    return corpus
+
+
+def jaccard(a: str, b: str) -> float:
+    words_a, words_b = set(tokenize(a)), set(tokenize(b))
+    if not words_a and not words_b:
+        return 1.0
+    return len(words_a & words_b) / len(words_a | words_b)
+
+
+def run_engine(name: str, corpus: List[Tuple[str, bytes]], max_pages: int, repeat: int,
+               reference: Optional[Dict[str, str]] = None) -> Tuple[Dict, Dict[str, str]]:
+    """Benchmark one engine; returns its result row and the text of each file"""
+    engine = get_engine(name)
+    texts, timings, failures, pages = {}, [], 0, 0
+    for filename, content in corpus:
+        try:
+            started = time.perf_counter()
+            for _ in range(repeat):
+                file_pages, _, _ = engine.extract(content, max_pages)
+            timings.append((time.perf_counter() - started) / repeat)
+        except Exception as e:
+            failures += 1
+            print(f"{name}: {filename} failed: {e}", file=sys.stderr)
+            continue
+        pages += len(file_pages)
+        texts[filename] = "\n".join(file_pages)
+
+    seconds = sum(timings)
+    agreement = None
+    if reference is not None:
+        shared = [filename for filename in texts if filename in reference]
+        if shared:
+            agreement = round(float(np.mean([jaccard(texts[f], reference[f]) for f in shared])), 4)
+    p50, p99 = np.percentile(timings, [50, 99]) if timings else (0.0, 0.0)
+    return {
+        "engine": name,
+        "files": len(corpus),
+        "failures": failures,
+        "pages": pages,
+        "ms_per_file_p50": round(float(p50) * 1000, 3),
+        "ms_per_file_p99": round(float(p99) * 1000, 3),
+        "pages_per_second": round(pages / seconds, 1) if seconds else None,
+        "chars": sum(len(text) for text in texts.values()),
+        "empty_files": sum(1 for text in texts.values() if not text.strip()),
+        "agreement": agreement,
+    }, texts
+
+
+def format_row(result: Dict) -> str:
+    agreement = "-" if result["agreement"] is None else f"{result['agreement']:.3f}"
+    return (
+        f"{result['engine']:>8} {result['files']:>6} {result['pages']:>6} "
+        f"{result['ms_per_file_p50']:>8.2f}/{result['ms_per_file_p99']:<8.2f} {result['pages_per_second'] or 0:>9.1f} "
+        f"{result['chars']:>10} {result['empty_files']:>6} {result['failures']:>6} {agreement:>6}"
+    )
+
+
+HEADER = (
+    f"{'engine':>8} {'files':>6} {'pages':>6} {'ms/file p50/p99':>17} {'pages/s':>9} "
+    f"{'chars':>10} {'empty':>6} {'failed':>6} {'agree':>6}"
+)
+
+
+def main(args) -> List[Dict]:
+    if args.corpus:
+        corpus = load_corpus(args.corpus)
+        if not corpus:
+            sys.exit(f"No PDF files under {args.corpus}")
+    else:
+        corpus = build_corpus(args.count, args.pages, seed=args.seed)
+
+    results, reference = [], None
+    print(HEADER)
+    for name in args.engines:
+        try:
+            result, texts = run_engine(name, corpus, args.max_pages, args.repeat, reference)
+        except (ImportError, ValueError) as e:
+            print(f"Skipping {name}: {e}", file=sys.stderr)
+            continue
+        if reference is None:
+            reference = texts
+        results.append(result)
+        print(format_row(result), flush=True)
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--engines", type=lambda value: [item for item in value.split(",") if item],
+                        default=["pypdf2", "pdfium"], help="engines to compare, comma separated; the first is the reference")
+    parser.add_argument("--corpus", help="directory of PDF files (searched recursively); default is a synthetic corpus")
+    parser.add_argument("--count", type=int, default=200, help="synthetic resumes to generate")
+    parser.add_argument("--pages", type=int, default=2, help="pages per synthetic resume")
+    parser.add_argument("--max-pages", type=int, default=PDF_MAX_PAGES, help="pages extracted per file")
+    parser.add_argument("--repeat", type=int, default=3, help="extractions per file, averaged")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the results to this file")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    benchmark_results = main(arguments)
+
+    if arguments.json:
+        with open(arguments.json, "w") as out:
+            json.dump(benchmark_results, out, indent=2)
@@ -0,0 +1,201 @@
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+
+from google.api_core import exceptions as google_exceptions
+
+from services.gemini_client import GeminiClient
+from services.rate_limiter import TokenBucketRateLimiter
+
+SKILL_VOCABULARY = [
+    "python", "java", "javascript", "typescript", "go", "rust", "c++", "sql", "aws", "azure", "gcp",
+    "docker", "kubernetes", "terraform", "react", "node.js", "django", "fastapi", "spark", "kafka",
+    "pandas", "pytorch", "tensorflow", "linux", "git", "ci/cd", "graphql", "redis", "postgresql",
+]
+
+_JOB_DESCRIPTION = re.compile(r"JOB (?:DESCRIPTION|REQUIREMENTS):\n(.*?)\n\n", re.DOTALL)
+_CANDIDATES = re.compile(r"CANDIDATES \(.*?\):\n(.*)", re.DOTALL)
+
+
+def _skills_in(text: str) -> List[str]:
+    lowered = text.lower()
+    return [skill for skill in SKILL_VOCABULARY if re.search(rf"(?<![\w+#.]){re.escape(skill)}(?![\w+#])", lowered)]
+
+
+def _stable_fraction(text: str) -> float:
+    return int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16) / 0xFFFFFFFF
+
+
+class _Part:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class _Content:
+    def __init__(self, text: str):
+        self.parts = [_Part(text)]
+
+
+class _Candidate:
+    def __init__(self, text: str):
+        self.content = _Content(text)
+
+
+class _UsageMetadata:
+    def __init__(self, prompt: str, text: str):
+        self.prompt_token_count = max(1, len(prompt) // 4)
+        self.candidates_token_count = max(1, len(text) // 4)
+        self.total_token_count = self.prompt_token_count + self.candidates_token_count
+
+
+class FakeResponse:
+    """Just the parts of a ``GenerateContentResponse`` the services read"""
+
+    def __init__(self, prompt: str, text: str):
+        self.text = text
+        self.candidates = [_Candidate(text)]
+        self.usage_metadata = _UsageMetadata(prompt, text)
+
+
+class FakeGeminiBackend:
+    """Deterministic stand-in for the Gemini API.
+
+    Answers every prompt the services send (job description profile, parse,
+    score, batched score and combined parse+score) with canned JSON derived
+    from the prompt itself, so the same resume always gets the same profile
+    and score. Latency and quota errors are simulated with a seeded RNG.
+    """
+
+    def __init__(self, latency: float = 0.5, jitter: float = 0.2, error_rate: float = 0.0,
+                 retry_after: float = 1.0, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+
+        self.calls = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def model(self, name: str) -> "FakeGenerativeModel":
+        return FakeGenerativeModel(self, name)
+
+    def generate(self, prompt: str) -> FakeResponse:
+        with self._lock:
+            self.calls += 1
+            delay = self.latency + self._random.expovariate(1 / self.jitter) if self.jitter else self.latency
+            throttled = self._random.random() < self.error_rate
+            if throttled:
+                self.errors += 1
+
+        if throttled:
+            # Quota errors come back fast, like the real API
+            time.sleep(min(delay, 0.05))
+            raise google_exceptions.ResourceExhausted(
+                f"Resource has been exhausted (simulated). Please retry in {self.retry_after}s."
+            )
+
+        time.sleep(delay)
+        return FakeResponse(prompt, json.dumps(self.answer(prompt)))
+
+    def answer(self, prompt: str) -> Dict:
+        if "requirements profile" in prompt:
+            job_description = self._job_description(prompt)
+            return {"role": job_description.strip().splitlines()[0][:80], "must_have_skills": _skills_in(job_description)}
+        if "In one pass" in prompt:
+            job_description, resume_text = self._split(prompt, "RESUME TEXT:\n")
+            return {
+                "profile": self._profile(resume_text),
+                "scores": self._score(job_description, resume_text),
+            }
+        if "CANDIDATES (" in prompt:
+            job_description = self._job_description(prompt)
+            candidates = json.loads(_CANDIDATES.search(prompt).group(1))
+            return {"results": [
+                dict(self._score(job_description, json.dumps(candidate["resume"])),
+                     candidate_id=candidate["candidate_id"])
+                for candidate in candidates
+            ]}
+        if "CANDIDATE RESUME DATA:" in prompt:
+            job_description, resume_json = self._split(prompt, "CANDIDATE RESUME DATA:\n")
+            return self._score(job_description, resume_json)
+        return self._profile(prompt.split("Resume text:", 1)[-1].split("Instructions:", 1)[0])
+
+    @staticmethod
+    def _job_description(prompt: str) -> str:
+        match = _JOB_DESCRIPTION.search(prompt)
+        return match.group(1) if match else ""
+
+    def _split(self, prompt: str, marker: str):
+        return self._job_description(prompt), prompt.split(marker, 1)[-1]
+
+    @staticmethod
+    def _profile(resume_text: str) -> Dict:
+        lines = [line.strip() for line in resume_text.strip().splitlines() if line.strip()]
+        email = re.search(r"[\w.+-]+@[\w-]+\.[\w.]+", resume_text)
+        profile = {"name": lines[0] if lines else "Unknown", "skills": _skills_in(resume_text)}
+        if email:
+            profile["email"] = email.group(0)
+        years = re.search(r"(\d+) years", resume_text)
+        if years:
+            profile["experience"] = [{"title": "Engineer", "years": int(years.group(1))}]
+        return profile
+
+    @staticmethod
+    def _score(job_description: str, resume_text: str) -> Dict:
+        wanted = set(_skills_in(job_description))
+        matched = sorted(wanted & set(_skills_in(resume_text)))
+        coverage = len(matched) / len(wanted) if wanted else 0.5
+        # A little resume-specific noise so ties are rare
+        match_score = round(min(100, 80 * coverage + 20 * _stable_fraction(resume_text)))
+        return {
+            "match_score": match_score,
+            "skill_match_score": round(100 * coverage),
+            "experience_match_score": round(100 * _stable_fraction(resume_text[::-1])),
+            "education_match_score": 70,
+            "skillset_for_role": matched,
+            "overall_fit": (
+                "perfect" if match_score >= 85 else "high" if match_score >= 65
+                else "low" if match_score >= 35 else "very low"
+            ),
+        }
+
+
+class FakeGenerativeModel:
+    def __init__(self, backend: FakeGeminiBackend, model_name: str):
+        self.backend = backend
+        self.model_name = model_name
+
+    def generate_content(self, prompt: str, generation_config=None) -> FakeResponse:
+        return self.backend.generate(prompt)
+
+
+class FakeGeminiClient(GeminiClient):
+    """GeminiClient whose models are served by a FakeGeminiBackend; no credentials needed"""
+
+    def __init__(self, backend: Optional[FakeGeminiBackend] = None, **kwargs):
+        kwargs.setdefault("api_key", "fake")
+        super().__init__(**kwargs)
+        self.backend = backend or FakeGeminiBackend()
+
+    def model(self, stage: str) -> FakeGenerativeModel:
+        return self.backend.model(self.model_name(stage))
+
+
+def install_fake_gemini(backend: Optional[FakeGeminiBackend] = None, requests_per_minute: int = 600,
+                        tokens_per_minute: Optional[int] = None, **kwargs) -> FakeGeminiClient:
+    """Make ``get_gemini_client()`` return a fake client with its own rate limiter"""
+    from services import gemini_client
+
+    client = FakeGeminiClient(
+        backend=backend,
+        rate_limiter=TokenBucketRateLimiter(requests_per_minute, tokens_per_minute),
+        **kwargs
+    )
+    gemini_client._gemini_client = client
+    return client
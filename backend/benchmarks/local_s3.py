@@ -0,0 +1,84 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Optional
+
+from botocore.exceptions import ClientError
+
+
+class LocalS3Client:
+    """Filesystem-backed stand-in for the boto3 S3 client calls S3Uploader makes.
+
+    Objects are written under ``root/<bucket>/<key>``. ``latency`` adds a fixed
+    delay per call to approximate a network round trip.
+    """
+
+    def __init__(self, root: Optional[str] = None, latency: float = 0.0):
+        self.root = root or tempfile.mkdtemp(prefix="local-s3-")
+        self.latency = latency
+        self.uploads = 0
+        self.bytes_uploaded = 0
+        self._lock = threading.Lock()
+
+    def _path(self, bucket: str, key: str) -> str:
+        path = os.path.normpath(os.path.join(self.root, bucket, key))
+        if not path.startswith(os.path.join(self.root, bucket)):
+            raise ClientError({"Error": {"Code": "InvalidKey", "Message": key}}, "PutObject")
+        return path
+
+    def _delay(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def head_bucket(self, Bucket: str):
+        self._delay()
+        return {"ResponseMetadata": {"HTTPStatusCode": 200}}
+
+    def upload_fileobj(self, Fileobj, Bucket: str, Key: str, ExtraArgs=None, Config=None, Callback=None):
+        self._delay()
+        path = self._path(Bucket, Key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as out:
+            shutil.copyfileobj(Fileobj, out)
+            size = out.tell()
+        with self._lock:
+            self.uploads += 1
+            self.bytes_uploaded += size
+
+    def put_object(self, Bucket: str, Key: str, Body=b"", **kwargs):
+        self._delay()
+        path = self._path(Bucket, Key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as out:
+            out.write(Body if isinstance(Body, bytes) else Body.read())
+        return {}
+
+    def delete_object(self, Bucket: str, Key: str):
+        self._delay()
+        try:
+            os.remove(self._path(Bucket, Key))
+        except FileNotFoundError:
+            pass
+        return {}
+
+    def cleanup(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+def install_local_s3(root: Optional[str] = None, latency: float = 0.0) -> LocalS3Client:
+    """Point the shared S3Uploader at a LocalS3Client.
+
+    The uploader still validates its AWS settings, so placeholder values are
+    filled in for any that are unset.
+    """
+    for name, placeholder in (("AWS_ACCESS_KEY_ID", "local"), ("AWS_SECRET_ACCESS_KEY", "local"),
+                              ("AWS_REGION", "us-east-1"), ("S3_BUCKET_NAME", "local-resumes")):
+        os.environ.setdefault(name, placeholder)
+
+    from services.s3_service import get_s3_uploader
+
+    client = LocalS3Client(root, latency)
+    get_s3_uploader().s3 = client
+    return client
@@ -0,0 +1,304 @@
+"""End-to-end throughput benchmark for ``/api/scoring/process-batch``.
+
+Runs the real app in-process against FakeGeminiBackend and LocalS3Client, so
+no network access, credentials or quota are needed. From ``backend/``:
+
+    python -m benchmarks.run_benchmark --sizes 20,100 --pages 1,3 --latency 0.4 --error-rate 0.02
+
+Pipeline settings (SCORING_MODE, SCORING_BATCH_SIZE, PIPELINE_*_CONCURRENCY,
+PDF_EXTRACTION_MODE, ...) are read from the environment as usual.
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+import logging
+
+_workdir = tempfile.mkdtemp(prefix="resume-bench-")
+# Must be set before the app and services are imported
+os.environ.setdefault("GOOGLE_API_KEY", "fake")
+os.environ.setdefault("CACHE_DIR", os.path.join(_workdir, "cache"))
+os.environ.setdefault("TASK_STORE_BACKEND", "memory")
+
+import httpx
+import numpy as np
+
+from benchmarks.fake_gemini import FakeGeminiBackend, install_fake_gemini
+from benchmarks.local_s3 import install_local_s3
+from benchmarks.synthetic_corpus import build_corpus
+
+DEFAULT_JOB_DESCRIPTION = (
+    "Backend engineer with strong Python, AWS, Docker and Kubernetes experience. "
+    "Familiarity with PostgreSQL, Redis and Kafka is a plus."
+)
+STAGES = ("extract", "parse", "score", "end_to_end")
+
+
+class StageRecorder:
+    """Timestamps each resume as it clears extract, parse and score"""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.events: Dict[str, Dict[str, float]] = {}
+
+    def chain(self, stage: str, callback=None):
+        def record(item: Dict):
+            self.events.setdefault(item.get("filename", "unknown"), {})[stage] = time.perf_counter()
+            if callback is not None:
+                callback(item)
+        return record
+
+    def latencies(self) -> Dict[str, List[float]]:
+        """Per-resume seconds spent reaching each stage, including queue wait"""
+        latencies = {stage: [] for stage in STAGES}
+        for events in self.events.values():
+            previous = self.started_at
+            for stage, event in (("extract", "extracted"), ("parse", "parsed"), ("score", "scored")):
+                if event in events:
+                    latencies[stage].append(events[event] - previous)
+                    previous = events[event]
+            if "scored" in events:
+                latencies["end_to_end"].append(events["scored"] - self.started_at)
+        return latencies
+
+    def first_scored(self) -> Optional[float]:
+        scored = [events["scored"] for events in self.events.values() if "scored" in events]
+        return min(scored) - self.started_at if scored else None
+
+
+class EventLoopLagMonitor:
+    """Measures how late a short sleep wakes up on the app's event loop"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - started - self.interval))
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+
+class RSSSampler(threading.Thread):
+    """Samples this process's resident set size; ru_maxrss alone never resets between cases"""
+
+    def __init__(self, interval: float = 0.05):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak_bytes = 0
+        self._stop_event = threading.Event()
+
+    @staticmethod
+    def current_rss() -> int:
+        try:
+            with open("/proc/self/statm") as statm:
+                return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError):
+            # Not Linux: fall back to the lifetime peak (kilobytes on Linux, bytes on macOS)
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return peak if sys.platform == "darwin" else peak * 1024
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self.peak_bytes = max(self.peak_bytes, self.current_rss())
+            self._stop_event.wait(self.interval)
+
+    def stop(self) -> int:
+        self._stop_event.set()
+        self.join()
+        return max(self.peak_bytes, self.current_rss())
+
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"p50": None, "p99": None}
+    p50, p99 = np.percentile(values, [50, 99])
+    return {"p50": round(float(p50), 3), "p99": round(float(p99), 3)}
+
+
+def install_recorder(recorder: StageRecorder):
+    """Route the router's pipeline callbacks through ``recorder``"""
+    from routers import resume_scoring_router
+    from services.resume_pipeline import ResumePipeline
+
+    class TimedPipeline(ResumePipeline):
+        async def run(self, job_description, file_data_list, on_extracted=None, on_parsed=None,
+                      on_scored=None, **kwargs):
+            return await super().run(
+                job_description, file_data_list,
+                on_extracted=recorder.chain("extracted", on_extracted),
+                on_parsed=recorder.chain("parsed", on_parsed),
+                on_scored=recorder.chain("scored", on_scored),
+                **kwargs
+            )
+
+    resume_scoring_router.ResumePipeline = TimedPipeline
+
+
+async def run_case(app, size: int, pages: int, job_description: str, seed: int, backend: FakeGeminiBackend,
+                   gemini_client) -> Dict:
+    corpus = build_corpus(size, pages, seed)
+    files = [("files", (filename, content, "application/pdf")) for filename, content in corpus]
+
+    recorder = StageRecorder()
+    install_recorder(recorder)
+    calls_before, errors_before = backend.calls, backend.errors
+    counters_before = dict(gemini_client.resilience.metrics)
+
+    lag_monitor = EventLoopLagMonitor()
+    rss_sampler = RSSSampler()
+    rss_sampler.start()
+    lag_monitor.start()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+        started = time.perf_counter()
+        response = await client.post("/api/scoring/process-batch", data={"job_description": job_description},
+                                     files=files)
+        response.raise_for_status()
+        task_id = response.json()["task_id"]
+
+        while True:
+            status = (await client.get(f"/api/scoring/status/{task_id}")).json()
+            if status["status"] in ("completed", "failed"):
+                break
+            await asyncio.sleep(0.05)
+        elapsed = time.perf_counter() - started
+        results = (await client.get(f"/api/scoring/results/{task_id}")).json()
+
+    await lag_monitor.stop()
+    peak_rss = rss_sampler.stop()
+
+    candidates = results.get("candidates", [])
+    latencies = recorder.latencies()
+    counters = gemini_client.resilience.metrics
+    return {
+        "resumes": size,
+        "pages": pages,
+        "status": status["status"],
+        "error": status.get("error"),
+        "ranked": sum(1 for candidate in candidates if not candidate.get("scoring_failed")),
+        "scoring_failed": sum(1 for candidate in candidates if candidate.get("scoring_failed")),
+        "wall_seconds": round(elapsed, 3),
+        "resumes_per_minute": round(60 * size / elapsed, 1) if elapsed else None,
+        "first_result_seconds": round(recorder.first_scored(), 3) if recorder.first_scored() is not None else None,
+        "stage_latency_seconds": {stage: percentiles(latencies[stage]) for stage in STAGES},
+        "event_loop_lag_ms": {
+            "p99": round(1000 * float(np.percentile(lag_monitor.samples, 99)), 2) if lag_monitor.samples else None,
+            "max": round(1000 * max(lag_monitor.samples), 2) if lag_monitor.samples else None,
+        },
+        "peak_rss_mb": round(peak_rss / (1024 * 1024), 1),
+        "children_peak_rss_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+        "gemini_calls": backend.calls - calls_before,
+        "gemini_errors": backend.errors - errors_before,
+        "retries": counters.get("retries", 0) - counters_before.get("retries", 0),
+    }
+
+
+def format_row(result: Dict) -> str:
+    stage = result["stage_latency_seconds"]
+    return (
+        f"{result['resumes']:>6} {result['pages']:>5} {result['resumes_per_minute'] or 0:>10.1f} "
+        f"{result['wall_seconds']:>8.2f} {result['first_result_seconds'] or 0:>7.2f} "
+        + " ".join(f"{stage[name]['p50'] or 0:>6.2f}/{stage[name]['p99'] or 0:<6.2f}" for name in STAGES)
+        + f" {result['event_loop_lag_ms']['p99'] or 0:>7.1f} {result['peak_rss_mb']:>7.1f}"
+        f" {result['gemini_calls']:>6} {result['retries']:>6} {result['scoring_failed']:>6}"
+    )
+
+
+HEADER = (
+    f"{'resumes':>6} {'pages':>5} {'resumes/min':>10} {'wall s':>8} {'first s':>7} "
+    + " ".join(f"{name + ' p50/p99':>13}" for name in STAGES)
+    + f" {'lag p99':>7} {'RSS MB':>7} {'calls':>6} {'retry':>6} {'failed':>6}"
+)
+
+
+async def main(args) -> List[Dict]:
+    import app as app_module
+
+    if not args.verbose:
+        # Simulated 429s would otherwise log a retry warning each
+        logging.getLogger().setLevel(logging.ERROR)
+
+    backend = FakeGeminiBackend(
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        retry_after=args.retry_after, seed=args.seed
+    )
+    gemini_client = install_fake_gemini(backend, requests_per_minute=args.rpm, tokens_per_minute=args.tpm or None)
+    local_s3 = install_local_s3(os.path.join(_workdir, "s3"), latency=args.s3_latency)
+
+    results = []
+    print(HEADER)
+    try:
+        async with app_module.app.router.lifespan_context(app_module.app):
+            case_seed = args.seed
+            for size in args.sizes:
+                for pages in args.pages:
+                    case_seed += 1
+                    result = await run_case(
+                        app_module.app, size, pages, args.job_description, case_seed, backend, gemini_client
+                    )
+                    results.append(result)
+                    print(format_row(result), flush=True)
+    finally:
+        local_s3.cleanup()
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    int_list = lambda value: [int(item) for item in value.split(",") if item]
+    parser.add_argument("--sizes", type=int_list, default=[10, 50], help="resumes per batch, comma separated")
+    parser.add_argument("--pages", type=int_list, default=[1, 3], help="pages per resume, comma separated")
+    parser.add_argument("--latency", type=float, default=0.5, help="base fake Gemini latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.2, help="mean extra exponential latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls answered with a 429")
+    parser.add_argument("--retry-after", type=float, default=0.5, help="retry hint sent with simulated 429s")
+    parser.add_argument("--rpm", type=int, default=600, help="client-side requests/minute limit")
+    parser.add_argument("--tpm", type=int, default=0, help="client-side tokens/minute limit (0 = none)")
+    parser.add_argument("--s3-latency", type=float, default=0.02, help="local S3 latency per call in seconds")
+    parser.add_argument("--job-description", default=DEFAULT_JOB_DESCRIPTION)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--min-throughput", type=float,
+                        help="exit non-zero if any case processes fewer resumes/min than this")
+    parser.add_argument("--verbose", action="store_true", help="keep the app's INFO logging")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    benchmark_results = asyncio.run(main(arguments))
+
+    if arguments.json:
+        with open(arguments.json, "w") as out:
+            json.dump(benchmark_results, out, indent=2)
+
+    failed = [
+        result for result in benchmark_results
+        if result["status"] != "completed" or (
+            arguments.min_throughput and (result["resumes_per_minute"] or 0) < arguments.min_throughput
+        )
+    ]
+    if failed:
+        print(f"{len(failed)} case(s) failed or fell below the throughput floor", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,88 @@
+import random
+from typing import List, Tuple
+
+from benchmarks.fake_gemini import SKILL_VOCABULARY
+
+FIRST_NAMES = ["Asha", "Rohan", "Mei", "Lucas", "Amara", "Noah", "Priya", "Diego", "Sara", "Kenji", "Leila", "Omar"]
+LAST_NAMES = ["Patel", "Chen", "Silva", "Okafor", "Müller", "Khan", "Sato", "Garcia", "Novak", "Haddad"]
+TITLES = ["Software Engineer", "Backend Developer", "Data Engineer", "Cloud Engineer", "ML Engineer", "DevOps Engineer"]
+COMPANIES = ["Cloudify", "DataForge", "Nimbus Labs", "QuantSoft", "Orbital Systems", "BlueRiver"]
+FILLER = (
+    "Designed and maintained services handling production traffic, improved reliability and "
+    "reduced latency through profiling, caching and careful capacity planning."
+)
+
+LINE_HEIGHT = 14
+LINES_PER_PAGE = 48
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(pages: List[List[str]]) -> bytes:
+    """Minimal text-only PDF: one Helvetica text block per page, one line per entry"""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>"]
+    kids = " ".join(f"{3 + 2 * index} 0 R" for index in range(len(pages)))
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>")
+    font_ref = 3 + 2 * len(pages)
+
+    for index, lines in enumerate(pages):
+        body = " T* ".join(f"({_escape(line)}) Tj" for line in lines)
+        stream = f"BT /F1 10 Tf {LINE_HEIGHT} TL 56 760 Td {body} ET"
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {4 + 2 * index} 0 R "
+            f"/Resources << /Font << /F1 {font_ref} 0 R >> >> >>"
+        )
+        objects.append(f"<< /Length {len(stream.encode('latin-1'))} >>\nstream\n{stream}\nendstream")
+    objects.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+def resume_lines(rng: random.Random, index: int, page_count: int) -> Tuple[str, List[List[str]]]:
+    """Plausible resume text spread over ``page_count`` pages, with a repeated header"""
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {index}"
+    skills = rng.sample(SKILL_VOCABULARY, rng.randint(3, 10))
+    years = rng.randint(1, 15)
+
+    body = [
+        rng.choice(TITLES),
+        f"{name.lower().replace(' ', '.')}@example.com | +1 555 {rng.randint(1000000, 9999999)}",
+        f"Summary: {years} years of experience building backend and data systems.",
+        "Skills: " + ", ".join(skills),
+        "Experience",
+    ]
+    # Enough experience entries to fill the requested pages
+    for job in range(page_count * 6):
+        body.append(f"{rng.choice(TITLES)} at {rng.choice(COMPANIES)} ({2024 - job} - {2025 - job})")
+        body.append(f"Used {', '.join(rng.sample(skills, min(3, len(skills))))}. {FILLER}")
+    body += ["Education", f"B.Tech Computer Science, {rng.choice(['IIT', 'MIT', 'NUS', 'TUM'])} {2024 - years}"]
+
+    per_page = max(1, -(-len(body) // page_count))
+    pages = []
+    for page_number in range(page_count):
+        chunk = body[page_number * per_page:(page_number + 1) * per_page]
+        pages.append([name] + chunk[:LINES_PER_PAGE - 2] + [f"Page {page_number + 1} of {page_count}"])
+    return name, pages
+
+
+def build_corpus(count: int, page_count: int = 1, seed: int = 0) -> List[Tuple[str, bytes]]:
+    """``count`` synthetic resume PDFs as (filename, bytes)"""
+    rng = random.Random(seed)
+    corpus = []
+    for index in range(count):
+        _, pages = resume_lines(rng, index, page_count)
+        corpus.append((f"resume_{seed}_{index:05d}.pdf", make_pdf(pages)))
+    return corpus
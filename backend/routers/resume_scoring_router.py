@@ -1,108 +1,207 @@
-from fastapi import APIRouter, UploadFile, HTTPException, Form, File
-from pydantic import BaseModel
-from typing import List
+from fastapi import APIRouter, UploadFile, HTTPException, Form, File, Header, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from collections import OrderedDict
 from datetime import datetime
 import uuid
+import asyncio
 import logging
 logger = logging.getLogger(__name__)
-from io import BytesIO
 from dotenv import load_dotenv
-from services.s3_service import S3Uploader
+from services.s3_service import S3Uploader, get_s3_uploader
 from fastapi import BackgroundTasks
 
-from services.pdf_processor import PDFProcessor
-from services.resume_parser import ResumeParser
-from services.resume_scoring_service import RateLimitedResumeScorer
+from services.resume_parser import get_parse_cache
+from services.resume_scoring_service import (
+    DEFAULT_RESULTS_TOP_K, RateLimitedResumeScorer, RunningTopK, get_score_cache, rank_key
+)
+from services.resume_pipeline import ResumePipeline, PipelineError, planned_gemini_requests
+from services.rate_limiter import DEFAULT_REQUESTS_PER_MINUTE
+from services.gemini_client import get_gemini_client
+from services.metrics import StageTimer, TASKS, get_metrics_registry, labels
+from services.task_store import TaskProgressWriter, get_task_store
+from services.job_queue import TASK_EXECUTOR, get_job_queue
+from services.task_events import HEARTBEAT_SECONDS, format_sse, get_task_event_broker
+from services.health_monitor import get_s3_health_monitor
+from services.prefilter_ranker import DEFAULT_PREFILTER_TOP_N, DEFAULT_PREFILTER_MIN_SCORE
+from services.candidate_index import CANDIDATE_INDEX_ENABLED, get_candidate_index
+from services.upload_spool import (
+    UploadRejected, spool_upload, task_spool_dir, cleanup_spool, purge_stale_spools
+)
 
 
-from services.gemini_client import GeminiClient
-gemini = GeminiClient()
-result = []
-
 load_dotenv()
 router = APIRouter(prefix="/api/scoring", tags=["Resume Scoring"])
 
-# In-memory task store (use Redis in production)
-processing_tasks = {}
+# Task state lives in a bounded store (TASK_STORE_BACKEND=sqlite to share it across workers).
+# Its calls can block on disk and on other writers, so handlers run them on a thread
+task_store = get_task_store()
+# Progress events for /events, published by the background task in this process
+task_events = get_task_event_broker()
+
+# Candidates included in each "ranking" event
+RANKING_EVENT_TOP_N = 10
+# Client reconnect delay sent in the event stream, in milliseconds
+EVENT_STREAM_RETRY_MS = 3000
+MAX_RESULTS_PAGE_SIZE = 200
+# Stored candidates re-scored by Gemini in one /candidates/rank request
+MAX_ESCALATED_CANDIDATES = 25
+# Final candidate lists of recently completed tasks; paging through one only
+# reads the task's metadata from the store, not its full results
+_completed_results = OrderedDict()
+_COMPLETED_RESULTS_CACHE_SIZE = 8
+
+
+def _cache_metrics() -> dict:
+    values = {}
+    for cache in (get_parse_cache(), get_score_cache()):
+        stats = cache.stats()
+        for result in ("memory_hits", "disk_hits", "misses"):
+            values[labels(cache=stats["namespace"], result=result)] = stats[result]
+    return values
+
+
+def _quota_metrics() -> dict:
+    quota = get_gemini_client().quota_status()
+    return {
+        labels(kind="requests"): quota["requests_last_minute"],
+        labels(kind="tokens"): quota["tokens_last_minute"],
+    }
+
+
+def _resilience_metrics() -> dict:
+    counters = get_gemini_client().resilience.status()["counters"]
+    return {labels(event=name): value for name, value in counters.items()}
+
+
+# Read from the owning services at scrape time
+get_metrics_registry().callback(
+    "resume_cache_lookups_total", "Parse and score cache lookups, by result", _cache_metrics, kind="counter"
+)
+get_metrics_registry().callback(
+    "gemini_quota_used_last_minute", "Gemini requests and tokens used in the last minute", _quota_metrics
+)
+get_metrics_registry().callback(
+    "gemini_resilience_events_total", "Gemini attempts, retries, hedges and backoff seconds", _resilience_metrics,
+    kind="counter"
+)
+if TASK_EXECUTOR == "queue":
+    get_metrics_registry().callback(
+        "job_queue_jobs", "Scoring jobs in the worker queue, by status",
+        lambda: {labels(status=status): get_job_queue().stats()[status] for status in ("queued", "running")}
+    )
 
 class ScoringRequest(BaseModel):
     job_description: str
 
+class CandidateRankRequest(BaseModel):
+    job_description: str
+    top_n: int = Field(20, ge=1, le=MAX_RESULTS_PAGE_SIZE)
+    # Every listed skill is required; title and education words must all match
+    skills: List[str] = []
+    title: Optional[str] = None
+    education: Optional[str] = None
+    # Re-score this many of the top lexical matches with Gemini
+    escalate_top: int = Field(0, ge=0, le=MAX_ESCALATED_CANDIDATES)
+    include_profile: bool = False
+
 @router.post("/process-batch")
 async def process_resume_batch(
+    request: Request,
     background_tasks: BackgroundTasks,
     job_description: str = Form(...),
     files: List[UploadFile] = File(...),
+    prefilter_top_n: Optional[int] = Form(None, ge=1),
+    prefilter_min_score: Optional[float] = Form(None, ge=0, le=100),
 ):
     if not files:
         raise HTTPException(status_code=400, detail="No files uploaded")
 
-    uploader = S3Uploader()
-
-    print("🔧 Testing S3 connection before processing files...")
-    if not uploader.test_s3_connection():
-        raise RuntimeError("S3 connection test failed. Check your configuration.")
-    else:
-        print("✅ S3 connection test passed. Proceeding with file uploads...\n")
+    # Connectivity is probed in the background; the request only reads the cached result
+    if not get_s3_health_monitor().is_available():
+        raise HTTPException(status_code=503, detail="S3 is currently unreachable. Check your configuration.")
 
     folder_name = S3Uploader.generate_folder_name(job_description)
-    print(f"📁 Creating folder: {folder_name}")
+    logger.info(f"Creating folder: {folder_name}")
+
+    task_id = str(uuid.uuid4())
+    spool_dir = task_spool_dir(task_id)
+    purge_stale_spools()
 
+    # Uploads are streamed to a per-task spool directory; only file paths and
+    # sizes are kept in memory for the background task, which pushes them to
+    # S3 while extraction runs
     file_data_list = []
 
     for file in files:
         filename = file.filename or f"resume_{uuid.uuid4()}.pdf"
 
         try:
-            content = await file.read()
-            if len(content) < 100 or not content.startswith(b"%PDF"):
-                logger.warning("Skip %s – file is empty or too small", filename)
-                continue
-
-            s3_key = f"{folder_name}/{filename}"
-            url = uploader.upload_file(BytesIO(content), s3_key)
-
-            file_data_list.append({
-                "filename": filename,
-                "content": content,
-                "s3_url": url,
-                "s3_key": s3_key,
-                "folder": folder_name
+            file_data = await spool_upload(file, spool_dir, filename)
+            file_data.update({
+                "s3_key": f"{folder_name}/{filename}",
+                "folder": folder_name,
+                # Same numbering as the pipeline's, so upload timings land on the right resume
+                "upload_id": len(file_data_list)
             })
-            logger.info("Uploaded %s → %s", filename, url)
+            file_data_list.append(file_data)
+
+        except UploadRejected as exc:
+            logger.warning("Skip %s – %s", filename, exc)
+            continue
 
         except Exception as exc:
             logger.error("Failed processing %s: %s", filename, exc)
             continue
 
-    task_id = str(uuid.uuid4())
+        finally:
+            await file.close()
+
+    prefilter_top_n = prefilter_top_n if prefilter_top_n is not None else DEFAULT_PREFILTER_TOP_N
+    prefilter_min_score = prefilter_min_score if prefilter_min_score is not None else DEFAULT_PREFILTER_MIN_SCORE
+    # Every Gemini request counts against the same per-minute quota
+    planned_requests = planned_gemini_requests(job_description, len(file_data_list), prefilter_top_n)
+    estimated_time = f"{planned_requests / DEFAULT_REQUESTS_PER_MINUTE:.1f} minutes"
 
-    processing_tasks[task_id] = {
-        "status": "processing",
+    queued = TASK_EXECUTOR == "queue"
+    await asyncio.to_thread(task_store.create, task_id, {
+        "status": "queued" if queued else "processing",
         "total_files": len(file_data_list),
         "processed": 0,
-        "estimated_time": f"{len(file_data_list) * 15 / 60:.1f} minutes",
+        "estimated_time": estimated_time,
         "started_at": datetime.now().isoformat(),
         "folder_name": folder_name,
         "job_description": job_description[:100] + "..." if len(job_description) > 100 else job_description,
         "results": []
-    }
-
-    logger.info("Starting background processing task...")
+    })
+    # Open the event log before returning, so a client that connects ahead of the
+    # first event subscribes to it rather than finding no events for the task
+    task_events.open(task_id)
 
-    background_tasks.add_task(
-        process_in_background,
-        task_id,
-        job_description,
-        file_data_list
-    )
+    job = {
+        "task_id": task_id,
+        "job_description": job_description,
+        "file_data_list": file_data_list,
+        "prefilter_top_n": prefilter_top_n,
+        "prefilter_min_score": prefilter_min_score
+    }
+    if queued:
+        # Worker processes pick it up; jobs are shared out fairly between tenants
+        tenant = request.headers.get("X-Tenant-ID") or (request.client.host if request.client else "anonymous")
+        await asyncio.to_thread(get_job_queue().enqueue, task_id, tenant, job)
+        logger.info(f"Queued task {task_id} for tenant {tenant}")
+    else:
+        logger.info("Starting background processing task...")
+        background_tasks.add_task(process_in_background, **job)
 
     return {
         "task_id": task_id,
-        "status": "processing_started",
+        "status": "queued" if queued else "processing_started",
         "total_resumes": len(file_data_list),
-        "estimated_completion_time": f"{len(file_data_list) * 15 / 60:.1f} minutes",
-        "processing_rate": "4 resumes per minute",
+        "estimated_completion_time": estimated_time,
+        "planned_gemini_requests": planned_requests,
+        "processing_rate": f"{DEFAULT_REQUESTS_PER_MINUTE} Gemini requests per minute",
         "folder_name": folder_name,
         "s3_organization": f"Files organized in: {folder_name}/"
     }
@@ -110,11 +209,10 @@ async def process_resume_batch(
 @router.get("/results/{task_id}")
 async def get_results(task_id: str):
     """Get final scoring results with candidate rankings"""
-    if task_id not in processing_tasks:
+    task = await asyncio.to_thread(task_store.get, task_id)
+    if task is None:
         raise HTTPException(status_code=404, detail="Task not found")
 
-    task = processing_tasks[task_id]
-
     if task["status"] == "failed":
         return {
             "task_id": task_id,
@@ -124,11 +222,13 @@ async def get_results(task_id: str):
         }
 
     if task["status"] != "completed":
+        # Best candidates scored so far (up to RESULTS_TOP_K), already ranked
         return {
             "task_id": task_id,
             "status": task["status"],
             "message": f"Processing in progress. Current stage: {task['status']}",
-            "progress": f"{task.get('processed', 0)}/{task.get('total_files', 0)} files"
+            "progress": f"{task.get('processed', 0)}/{task.get('total_files', 0)} files",
+            "candidates": task["results"]["results"] if task.get("results") else []
         }
 
     # Return complete results with candidate scores
@@ -140,92 +240,451 @@ async def get_results(task_id: str):
         "processing_summary": {
             "total_uploaded": task["total_files"],
             "successfully_processed": task.get("processed", 0),
-            "processing_rate": "4 resumes per minute"
+            # Listed last among the candidates, with match_score null
+            "scoring_failed": task.get("scoring_failed", 0),
+            "processing_rate": f"{DEFAULT_REQUESTS_PER_MINUTE} Gemini requests per minute"
         },
         "candidates": task["results"]["results"] if task.get("results") else []
     }
 
 
+async def _task_candidates(task_id: str, task: dict) -> List[dict]:
+    """Ranked candidates of a task: the full list once completed, the running top-K before.
+
+    ``task`` is the task's metadata; results are loaded only when they are not cached.
+    """
+    completed = task["status"] == "completed"
+    if completed and task_id in _completed_results:
+        _completed_results.move_to_end(task_id)
+        return _completed_results[task_id]
+
+    loaded = await asyncio.to_thread(task_store.get, task_id)
+    candidates = loaded["results"]["results"] if loaded and loaded.get("results") else []
+    if completed:
+        _completed_results[task_id] = candidates
+        if len(_completed_results) > _COMPLETED_RESULTS_CACHE_SIZE:
+            _completed_results.popitem(last=False)
+    return candidates
+
+
+def _candidate_matches(entry: dict, min_score: Optional[float], fits: Optional[set], skill: Optional[str]) -> bool:
+    details = entry.get("detailed_scores") or {}
+    if min_score is not None and (entry.get("match_score") is None or entry["match_score"] < min_score):
+        return False
+    if fits is not None and str(details.get("overall_fit", "")).strip().lower() not in fits:
+        return False
+    if skill is not None and not any(skill in str(item).lower() for item in details.get("skillset_for_role") or []):
+        return False
+    return True
+
+
+def _candidate_summary(entry: dict, rank: int) -> dict:
+    details = entry.get("detailed_scores") or {}
+    summary = {key: value for key, value in entry.items() if key not in ("detailed_scores", "timings")}
+    summary.update(rank=rank, overall_fit=details.get("overall_fit"), skillset_for_role=details.get("skillset_for_role"))
+    return summary
+
+
+@router.get("/results/{task_id}/candidates")
+async def list_candidates(
+    task_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=MAX_RESULTS_PAGE_SIZE),
+    min_score: Optional[float] = Query(None),
+    overall_fit: Optional[str] = Query(None, description="Comma separated, e.g. perfect,high"),
+    skill: Optional[str] = Query(None, description="Substring of a skill in skillset_for_role"),
+    include_details: bool = Query(False),
+):
+    """One page of ranked candidates, optionally filtered.
+
+    While a task is running this pages through its current top candidates
+    (RESULTS_TOP_K); once completed, through every candidate.
+    """
+    task = await asyncio.to_thread(task_store.get, task_id, include_results=False)
+    if task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    fits = {fit.strip().lower() for fit in overall_fit.split(",") if fit.strip()} if overall_fit else None
+    skill = skill.strip().lower() if skill and skill.strip() else None
+    matched = [
+        (rank, entry)
+        for rank, entry in enumerate(await _task_candidates(task_id, task), start=1)
+        if _candidate_matches(entry, min_score, fits, skill)
+    ]
+
+    page = matched[offset:offset + limit]
+    return {
+        "task_id": task_id,
+        "status": task["status"],
+        "partial": task["status"] != "completed",
+        "total_processed": task.get("processed", 0),
+        "total_matched": len(matched),
+        "offset": offset,
+        "limit": limit,
+        "candidates": [
+            dict(entry, rank=rank) if include_details else _candidate_summary(entry, rank)
+            for rank, entry in page
+        ]
+    }
+
+
 @router.get("/status/{task_id}")
 async def get_task_status(task_id: str):
     """Check processing status and progress (no full results)"""
-    if task_id not in processing_tasks:
+    # Only load metadata, not full results
+    task = await asyncio.to_thread(task_store.get, task_id, include_results=False)
+    if task is None:
         raise HTTPException(status_code=404, detail="Task not found")
-
-    task = processing_tasks[task_id]
     
-    # Only return metadata, not full results
     return {
         "task_id": task_id,
         "status": task["status"],
         "total_files": task.get("total_files", 0),
+        "uploaded": task.get("uploaded", 0),
+        "upload_failures": task.get("upload_failures", []),
+        "extracted": task.get("extracted", 0),
+        "parsed": task.get("parsed", 0),
         "processed": task.get("processed", 0),
         "estimated_time": task.get("estimated_time", ""),
         "started_at": task.get("started_at", ""),
         "completed_at": task.get("completed_at", None),
-        "error": task.get("error", None)
+        "error": task.get("error", None),
+        "timings": task.get("timings", {}),
+        "queue_position": (
+            await asyncio.to_thread(get_job_queue().position, task_id) if task["status"] == "queued" else None
+        ),
+        "quota": get_gemini_client().quota_status()
+    }
+
+@router.get("/queue")
+async def get_queue_status():
+    """Jobs waiting and running in the worker queue (TASK_EXECUTOR=queue)"""
+    if TASK_EXECUTOR != "queue":
+        return {"executor": TASK_EXECUTOR}
+    return {"executor": TASK_EXECUTOR, **await asyncio.to_thread(get_job_queue().stats)}
+
+def _progress_snapshot(task: dict) -> dict:
+    return {
+        "status": task["status"],
+        "total_files": task.get("total_files", 0),
+        "uploaded": task.get("uploaded", 0),
+        "extracted": task.get("extracted", 0),
+        "parsed": task.get("parsed", 0),
+        "processed": task.get("processed", 0),
+        "error": task.get("error"),
+    }
+
+
+def _ranking_payload(candidates: List[dict], processed: int) -> dict:
+    return {
+        "processed": processed,
+        "top": [
+            {"rank": rank, "filename": entry.get("filename"), "candidate_name": entry.get("candidate_name"),
+             "match_score": entry.get("match_score")}
+            for rank, entry in enumerate(candidates[:RANKING_EVENT_TOP_N], start=1)
+        ]
+    }
+
+
+async def _polled_events(task_id: str):
+    """Snapshots read from the task store, for tasks running in another worker with in-memory events"""
+    last_snapshot = None
+    idle = 0.0
+    while True:
+        task = await asyncio.to_thread(task_store.get, task_id, include_results=False)
+        if task is None:
+            return
+        snapshot = _progress_snapshot(task)
+        if snapshot != last_snapshot:
+            last_snapshot = snapshot
+            idle = 0.0
+            yield format_sse(None, "progress", snapshot)
+        elif idle >= HEARTBEAT_SECONDS:
+            idle = 0.0
+            yield ": keep-alive\n\n"
+        if task["status"] in ("completed", "failed"):
+            return
+        await asyncio.sleep(1.0)
+        idle += 1.0
+
+
+@router.get("/events/{task_id}")
+async def stream_task_events(
+    task_id: str,
+    last_event_id: Optional[int] = Query(None),
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID"),
+):
+    """Server-Sent Events stream of per-resume progress and ranking updates.
+
+    Reconnecting clients send ``Last-Event-ID`` (browsers do this automatically)
+    or ``?last_event_id=`` and receive only the events they missed.
+    """
+    task = await asyncio.to_thread(task_store.get, task_id, include_results=False)
+    if task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    after = last_event_id or 0
+    if last_event_id_header and last_event_id_header.isdigit():
+        after = int(last_event_id_header)
+
+    has_events = await asyncio.to_thread(task_events.has_task, task_id)
+
+    async def stream():
+        yield f"retry: {EVENT_STREAM_RETRY_MS}\n\n"
+        # Every task submitted to this process has a log from the start; a shared log also
+        # covers tasks still waiting in the queue or running in a job worker
+        if has_events or (task_events.shared and task["status"] not in ("completed", "failed")):
+            async for event in task_events.subscribe(task_id, after):
+                if event is None:
+                    yield ": keep-alive\n\n"
+                else:
+                    yield format_sse(*event)
+        elif task["status"] in ("completed", "failed"):
+            # Event history expired (or lived in another API worker); send the outcome once
+            yield format_sse(None, task["status"], _progress_snapshot(task))
+        else:
+            # Submitted to another API worker, whose events this process never sees
+            async for frame in _polled_events(task_id):
+                yield frame
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """Hit/miss counters for the parsed-resume and score caches"""
+    return {
+        "parsed_resumes": get_parse_cache().stats(),
+        "resume_scores": get_score_cache().stats()
     }
 
-async def process_in_background(task_id: str, job_description: str, file_data_list: List[dict]):
+@router.delete("/cache/scores")
+async def clear_score_cache():
+    """Drop every cached score, e.g. after changing scoring criteria outside the prompt"""
+    get_score_cache().clear()
+    return {"status": "cleared"}
+
+@router.post("/candidates/rank")
+async def rank_stored_candidates(body: CandidateRankRequest):
+    """Rank every previously processed candidate against a new job description.
+
+    Ranking is local and lexical; the best ``escalate_top`` matches can be
+    re-scored by Gemini, and those then rank ahead of the rest.
+    """
+    if not CANDIDATE_INDEX_ENABLED:
+        raise HTTPException(status_code=404, detail="The candidate index is disabled; set CANDIDATE_INDEX=1")
+    if not body.job_description.strip():
+        raise HTTPException(status_code=400, detail="job_description must not be empty")
+
+    index = get_candidate_index()
+    candidates = await asyncio.to_thread(
+        index.rank, body.job_description, body.top_n, body.skills, body.title, body.education,
+        body.include_profile or body.escalate_top > 0
+    )
+    for candidate in candidates:
+        candidate["scored_by"] = "index"
+
+    escalated = candidates[:body.escalate_top]
+    if escalated:
+        # The candidate id stands in for the filename, which need not be unique across tasks
+        scored = await RateLimitedResumeScorer().score_resume_batch(body.job_description, [
+            {"filename": candidate["candidate_id"], "parsing_success": True, "parsed_data": candidate["parsed_data"]}
+            for candidate in escalated
+        ])
+        by_id = {entry["filename"]: entry for entry in scored["results"]}
+        for candidate in escalated:
+            entry = by_id[candidate["candidate_id"]]
+            candidate.update(
+                scored_by="gemini" if not entry.get("scoring_failed") else "index",
+                lexical_score=candidate["match_score"],
+                detailed_scores=entry.get("detailed_scores"),
+                scoring_failed=bool(entry.get("scoring_failed"))
+            )
+            if not entry.get("scoring_failed"):
+                candidate["match_score"] = entry["match_score"]
+        gemini_scored = sorted(
+            (candidate for candidate in escalated if candidate["scored_by"] == "gemini"), key=rank_key, reverse=True
+        )
+        candidates = gemini_scored + [candidate for candidate in candidates if candidate["scored_by"] == "index"]
+
+    if not body.include_profile:
+        for candidate in candidates:
+            candidate.pop("parsed_data", None)
+    return {
+        "total_candidates": len(candidates),
+        "escalated": len(escalated),
+        "candidates": [dict(candidate, rank=rank) for rank, candidate in enumerate(candidates, start=1)]
+    }
+
+@router.get("/candidates/index")
+async def get_candidate_index_stats():
+    """Size and age of the stored candidate index"""
+    return await asyncio.to_thread(get_candidate_index().stats)
+
+@router.delete("/candidates/{candidate_id}")
+async def delete_stored_candidate(candidate_id: str):
+    """Remove one candidate's stored profile, e.g. on a data deletion request"""
+    if not await asyncio.to_thread(get_candidate_index().remove, candidate_id):
+        raise HTTPException(status_code=404, detail="Candidate not found")
+    return {"status": "deleted", "candidate_id": candidate_id}
+
+async def process_in_background(task_id: str, job_description: str, file_data_list: List[dict],
+                                prefilter_top_n: Optional[int] = None, prefilter_min_score: Optional[float] = None):
     """Fixed background processing with proper AI pipeline integration"""
+    # One timer per task: its summary is shown in /status, and it feeds /metrics
+    timer = StageTimer()
+    total_files = len(file_data_list)
+    # Per-resume progress is coalesced into a few store writes a second, off the event loop
+    progress_writer = TaskProgressWriter(task_store, task_id)
+    task_events.publish(task_id, "started", {"total_files": total_files})
+    # S3 uploads run alongside extraction instead of gating the HTTP response
+    upload_task = asyncio.create_task(upload_to_s3(task_id, file_data_list, timer, progress_writer))
+    handed_back = False
     try:
         logger.info(f"Starting background processing for task {task_id}")
-        
-        # Update status to extracting text
-        processing_tasks[task_id]["status"] = "extracting_text"
-        
-        # 1. Initialize services (INSTANCE METHODS, not class methods)
-        pdf_processor = PDFProcessor()
-        resume_parser = ResumeParser()
-        scorer = RateLimitedResumeScorer()
-        
-        # 2. Extract text from PDF contents (not UploadFile objects)
-        logger.info("Starting PDF text extraction...")
-        extracted_data = pdf_processor.extract_from_file_contents(file_data_list)
-        
-        successful_extractions = [r for r in extracted_data if r.get("extraction_success")]
-        logger.info(f"Text extraction: {len(successful_extractions)}/{len(extracted_data)} successful")
-        
-        if not successful_extractions:
-            processing_tasks[task_id]["status"] = "failed"
-            processing_tasks[task_id]["error"] = "No PDFs were successfully extracted for text."
-            return
-        
-        # 3. Parse resumes to structured JSON using Gemini API
-        processing_tasks[task_id]["status"] = "parsing_resumes"
-        logger.info("Starting resume parsing with Gemini API...")
-        
-        parsed_resumes = resume_parser.parse_multiple_resumes(successful_extractions)
-        
-        successful_parses = [r for r in parsed_resumes if r.get("parsing_success")]
-        logger.info(f"Resume parsing: {len(successful_parses)}/{len(parsed_resumes)} successful")
-        
-        if not successful_parses:
-            processing_tasks[task_id]["status"] = "failed"
-            processing_tasks[task_id]["error"] = "No resumes could be parsed by Gemini API."
+        await progress_writer.flush(status="processing")
+
+        # Each resume flows through extract → parse → score on its own, so
+        # ranked candidates appear in /results while the rest are still in flight
+        pipeline = ResumePipeline()
+        progress = {"extracted": 0, "parsed": 0}
+        # Only the best RESULTS_TOP_K rows are ranked and stored while scoring runs
+        top_candidates = RunningTopK(DEFAULT_RESULTS_TOP_K)
+
+        def on_extracted(extraction: dict):
+            progress["extracted"] += 1
+            progress_writer.update(extracted=progress["extracted"])
+            task_events.publish(task_id, "extracted", {
+                "filename": extraction.get("filename"),
+                "success": bool(extraction.get("extraction_success")),
+                "extracted": progress["extracted"],
+                "total_files": total_files
+            })
+
+        parsed_resumes = []
+
+        def on_parsed(parsed: dict):
+            if parsed.get("parsing_success"):
+                progress["parsed"] += 1
+                parsed_resumes.append(parsed)
+                progress_writer.update(parsed=progress["parsed"])
+            task_events.publish(task_id, "parsed", {
+                "filename": parsed.get("filename"),
+                "success": bool(parsed.get("parsing_success")),
+                "parsed": progress["parsed"],
+                "total_files": total_files
+            })
+
+        def on_scored(entry: dict):
+            rank = top_candidates.rank(entry) if top_candidates.push(entry) else None
+            progress_writer.update(processed=top_candidates.total, timings=timer.summary)
+            if rank is not None:
+                # Built when the write happens, so a burst of new top rows is serialized once
+                progress_writer.update(results=lambda: {
+                    "partial": True,
+                    "total_processed": top_candidates.total,
+                    "results": top_candidates.ranked()
+                })
+            task_events.publish(task_id, "scored", {
+                "filename": entry.get("filename"),
+                "candidate_name": entry.get("candidate_name"),
+                "match_score": entry.get("match_score"),
+                "scoring_failed": bool(entry.get("scoring_failed")),
+                "rank": rank,
+                "processed": top_candidates.total,
+                "total_files": total_files
+            })
+            # Only when the visible top of the ranking actually moved
+            if rank is not None and rank <= RANKING_EVENT_TOP_N:
+                task_events.publish(task_id, "ranking", _ranking_payload(top_candidates.ranked(), top_candidates.total))
+
+        try:
+            results = await pipeline.run(
+                job_description,
+                file_data_list,
+                on_extracted=on_extracted,
+                on_parsed=on_parsed,
+                on_scored=on_scored,
+                prefilter_top_n=prefilter_top_n,
+                prefilter_min_score=prefilter_min_score,
+                timer=timer
+            )
+        except PipelineError as e:
+            TASKS.inc(status="failed")
+            await progress_writer.flush(
+                status="failed", error=str(e), failed_at=datetime.now().isoformat(), timings=timer.summary()
+            )
+            task_events.publish(task_id, "failed", {"error": str(e)})
             return
+
+        if CANDIDATE_INDEX_ENABLED:
+            # Keep the parsed profiles so later job descriptions can be ranked against them
+            indexed = await asyncio.to_thread(get_candidate_index().add_many, task_id, parsed_resumes)
+            logger.info(f"Added {indexed} candidates from task {task_id} to the candidate index")
+
+        # Save complete results
+        await progress_writer.flush(
+            status="completed",
+            completed_at=datetime.now().isoformat(),
+            processed=results["total_processed"],
+            prefiltered_out=results["prefiltered_out"],
+            scoring_failed=results["stage_counts"]["scoring_failed"],
+            timings=results["timings"],
+            results=results  # This contains the full scoring results
+        )
         
-        # 4. Score resumes against job description with rate limiting
-        processing_tasks[task_id]["status"] = "scoring_candidates"
-        logger.info("Starting candidate scoring with Gemini API...")
-        
-        results = await scorer.score_resume_batch(job_description, successful_parses)
-        
-        # 5. Save complete results
-        processing_tasks[task_id].update({
-            "status": "completed",
-            "completed_at": datetime.now().isoformat(),
-            "processed": len(successful_parses),
-            "results": results  # This contains the full scoring results
+        TASKS.inc(status="completed")
+        task_events.publish(task_id, "ranking", _ranking_payload(results["results"], results["total_processed"]))
+        task_events.publish(task_id, "completed", {
+            "processed": results["total_processed"],
+            "prefiltered_out": results["prefiltered_out"],
+            "scoring_failed": results["stage_counts"]["scoring_failed"]
         })
-        
         logger.info(f"Background processing completed successfully for task {task_id}")
         logger.info(f"Final results: {results['total_processed']} candidates processed and scored")
         
     except Exception as e:
         logger.error(f"Background processing error for task {task_id}: {str(e)}")
-        processing_tasks[task_id].update({
-            "status": "failed",
-            "error": str(e),
-            "failed_at": datetime.now().isoformat()
-        })
\ No newline at end of file
+        TASKS.inc(status="failed")
+        await progress_writer.flush(
+            status="failed",
+            error=str(e),
+            failed_at=datetime.now().isoformat()
+        )
+        task_events.publish(task_id, "failed", {"error": str(e)})
+
+    except asyncio.CancelledError:
+        # A stopping job worker hands the task back to the queue; it reruns from the spooled files
+        handed_back = True
+        upload_task.cancel()
+        raise
+
+    finally:
+        # Spooled files must outlive the uploads that read them
+        await asyncio.gather(upload_task, return_exceptions=True)
+        if not handed_back:
+            cleanup_spool(task_spool_dir(task_id))
+            # A handed-back task keeps its stream open for the worker that reruns it
+            task_events.close(task_id)
+
+async def upload_to_s3(task_id: str, file_data_list: List[dict], timer: Optional[StageTimer] = None,
+                       progress_writer: Optional[TaskProgressWriter] = None):
+    progress_writer = progress_writer or TaskProgressWriter(task_store, task_id)
+    try:
+        uploaded = await get_s3_uploader().upload_many(file_data_list)
+        failures = [f["filename"] for f in uploaded if f.get("s3_error")]
+        if timer is not None:
+            for file_data in uploaded:
+                timer.observe(
+                    "upload", file_data.get("upload_seconds", 0.0), file_data.get("upload_id"),
+                    outcome="failed" if file_data.get("s3_error") else "success"
+                )
+        await progress_writer.flush(uploaded=len(uploaded) - len(failures), upload_failures=failures,
+                                    **({"timings": timer.summary} if timer is not None else {}))
+        task_events.publish(task_id, "uploaded", {"uploaded": len(uploaded) - len(failures), "failures": failures})
+    except Exception as e:
+        logger.error(f"S3 upload error for task {task_id}: {str(e)}")
+        await progress_writer.flush(upload_failures=[f["filename"] for f in file_data_list])
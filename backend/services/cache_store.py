@@ -0,0 +1,242 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+import logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.getenv(
+    "CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache")
+)
+
+
+def make_cache_key(*parts: str) -> str:
+    """SHA-256 over the given parts, used as a content address"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class LRUCache:
+    """In-memory LRU that evicts by total serialized size, entry count and age"""
+
+    def __init__(self, max_bytes: int, max_entries: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.current_bytes = 0
+        self._entries = OrderedDict()  # key -> (value, size, stored_at)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self.ttl_seconds is not None and time.time() - entry[2] > self.ttl_seconds:
+                self._entries.pop(key)
+                self.current_bytes -= entry[1]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key: str, value: Any, size: int, stored_at: Optional[float] = None):
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._entries.pop(key)[1]
+
+            self._entries[key] = (value, size, stored_at or time.time())
+            self.current_bytes += size
+
+            while self.current_bytes > self.max_bytes or (
+                self.max_entries is not None and len(self._entries) > self.max_entries
+            ):
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+
+    def delete(self, key: str):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.current_bytes -= entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCacheStore:
+    """Durable key/value store shared by every cache namespace (and every worker)"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+        """)
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def get(self, namespace: str, key: str, max_age: Optional[float] = None) -> Optional[tuple]:
+        """Return (value, created_at), ignoring entries older than max_age seconds"""
+        oldest = time.time() - max_age if max_age is not None else 0
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM cache_entries WHERE namespace = ? AND key = ? AND created_at >= ?",
+                (namespace, key, oldest)
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def set(self, namespace: str, key: str, value: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (namespace, key, value, created_at) VALUES (?, ?, ?, ?)",
+                (namespace, key, value, time.time())
+            )
+            self._conn.commit()
+
+    def delete(self, namespace: str, key: str):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (namespace, key)
+            )
+            self._conn.commit()
+
+    def clear(self, namespace: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache_entries WHERE namespace = ?", (namespace,))
+            self._conn.commit()
+
+    def prune(self, namespace: str, max_entries: Optional[int] = None, max_age: Optional[float] = None):
+        """Drop expired entries and keep only the newest max_entries of a namespace"""
+        with self._lock:
+            if max_age is not None:
+                self._conn.execute(
+                    "DELETE FROM cache_entries WHERE namespace = ? AND created_at < ?",
+                    (namespace, time.time() - max_age)
+                )
+            if max_entries is not None:
+                self._conn.execute("""
+                    DELETE FROM cache_entries WHERE namespace = ? AND key NOT IN (
+                        SELECT key FROM cache_entries WHERE namespace = ?
+                        ORDER BY created_at DESC LIMIT ?
+                    )
+                """, (namespace, namespace, max_entries))
+            self._conn.commit()
+
+
+class TieredCache:
+    """JSON cache with an in-memory LRU tier in front of the SQLite store
+
+    ``ttl_seconds`` expires entries in both tiers and ``max_entries`` caps the
+    entry count of each tier (the disk tier is pruned every ``prune_every`` writes).
+    """
+
+    def __init__(self, namespace: str, store: Optional[SQLiteCacheStore] = None,
+                 max_memory_bytes: int = 32 * 1024 * 1024, max_entries: Optional[int] = None,
+                 ttl_seconds: Optional[float] = None, prune_every: int = 100):
+        self.namespace = namespace
+        self.store = store
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.prune_every = prune_every
+        self.memory = LRUCache(max_memory_bytes, max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self._writes = 0
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.memory.get(key)
+        if value is not None:
+            self.memory_hits += 1
+            return json.loads(value)
+
+        if self.store is not None:
+            try:
+                row = self.store.get(self.namespace, key, max_age=self.ttl_seconds)
+            except sqlite3.Error as e:
+                logger.warning(f"Cache read failed for {self.namespace}: {e}")
+                row = None
+
+            if row is not None:
+                value, stored_at = row
+                self.disk_hits += 1
+                self.memory.set(key, value, len(value), stored_at=stored_at)
+                return json.loads(value)
+
+        self.misses += 1
+        return None
+
+    def set(self, key: str, value: Any):
+        # Values are stored serialized so callers never share mutable state
+        serialized = json.dumps(value, separators=(",", ":"))
+        self.memory.set(key, serialized, len(serialized))
+
+        if self.store is not None:
+            try:
+                self.store.set(self.namespace, key, serialized)
+                self._writes += 1
+                if self._writes % self.prune_every == 0 and (self.max_entries or self.ttl_seconds):
+                    self.store.prune(self.namespace, max_entries=self.max_entries, max_age=self.ttl_seconds)
+            except sqlite3.Error as e:
+                logger.warning(f"Cache write failed for {self.namespace}: {e}")
+
+    def delete(self, key: str):
+        self.memory.delete(key)
+        if self.store is not None:
+            self.store.delete(self.namespace, key)
+
+    def clear(self):
+        self.memory.clear()
+        if self.store is not None:
+            self.store.clear(self.namespace)
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "namespace": self.namespace,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self.memory),
+            "memory_bytes": self.memory.current_bytes,
+        }
+
+
+_shared_store: Optional[SQLiteCacheStore] = None
+
+
+def get_cache_store() -> Optional[SQLiteCacheStore]:
+    """Shared on-disk store; set CACHE_DISABLE_DISK=1 to keep caches in memory only"""
+    global _shared_store
+    if os.getenv("CACHE_DISABLE_DISK", "0") == "1":
+        return None
+    if _shared_store is None:
+        _shared_store = SQLiteCacheStore(os.path.join(DEFAULT_CACHE_DIR, "cache.sqlite3"))
+    return _shared_store
@@ -0,0 +1,297 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+import logging
+
+import numpy as np
+
+from services.cache_store import DEFAULT_CACHE_DIR, make_cache_key
+from services.prefilter_ranker import BM25Ranker, blend_scores, resume_search_text, tokenize
+
+logger = logging.getLogger(__name__)
+
+# With CANDIDATE_INDEX=1 every successfully parsed resume is kept here so later job
+# descriptions can be matched against past applicants without re-uploading them.
+# Off by default: the index stores applicants' personal data beyond their task
+CANDIDATE_INDEX_ENABLED = os.getenv("CANDIDATE_INDEX", "0") == "1"
+CANDIDATE_INDEX_PATH = os.getenv("CANDIDATE_INDEX_PATH", os.path.join(DEFAULT_CACHE_DIR, "candidates.sqlite3"))
+# Candidates not seen again for this many days are dropped (0 keeps them forever)
+CANDIDATE_RETENTION_DAYS = float(os.getenv("CANDIDATE_RETENTION_DAYS", "90"))
+
+_TITLE_KEYS = ("title", "role", "position", "designation", "job_title")
+_EDUCATION_KEYS = ("degree", "field", "field_of_study", "major", "institution", "university", "school")
+
+
+def _as_list(value) -> list:
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _phrase(text) -> str:
+    return " ".join(tokenize(str(text)))
+
+
+def _entry_texts(entries, keys) -> List[str]:
+    """Values of ``keys`` from a list of dicts; plain strings are taken as they are"""
+    texts = []
+    for entry in _as_list(entries):
+        if isinstance(entry, dict):
+            texts.extend(str(entry[key]) for key in keys if entry.get(key))
+        elif entry:
+            texts.append(str(entry))
+    return texts
+
+
+def candidate_fields(parsed_data: Dict) -> Dict[str, Counter]:
+    """Terms indexed for one parsed resume, by field.
+
+    ``text`` is the lexical vector BM25 ranks on; ``skill`` holds whole skill
+    phrases and ``title``/``education`` the words of past titles and degrees,
+    which the rank filters match against.
+    """
+    skills = {_phrase(skill) for skill in _as_list(parsed_data.get("skills")) if not isinstance(skill, (dict, list))}
+    return {
+        "text": Counter(tokenize(resume_search_text({"parsed_data": parsed_data}))),
+        "skill": Counter(skill for skill in skills if skill),
+        "title": Counter(set(tokenize(" ".join(_entry_texts(parsed_data.get("experience"), _TITLE_KEYS))))),
+        "education": Counter(set(tokenize(" ".join(_entry_texts(parsed_data.get("education"), _EDUCATION_KEYS))))),
+    }
+
+
+def candidate_id_for(parsed_data: Dict) -> str:
+    """Same person, same id: keyed on email when the resume has one, else on the profile itself"""
+    email = str(parsed_data.get("email") or "").strip().lower()
+    if email:
+        return make_cache_key("email", email)
+    return make_cache_key("profile", json.dumps(parsed_data, sort_keys=True, default=str))
+
+
+class CandidateIndex:
+    """Parsed resumes from every past task, searchable by job description.
+
+    Each candidate's profile is stored with its term frequencies (the lexical
+    vector) in an inverted index, so ranking a new job description only reads
+    the postings of its own terms. A candidate who applies again replaces their
+    earlier profile.
+    """
+
+    def __init__(self, db_path: str = CANDIDATE_INDEX_PATH, retention_days: float = CANDIDATE_RETENTION_DAYS):
+        self.db_path = db_path
+        self.retention_days = retention_days
+        self.ranker = BM25Ranker()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS candidates (
+                candidate_id TEXT PRIMARY KEY,
+                name TEXT,
+                filename TEXT,
+                task_id TEXT,
+                parsed_data TEXT NOT NULL,
+                doc_length INTEGER NOT NULL,
+                indexed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS postings (
+                field TEXT NOT NULL,
+                term TEXT NOT NULL,
+                candidate_id TEXT NOT NULL,
+                tf INTEGER NOT NULL,
+                PRIMARY KEY (field, term, candidate_id)
+            ) WITHOUT ROWID
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_postings_candidate ON postings (candidate_id)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def add_many(self, task_id: str, parsed_resumes: Iterable[Dict]) -> int:
+        """Index the successfully parsed resumes of a task; returns how many were stored"""
+        # Keyed by candidate, so a person appearing twice in one task keeps only the last profile
+        rows, postings = {}, {}
+        for resume_data in parsed_resumes:
+            parsed_data = resume_data.get("parsed_data")
+            if not resume_data.get("parsing_success") or not isinstance(parsed_data, dict):
+                continue
+            candidate_id = candidate_id_for(parsed_data)
+            fields = candidate_fields(parsed_data)
+            rows[candidate_id] = (
+                candidate_id, str(parsed_data.get("name") or "Unknown"), resume_data.get("filename"), task_id,
+                json.dumps(parsed_data, ensure_ascii=False), sum(fields["text"].values()), time.time()
+            )
+            postings[candidate_id] = [
+                (field, term, candidate_id, tf) for field, terms in fields.items() for term, tf in terms.items()
+            ]
+        if not rows:
+            return 0
+
+        with self._lock:
+            self._conn.executemany("DELETE FROM postings WHERE candidate_id = ?", [(cid,) for cid in rows])
+            self._conn.executemany("INSERT OR REPLACE INTO candidates VALUES (?, ?, ?, ?, ?, ?, ?)", rows.values())
+            self._conn.executemany(
+                "INSERT INTO postings VALUES (?, ?, ?, ?)", [entry for entries in postings.values() for entry in entries]
+            )
+            self._conn.commit()
+        if self.retention_days > 0:
+            self.prune(self.retention_days * 86400)
+        return len(rows)
+
+    def remove(self, candidate_id: str) -> bool:
+        with self._lock:
+            self._conn.execute("DELETE FROM postings WHERE candidate_id = ?", (candidate_id,))
+            removed = self._conn.execute("DELETE FROM candidates WHERE candidate_id = ?", (candidate_id,)).rowcount
+            self._conn.commit()
+        return removed == 1
+
+    def prune(self, max_age: float):
+        with self._lock:
+            cutoff = time.time() - max_age
+            self._conn.execute(
+                "DELETE FROM postings WHERE candidate_id IN (SELECT candidate_id FROM candidates WHERE indexed_at < ?)",
+                (cutoff,)
+            )
+            self._conn.execute("DELETE FROM candidates WHERE indexed_at < ?", (cutoff,))
+            self._conn.commit()
+
+    def _matching_all(self, field: str, terms: List[str]) -> set:
+        """Candidates that have every term in ``field``"""
+        matched = None
+        for term in terms:
+            ids = {row[0] for row in self._conn.execute(
+                "SELECT candidate_id FROM postings WHERE field = ? AND term = ?", (field, term)
+            )}
+            matched = ids if matched is None else matched & ids
+            if not matched:
+                return set()
+        return matched if matched is not None else set()
+
+    def rank(self, job_description: str, top_n: int = 20, skills: Optional[List[str]] = None,
+             title: Optional[str] = None, education: Optional[str] = None,
+             include_profile: bool = False) -> List[Dict]:
+        """Best ``top_n`` stored candidates for ``job_description`` by lexical score (0-100).
+
+        ``skills`` must all be listed skills of a candidate; ``title`` and
+        ``education`` must all appear among the words of past titles / degrees.
+        """
+        # Expired profiles are dropped here too, so they go even when nothing new is indexed
+        if self.retention_days > 0:
+            self.prune(self.retention_days * 86400)
+        query_terms = sorted(set(tokenize(job_description)))
+        filters = [("skill", sorted({_phrase(skill) for skill in skills or [] if _phrase(skill)})),
+                   ("title", tokenize(title or "")), ("education", tokenize(education or ""))]
+        if not query_terms:
+            return []
+
+        with self._lock:
+            allowed = None
+            for field, terms in filters:
+                if terms:
+                    matched = self._matching_all(field, terms)
+                    allowed = matched if allowed is None else allowed & matched
+            if allowed is not None and not allowed:
+                return []
+
+            total_documents, avg_length = self._conn.execute(
+                "SELECT COUNT(*), AVG(doc_length) FROM candidates"
+            ).fetchone()
+            placeholders = ",".join("?" * len(query_terms))
+            postings = self._conn.execute(f"""
+                SELECT p.candidate_id, p.term, p.tf, c.doc_length
+                FROM postings p JOIN candidates c ON c.candidate_id = p.candidate_id
+                WHERE p.field = 'text' AND p.term IN ({placeholders})
+            """, query_terms).fetchall()
+
+        # Document frequencies come from the whole index, before any filter narrows it
+        term_index = {term: i for i, term in enumerate(query_terms)}
+        doc_freq = np.zeros(len(query_terms))
+        rows, doc_lengths, matrix = {}, [], []
+        for candidate_id, term, tf, doc_length in postings:
+            doc_freq[term_index[term]] += 1
+            if allowed is not None and candidate_id not in allowed:
+                continue
+            row = rows.get(candidate_id)
+            if row is None:
+                row = rows[candidate_id] = len(matrix)
+                matrix.append(np.zeros(len(query_terms)))
+                doc_lengths.append(doc_length)
+            matrix[row][term_index[term]] = tf
+        if not rows:
+            return []
+
+        tf = np.vstack(matrix)
+        raw = self.ranker.score_matrix(tf, np.array(doc_lengths, dtype=np.float64), doc_freq,
+                                       total_documents, avg_length)
+        scores = blend_scores(np.count_nonzero(tf, axis=1) / len(query_terms), raw)
+        candidate_ids = list(rows)
+        top = np.argsort(-scores, kind="stable")[:top_n]
+        return self._describe(
+            [(candidate_ids[i], float(scores[i])) for i in top], job_description, include_profile
+        )
+
+    def _describe(self, ranked: List[tuple], job_description: str, include_profile: bool) -> List[Dict]:
+        ids = [candidate_id for candidate_id, _ in ranked]
+        placeholders = ",".join("?" * len(ids))
+        with self._lock:
+            details = {row[0]: row for row in self._conn.execute(
+                f"SELECT candidate_id, name, filename, task_id, parsed_data, indexed_at "
+                f"FROM candidates WHERE candidate_id IN ({placeholders})", ids
+            )}
+            skills = {}
+            for candidate_id, skill in self._conn.execute(
+                f"SELECT candidate_id, term FROM postings WHERE field = 'skill' AND candidate_id IN ({placeholders})",
+                ids
+            ):
+                skills.setdefault(candidate_id, []).append(skill)
+
+        query = f" {_phrase(job_description)} "
+        candidates = []
+        for candidate_id, score in ranked:
+            _, name, filename, task_id, parsed_data, indexed_at = details[candidate_id]
+            candidate = {
+                "candidate_id": candidate_id,
+                "candidate_name": name,
+                "filename": filename,
+                "task_id": task_id,
+                "indexed_at": datetime.fromtimestamp(indexed_at).isoformat(),
+                "match_score": score,
+                "matched_skills": sorted(skill for skill in skills.get(candidate_id, []) if f" {skill} " in query),
+            }
+            if include_profile:
+                candidate["parsed_data"] = json.loads(parsed_data)
+            candidates.append(candidate)
+        return candidates
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, oldest, newest = self._conn.execute(
+                "SELECT COUNT(*), MIN(indexed_at), MAX(indexed_at) FROM candidates"
+            ).fetchone()
+            terms = self._conn.execute(
+                "SELECT COUNT(DISTINCT term) FROM postings WHERE field = 'text'"
+            ).fetchone()[0]
+        return {
+            "enabled": CANDIDATE_INDEX_ENABLED,
+            "candidates": count,
+            "terms": terms,
+            "oldest_indexed_at": datetime.fromtimestamp(oldest).isoformat() if oldest else None,
+            "newest_indexed_at": datetime.fromtimestamp(newest).isoformat() if newest else None,
+            "retention_days": self.retention_days or None,
+        }
+
+
+_candidate_index: Optional[CandidateIndex] = None
+
+
+def get_candidate_index() -> CandidateIndex:
+    global _candidate_index
+    if _candidate_index is None:
+        _candidate_index = CandidateIndex()
+    return _candidate_index
@@ -1,23 +1,168 @@
+import asyncio
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+import logging
+
 import google.generativeai as genai
 from dotenv import load_dotenv
 
+from services.metrics import get_metrics_registry
+from services.rate_limiter import TokenBucketRateLimiter, get_shared_rate_limiter
+from services.resilience import ResilientCaller
+
+logger = logging.getLogger(__name__)
 load_dotenv()
 
+DEFAULT_MODEL_NAME = os.getenv("GEMINI_MODEL", "gemini-2.5-pro")
+# Each pipeline stage can use its own model, e.g. GEMINI_PARSE_MODEL=gemini-2.5-flash
+# for structured extraction while scoring stays on the pro model
+STAGE_MODEL_NAMES = {
+    "parse": os.getenv("GEMINI_PARSE_MODEL", DEFAULT_MODEL_NAME),
+    "score": os.getenv("GEMINI_SCORE_MODEL", DEFAULT_MODEL_NAME),
+    "jd": os.getenv("GEMINI_JD_MODEL", os.getenv("GEMINI_PARSE_MODEL", DEFAULT_MODEL_NAME)),
+}
+# "grpc" (SDK default) or "rest"
+GEMINI_TRANSPORT = os.getenv("GEMINI_TRANSPORT") or None
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+
+GEMINI_REQUESTS = get_metrics_registry().counter("gemini_requests_total", "Gemini API attempts, by stage and outcome")
+GEMINI_REQUEST_SECONDS = get_metrics_registry().histogram(
+    "gemini_request_seconds", "Duration of one Gemini API attempt, excluding rate-limit waits"
+)
+GEMINI_TOKENS = get_metrics_registry().counter("gemini_tokens_total", "Tokens billed by Gemini, by stage and kind")
+
+
 class GeminiClient:
-    def __init__(self):
-        api_key = os.getenv("GOOGLE_API_KEY")
+    """Process-wide access point for Gemini calls.
+
+    Nothing is configured until the first request: the SDK is configured once,
+    one ``GenerativeModel`` is kept per model name (so the underlying connection
+    is reused), blocking calls share one worker pool and every call goes through
+    the shared rate limiter. Constructing parsers and scorers is therefore free,
+    and the app imports without credentials.
+
+    Transient and quota errors are retried by ``resilience``; errors that
+    survive it are raised, never replaced by a default result.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, rate_limiter: Optional[TokenBucketRateLimiter] = None,
+                 stage_models: Optional[Dict[str, str]] = None, max_concurrency: Optional[int] = None,
+                 transport: Optional[str] = GEMINI_TRANSPORT, resilience: Optional[ResilientCaller] = None):
+        self.api_key = api_key
+        self.rate_limiter = rate_limiter or get_shared_rate_limiter()
+        self.stage_models = dict(STAGE_MODEL_NAMES, **(stage_models or {}))
+        self.max_concurrency = max_concurrency or DEFAULT_MAX_CONCURRENCY
+        self.transport = transport
+        self.resilience = resilience or ResilientCaller()
+        self.generation_config = genai.GenerationConfig(
+            response_mime_type="application/json",
+            temperature=0.1
+        )
+
+        self._models: Dict[str, genai.GenerativeModel] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._configured = False
+        self._lock = threading.Lock()
+
+    def model_name(self, stage: str) -> str:
+        return self.stage_models.get(stage, DEFAULT_MODEL_NAME)
+
+    def _configure(self):
+        api_key = self.api_key or os.getenv("GOOGLE_API_KEY")
         if not api_key:
             raise ValueError("GOOGLE_API_KEY not found in environment variables.")
 
-        genai.configure(api_key=api_key)
+        options = {"api_key": api_key}
+        if self.transport:
+            options["transport"] = self.transport
+        genai.configure(**options)
+        self._configured = True
+
+    def model(self, stage: str) -> genai.GenerativeModel:
+        """The shared model for a stage, created on first use"""
+        name = self.model_name(stage)
+        model = self._models.get(name)
+        if model is None:
+            with self._lock:
+                if not self._configured:
+                    self._configure()
+                model = self._models.get(name)
+                if model is None:
+                    logger.info(f"Initialising Gemini model {name}")
+                    model = self._models[name] = genai.GenerativeModel(name)
+        return model
 
-        # Correct model name, no prefix
-        self.model = genai.GenerativeModel("gemini-2.5-pro")
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_concurrency, thread_name_prefix="gemini"
+                    )
+        return self._executor
+
+    def _generate_once(self, stage: str, prompt: str, estimated_tokens: Optional[int], prefix: Optional[str] = None):
+        started = time.monotonic()
+        try:
+            contents = prefix + prompt if prefix else prompt
+            response = self.model(stage).generate_content(contents, generation_config=self.generation_config)
+        except Exception as e:
+            GEMINI_REQUESTS.inc(stage=stage, outcome=type(e).__name__)
+            raise
+        finally:
+            GEMINI_REQUEST_SECONDS.observe(time.monotonic() - started, stage=stage)
+
+        GEMINI_REQUESTS.inc(stage=stage, outcome="success")
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None:
+            GEMINI_TOKENS.inc(getattr(usage, "prompt_token_count", 0) or 0, stage=stage, kind="prompt")
+            GEMINI_TOKENS.inc(getattr(usage, "candidates_token_count", 0) or 0, stage=stage, kind="output")
+            # Prompt tokens served from the API's implicit prefix cache
+            GEMINI_TOKENS.inc(getattr(usage, "cached_content_token_count", 0) or 0, stage=stage, kind="cached")
+        if estimated_tokens is not None:
+            self.rate_limiter.record_response(estimated_tokens, response)
+        return response
+
+    async def generate_async(self, stage: str, prompt: str, estimated_tokens: int, prefix: Optional[str] = None):
+        """Rate-limited, retried (and optionally hedged) call run on the worker pool.
+
+        ``prefix`` is the part of the prompt shared by many requests. It is sent
+        first so the API's implicit prefix caching can reuse it; the compact job
+        profile is far below the minimum size of an explicit context cache.
+        """
+        async def attempt():
+            # Every attempt, retry or hedge, is a real request against the quota
+            await self.rate_limiter.acquire(estimated_tokens)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self.executor, self._generate_once, stage, prompt, estimated_tokens, prefix
+            )
+
+        return await self.resilience.call(attempt, label=stage)
+
+    def quota_status(self) -> dict:
+        status = self.rate_limiter.quota_status()
+        status["resilience"] = self.resilience.status()
+        return status
 
     def test_connection(self):
         try:
-            response = self.model.generate_content("Say hello!")
+            response = self.model("score").generate_content("Say hello!")
             return response.text
         except Exception as e:
             return f"Error connecting to Gemini API: {str(e)}"
+
+
+_gemini_client: Optional[GeminiClient] = None
+
+
+def get_gemini_client() -> GeminiClient:
+    """Shared client used by every parser and scorer in the process"""
+    global _gemini_client
+    if _gemini_client is None:
+        _gemini_client = GeminiClient()
+    return _gemini_client
@@ -0,0 +1,116 @@
+import asyncio
+import os
+import time
+from datetime import datetime
+from typing import Optional
+import logging
+
+from services.s3_service import get_s3_uploader
+
+logger = logging.getLogger(__name__)
+
+S3_HEALTH_INTERVAL_SECONDS = float(os.getenv("S3_HEALTH_INTERVAL_SECONDS", "60"))
+S3_HEALTH_TTL_SECONDS = float(os.getenv("S3_HEALTH_TTL_SECONDS", "180"))
+# The full write/delete probe costs two S3 writes; head_bucket is enough by default
+S3_HEALTH_WRITE_PROBE = os.getenv("S3_HEALTH_WRITE_PROBE", "0") == "1"
+
+
+class S3HealthMonitor:
+    """Probes S3 periodically in the background and caches the outcome.
+
+    Request handlers only read the cached state; they never talk to S3 to
+    find out whether it is reachable.
+    """
+
+    def __init__(self, interval: float = S3_HEALTH_INTERVAL_SECONDS, ttl: float = S3_HEALTH_TTL_SECONDS,
+                 write_probe: bool = S3_HEALTH_WRITE_PROBE):
+        self.interval = interval
+        self.ttl = ttl
+        self.write_probe = write_probe
+
+        self._healthy: Optional[bool] = None
+        self._checked_at: Optional[float] = None
+        self._error: Optional[str] = None
+        self._latency_ms: Optional[float] = None
+
+        self._task: Optional[asyncio.Task] = None
+        self._refreshing: Optional[asyncio.Task] = None
+
+    def probe(self):
+        """Blocking connectivity check; raises on failure"""
+        uploader = get_s3_uploader()
+        if self.write_probe:
+            if not uploader.test_s3_connection():
+                raise RuntimeError("S3 write/delete probe failed")
+        else:
+            uploader.s3.head_bucket(Bucket=uploader.bucket)
+
+    async def refresh(self) -> bool:
+        started = time.monotonic()
+        try:
+            await asyncio.to_thread(self.probe)
+            self._healthy, self._error = True, None
+        except Exception as e:
+            if self._healthy is not False:
+                logger.warning(f"S3 health probe failed: {e}")
+            self._healthy, self._error = False, str(e)
+
+        self._latency_ms = round((time.monotonic() - started) * 1000, 1)
+        self._checked_at = time.time()
+        return self._healthy
+
+    def refresh_in_background(self):
+        """Schedule a probe without waiting for it (at most one in flight)"""
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.create_task(self.refresh())
+
+    def is_stale(self) -> bool:
+        return self._checked_at is None or time.time() - self._checked_at > self.ttl
+
+    def is_available(self) -> bool:
+        """False only when a fresh probe has positively failed.
+
+        Unknown or stale state does not block requests; it triggers a probe instead.
+        """
+        if self.is_stale():
+            self.refresh_in_background()
+            return True
+        return bool(self._healthy)
+
+    def status(self) -> dict:
+        return {
+            "healthy": self._healthy,
+            "stale": self.is_stale(),
+            "checked_at": datetime.fromtimestamp(self._checked_at).isoformat() if self._checked_at else None,
+            "latency_ms": self._latency_ms,
+            "error": self._error,
+            "probe": "write" if self.write_probe else "head_bucket",
+        }
+
+    async def _run(self):
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+_s3_health_monitor: Optional[S3HealthMonitor] = None
+
+
+def get_s3_health_monitor() -> S3HealthMonitor:
+    global _s3_health_monitor
+    if _s3_health_monitor is None:
+        _s3_health_monitor = S3HealthMonitor()
+    return _s3_health_monitor
@@ -0,0 +1,130 @@
+import asyncio
+import json
+import os
+import time
+from typing import Dict, Optional
+import logging
+
+from services.cache_store import TieredCache, get_cache_store, make_cache_key
+from services.gemini_client import GeminiClient, get_gemini_client
+from services.rate_limiter import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+JD_PROFILE_PROMPT_TEMPLATE = """
+You are a recruiter preparing a job description for screening. Extract a compact requirements profile from it.
+
+JOB DESCRIPTION:
+{job_description}
+
+Instructions:
+- Keep only what a screener needs; drop company boilerplate, benefits and legal text.
+- Skills are short canonical names (e.g. "Python", "AWS", "Kubernetes").
+- Omit fields the job description does not mention.
+
+Return only a JSON object in this exact format:
+{{
+  "role": "...",
+  "seniority": "junior/mid/senior/lead",
+  "must_have_skills": ["..."],
+  "nice_to_have_skills": ["..."],
+  "min_years_experience": 3,
+  "education": "...",
+  "key_responsibilities": ["..."]
+}}
+"""
+
+JD_PROFILE_PROMPT_VERSION = make_cache_key(JD_PROFILE_PROMPT_TEMPLATE)[:16]
+ESTIMATED_JD_PROFILE_OUTPUT_TOKENS = 400
+
+# "auto" profiles job descriptions longer than JD_PROFILE_MIN_TOKENS, "always" every one, "off" none
+JD_PROFILE_MODE = os.getenv("JD_PROFILE_MODE", "auto").lower()
+JD_PROFILE_MIN_TOKENS = int(os.getenv("JD_PROFILE_MIN_TOKENS", "300"))
+# After a failed attempt the description is used verbatim for this long before profiling is retried
+JD_PROFILE_RETRY_SECONDS = 600
+
+_jd_profile_cache: Optional[TieredCache] = None
+
+
+def get_jd_profile_cache() -> TieredCache:
+    """Requirements profiles keyed by job description hash, shared across tasks"""
+    global _jd_profile_cache
+    if _jd_profile_cache is None:
+        _jd_profile_cache = TieredCache("jd_profiles", store=get_cache_store(), max_memory_bytes=4 * 1024 * 1024)
+    return _jd_profile_cache
+
+
+class JobDescriptionProfiler:
+    """Turns a job description into the requirements block scoring prompts start with.
+
+    Each distinct job description is profiled by Gemini once: the result is
+    cached by hash, and concurrent callers for the same description share one
+    request. Short descriptions, and any that fail to profile, are used verbatim.
+    """
+
+    def __init__(self, client: Optional[GeminiClient] = None, cache: Optional[TieredCache] = None,
+                 mode: str = JD_PROFILE_MODE, min_tokens: int = JD_PROFILE_MIN_TOKENS):
+        self.client = client or get_gemini_client()
+        self.cache = cache if cache is not None else get_jd_profile_cache()
+        self.mode = mode
+        self.min_tokens = min_tokens
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._failed_at: Dict[str, float] = {}
+
+    def wants_profile(self, job_description: str) -> bool:
+        if self.mode == "off":
+            return False
+        return self.mode == "always" or estimate_tokens(job_description) > self.min_tokens
+
+    def cache_key(self, job_description: str) -> str:
+        return make_cache_key(
+            self.client.model_name("jd"), JD_PROFILE_PROMPT_VERSION, " ".join(job_description.split())
+        )
+
+    async def profile(self, job_description: str) -> Optional[dict]:
+        """Requirements profile for ``job_description``, or None to use it verbatim"""
+        if not self.wants_profile(job_description):
+            return None
+
+        key = self.cache_key(job_description)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        if time.monotonic() - self._failed_at.get(key, float("-inf")) < JD_PROFILE_RETRY_SECONDS:
+            return None
+
+        pending = self._in_flight.get(key)
+        if pending is None:
+            # The request runs as its own task, so a caller that is cancelled only stops
+            # waiting for it; the other callers still get the profile
+            pending = self._in_flight[key] = asyncio.ensure_future(self._profile_and_cache(key, job_description))
+            pending.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return await asyncio.shield(pending)
+
+    async def _profile_and_cache(self, key: str, job_description: str) -> Optional[dict]:
+        try:
+            profile = await self._profile_with_gemini(job_description)
+        except Exception as e:
+            logger.warning(f"Could not profile the job description, scoring against it verbatim: {e}")
+            self._failed_at[key] = time.monotonic()
+            return None
+        self.cache.set(key, profile)
+        return profile
+
+    async def _profile_with_gemini(self, job_description: str) -> dict:
+        prompt = JD_PROFILE_PROMPT_TEMPLATE.format(job_description=job_description)
+        response = await self.client.generate_async(
+            "jd", prompt, estimate_tokens(prompt) + ESTIMATED_JD_PROFILE_OUTPUT_TOKENS
+        )
+        profile = json.loads(response.text)
+        if not isinstance(profile, dict) or not (profile.get("must_have_skills") or profile.get("role")):
+            raise ValueError("response is not a requirements profile")
+        return profile
+
+    async def requirements(self, job_description: str) -> str:
+        """Text placed in the JOB REQUIREMENTS section of every scoring prompt"""
+        profile = await self.profile(job_description)
+        if profile is None:
+            return job_description.strip()
+        return json.dumps(profile, separators=(",", ":"), ensure_ascii=False)
+
@@ -0,0 +1,221 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+import logging
+
+from services.cache_store import DEFAULT_CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+# "inline" runs scoring tasks in the API process (FastAPI BackgroundTasks);
+# "queue" hands them to worker processes through the job queue below
+TASK_EXECUTOR = os.getenv("TASK_EXECUTOR", "inline").lower()
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", os.path.join(DEFAULT_CACHE_DIR, "jobs.sqlite3"))
+# Jobs running at once across every worker process, and per tenant (0 = no per-tenant cap)
+JOB_QUEUE_MAX_RUNNING = int(os.getenv("JOB_QUEUE_MAX_RUNNING", "4"))
+JOB_QUEUE_MAX_RUNNING_PER_TENANT = int(os.getenv("JOB_QUEUE_MAX_RUNNING_PER_TENANT", "0"))
+# A running job whose worker stops renewing its lease for this long is taken back
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+# Claims of one job before it is given up on (a crash mid-job counts as an attempt)
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+FINISHED_JOB_TTL_SECONDS = float(os.getenv("FINISHED_JOB_TTL_SECONDS", str(24 * 3600)))
+
+
+class SQLiteJobQueue:
+    """Durable job queue shared by the API process and every worker on the host.
+
+    Workers claim jobs under a lease they keep renewing. Claims respect a global
+    cap on running jobs and pick the queued job of the tenant with the fewest
+    jobs running (oldest first among equals), so one large submitter cannot
+    starve the others. Jobs whose lease expires are requeued, or failed once
+    they have used up their attempts.
+    """
+
+    def __init__(self, db_path: str = JOB_QUEUE_PATH, max_running: int = JOB_QUEUE_MAX_RUNNING,
+                 max_running_per_tenant: int = JOB_QUEUE_MAX_RUNNING_PER_TENANT,
+                 max_attempts: int = JOB_MAX_ATTEMPTS):
+        self.db_path = db_path
+        self.max_running = max(1, max_running)
+        self.max_running_per_tenant = max_running_per_tenant
+        self.max_attempts = max(1, max_attempts)
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                tenant TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                worker_id TEXT,
+                lease_expires_at REAL,
+                enqueued_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                error TEXT
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, enqueued_at)")
+        self._lock = threading.Lock()
+
+    def _transaction(self, work):
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so two workers can never claim the same job
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = work(self._conn)
+                self._conn.execute("COMMIT")
+                return result
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def enqueue(self, job_id: str, tenant: str, payload: dict):
+        self._transaction(lambda conn: conn.execute(
+            "INSERT INTO jobs (job_id, tenant, payload, status, enqueued_at) VALUES (?, ?, ?, 'queued', ?)",
+            (job_id, tenant, json.dumps(payload), time.time())
+        ))
+
+    def claim(self, worker_id: str, lease_seconds: float = JOB_LEASE_SECONDS) -> Optional[dict]:
+        """Lease the next job for ``worker_id``, or None if nothing may start now"""
+        def work(conn):
+            running = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'running'").fetchone()[0]
+            if running >= self.max_running:
+                return None
+
+            row = conn.execute("""
+                SELECT q.job_id, q.tenant, q.payload, q.attempts, q.enqueued_at,
+                       (SELECT COUNT(*) FROM jobs r WHERE r.status = 'running' AND r.tenant = q.tenant) AS tenant_running
+                FROM jobs q
+                WHERE q.status = 'queued'
+                  AND (? <= 0 OR (SELECT COUNT(*) FROM jobs r
+                                  WHERE r.status = 'running' AND r.tenant = q.tenant) < ?)
+                ORDER BY tenant_running, q.enqueued_at
+                LIMIT 1
+            """, (self.max_running_per_tenant, self.max_running_per_tenant)).fetchone()
+            if row is None:
+                return None
+
+            job_id, tenant, payload, attempts, enqueued_at, _ = row
+            now = time.time()
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker_id = ?, attempts = attempts + 1, "
+                "lease_expires_at = ?, started_at = ? WHERE job_id = ?",
+                (worker_id, now + lease_seconds, now, job_id)
+            )
+            return {
+                "job_id": job_id,
+                "tenant": tenant,
+                "payload": json.loads(payload),
+                "attempt": attempts + 1,
+                "queued_seconds": now - enqueued_at,
+            }
+
+        return self._transaction(work)
+
+    def renew(self, job_id: str, worker_id: str, lease_seconds: float = JOB_LEASE_SECONDS) -> bool:
+        """Extend a lease; False means the job is no longer ours"""
+        cursor = self._transaction(lambda conn: conn.execute(
+            "UPDATE jobs SET lease_expires_at = ? WHERE job_id = ? AND worker_id = ? AND status = 'running'",
+            (time.time() + lease_seconds, job_id, worker_id)
+        ))
+        return cursor.rowcount == 1
+
+    def finish(self, job_id: str, worker_id: str, error: Optional[str] = None):
+        self._transaction(lambda conn: conn.execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, error = ?, lease_expires_at = NULL "
+            "WHERE job_id = ? AND worker_id = ? AND status = 'running'",
+            ("failed" if error else "done", time.time(), error, job_id, worker_id)
+        ))
+
+    def recover(self, worker_id: Optional[str] = None) -> Dict[str, List[str]]:
+        """Take back jobs whose lease expired, or every running job of ``worker_id``.
+
+        Returns the ids that were requeued and those failed for good.
+        """
+        def work(conn):
+            if worker_id is None:
+                rows = conn.execute(
+                    "SELECT job_id, attempts FROM jobs WHERE status = 'running' AND lease_expires_at < ?",
+                    (time.time(),)
+                ).fetchall()
+            else:
+                rows = conn.execute(
+                    "SELECT job_id, attempts FROM jobs WHERE status = 'running' AND worker_id = ?", (worker_id,)
+                ).fetchall()
+
+            recovered = {"requeued": [], "failed": []}
+            for job_id, attempts in rows:
+                if attempts >= self.max_attempts:
+                    conn.execute(
+                        "UPDATE jobs SET status = 'failed', finished_at = ?, lease_expires_at = NULL, error = ? "
+                        "WHERE job_id = ?",
+                        (time.time(), f"Worker lost the job {attempts} times", job_id)
+                    )
+                    recovered["failed"].append(job_id)
+                else:
+                    conn.execute(
+                        "UPDATE jobs SET status = 'queued', worker_id = NULL, lease_expires_at = NULL "
+                        "WHERE job_id = ?",
+                        (job_id,)
+                    )
+                    recovered["requeued"].append(job_id)
+
+            conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+                (time.time() - FINISHED_JOB_TTL_SECONDS,)
+            )
+            return recovered
+
+        recovered = self._transaction(work)
+        if recovered["requeued"] or recovered["failed"]:
+            logger.warning(
+                f"Recovered abandoned jobs: {len(recovered['requeued'])} requeued, "
+                f"{len(recovered['failed'])} failed"
+            )
+        return recovered
+
+    def position(self, job_id: str) -> Optional[int]:
+        """Approximate 1-based place of a queued job (FIFO order, before fair sharing), None once started"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT enqueued_at FROM jobs WHERE job_id = ? AND status = 'queued'", (job_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND enqueued_at <= ?", (row[0],)
+            ).fetchone()[0]
+
+    def stats(self) -> dict:
+        with self._lock:
+            by_status = dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            tenants = self._conn.execute("""
+                SELECT tenant, SUM(status = 'queued'), SUM(status = 'running')
+                FROM jobs WHERE status IN ('queued', 'running') GROUP BY tenant
+            """).fetchall()
+            oldest = self._conn.execute("SELECT MIN(enqueued_at) FROM jobs WHERE status = 'queued'").fetchone()[0]
+        return {
+            "queued": by_status.get("queued", 0),
+            "running": by_status.get("running", 0),
+            "done": by_status.get("done", 0),
+            "failed": by_status.get("failed", 0),
+            "max_running": self.max_running,
+            "oldest_queued_seconds": round(time.time() - oldest, 1) if oldest else None,
+            "tenants": {tenant: {"queued": queued, "running": running} for tenant, queued, running in tenants},
+        }
+
+
+_job_queue: Optional[SQLiteJobQueue] = None
+
+
+def get_job_queue() -> SQLiteJobQueue:
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = SQLiteJobQueue()
+    return _job_queue
@@ -0,0 +1,209 @@
+import asyncio
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+import logging
+
+from services.job_queue import JOB_LEASE_SECONDS, SQLiteJobQueue, get_job_queue
+from services.task_events import get_task_event_broker
+from services.task_store import get_task_store
+from services.upload_spool import cleanup_spool, task_spool_dir
+
+logger = logging.getLogger(__name__)
+
+# Worker processes the API starts and supervises. Off by default: run `python -m worker`
+# next to the API instead, since every uvicorn worker would start its own set
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "0"))
+# Jobs one worker process runs at once (JOB_QUEUE_MAX_RUNNING caps all of them together)
+JOB_WORKER_CONCURRENCY = int(os.getenv("JOB_WORKER_CONCURRENCY", "2"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "0.5"))
+# On shutdown, running jobs get this long to finish before they are handed back to the queue
+JOB_SHUTDOWN_GRACE_SECONDS = float(os.getenv("JOB_SHUTDOWN_GRACE_SECONDS", "10"))
+
+JobRunner = Callable[..., Awaitable[None]]
+
+
+def worker_id_for(pid: int) -> str:
+    return f"{socket.gethostname()}:{pid}"
+
+
+def settle_recovered(recovered: Dict[str, List[str]]):
+    """Reflect requeued and abandoned jobs in the task store and end their event streams"""
+    task_store = get_task_store()
+    task_events = get_task_event_broker()
+    for task_id in recovered["requeued"]:
+        task_store.update(task_id, status="queued")
+    for task_id in recovered["failed"]:
+        error = "Processing was interrupted too many times"
+        task_store.update(task_id, status="failed", error=error, failed_at=datetime.now().isoformat())
+        task_events.publish(task_id, "failed", {"error": error})
+        task_events.close(task_id)
+        cleanup_spool(task_spool_dir(task_id))
+
+
+class JobWorker:
+    """Claims jobs from the queue and runs them on this process's event loop.
+
+    The lease of every running job is renewed in the background; a worker that
+    dies stops renewing and its jobs are requeued by whichever worker notices.
+    """
+
+    def __init__(self, runner: JobRunner, queue: Optional[SQLiteJobQueue] = None,
+                 concurrency: int = JOB_WORKER_CONCURRENCY, lease_seconds: float = JOB_LEASE_SECONDS,
+                 poll_interval: float = JOB_POLL_SECONDS):
+        self.runner = runner
+        self.queue = queue or get_job_queue()
+        self.concurrency = max(1, concurrency)
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.worker_id = worker_id_for(os.getpid())
+
+        self._running: Dict[str, asyncio.Task] = {}
+        self._stopping: Optional[asyncio.Event] = None
+
+    async def _renew_lease(self, job_id: str):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            if not await asyncio.to_thread(self.queue.renew, job_id, self.worker_id, self.lease_seconds):
+                logger.warning(f"Lost the lease on job {job_id}; another worker may run it again")
+                return
+
+    async def _run_job(self, job: dict):
+        job_id = job["job_id"]
+        logger.info(
+            f"Worker {self.worker_id} starting job {job_id} for tenant {job['tenant']} "
+            f"(attempt {job['attempt']}, queued {job['queued_seconds']:.1f}s)"
+        )
+        renewer = asyncio.create_task(self._renew_lease(job_id))
+        error = None
+        try:
+            await self.runner(**job["payload"])
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {e}")
+            error = str(e)
+        finally:
+            renewer.cancel()
+        await asyncio.to_thread(self.queue.finish, job_id, self.worker_id, error)
+
+    async def _recover_expired(self):
+        await asyncio.to_thread(lambda: settle_recovered(self.queue.recover()))
+
+    async def run(self):
+        self._stopping = asyncio.Event()
+        logger.info(f"Job worker {self.worker_id} started (concurrency {self.concurrency})")
+        last_recovery = 0.0
+        while not self._stopping.is_set():
+            if time.monotonic() - last_recovery > self.lease_seconds / 2:
+                await self._recover_expired()
+                last_recovery = time.monotonic()
+
+            job = None
+            if len(self._running) < self.concurrency:
+                job = await asyncio.to_thread(self.queue.claim, self.worker_id, self.lease_seconds)
+            if job is not None:
+                task = asyncio.create_task(self._run_job(job))
+                self._running[job["job_id"]] = task
+                task.add_done_callback(lambda _, job_id=job["job_id"]: self._running.pop(job_id, None))
+                continue
+
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+        if self._running:
+            logger.info(f"Waiting up to {JOB_SHUTDOWN_GRACE_SECONDS:g}s for {len(self._running)} running job(s)")
+            _, unfinished = await asyncio.wait(list(self._running.values()), timeout=JOB_SHUTDOWN_GRACE_SECONDS)
+            for task in unfinished:
+                task.cancel()
+            await asyncio.gather(*unfinished, return_exceptions=True)
+        # Whatever was still running goes back to the queue with its spooled files intact
+        await asyncio.to_thread(lambda: settle_recovered(self.queue.recover(self.worker_id)))
+
+    def stop(self):
+        if self._stopping is not None:
+            self._stopping.set()
+
+
+class JobWorkerPool:
+    """Starts worker processes next to the API and restarts any that exit.
+
+    Only for a single-process API (JOB_WORKERS > 0); with ``uvicorn --workers``
+    run the job workers as their own processes.
+    """
+
+    def __init__(self, size: int = JOB_WORKERS, queue: Optional[SQLiteJobQueue] = None,
+                 check_interval: float = 5.0):
+        self.size = size
+        self.queue = queue or get_job_queue()
+        self.check_interval = check_interval
+        self._processes: List[subprocess.Popen] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def _spawn(self) -> subprocess.Popen:
+        backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        process = subprocess.Popen([sys.executable, "-m", "worker"], cwd=backend_dir)
+        logger.info(f"Started job worker process {process.pid}")
+        return process
+
+    def _reap(self, process: subprocess.Popen):
+        settle_recovered(self.queue.recover(worker_id_for(process.pid)))
+
+    async def _supervise(self):
+        while True:
+            await asyncio.sleep(self.check_interval)
+            for index, process in enumerate(self._processes):
+                if process.poll() is not None:
+                    logger.warning(f"Job worker {process.pid} exited with {process.returncode}; restarting it")
+                    await asyncio.to_thread(self._reap, process)
+                    self._processes[index] = self._spawn()
+
+    def start(self):
+        if self.size <= 0 or self._task is not None:
+            return
+        self._processes = [self._spawn() for _ in range(self.size)]
+        self._task = asyncio.create_task(self._supervise())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        for process in self._processes:
+            if process.poll() is None:
+                process.send_signal(signal.SIGTERM)
+        for process in self._processes:
+            try:
+                await asyncio.to_thread(process.wait, JOB_SHUTDOWN_GRACE_SECONDS + 5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                await asyncio.to_thread(process.wait)
+            await asyncio.to_thread(self._reap, process)
+        self._processes = []
+
+    def status(self) -> dict:
+        return {
+            "processes": [
+                {"pid": process.pid, "alive": process.poll() is None} for process in self._processes
+            ]
+        }
+
+
+_job_worker_pool: Optional[JobWorkerPool] = None
+
+
+def get_job_worker_pool() -> JobWorkerPool:
+    global _job_worker_pool
+    if _job_worker_pool is None:
+        _job_worker_pool = JobWorkerPool()
+    return _job_worker_pool
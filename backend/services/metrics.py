@@ -0,0 +1,259 @@
+import asyncio
+import bisect
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Seconds; spans a cache hit (~ms) up to a throttled Gemini call (minutes)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in items]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        # label key -> (per-bucket counts, sum, count)
+        self._values: Dict[LabelKey, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            if index < len(self.buckets):
+                state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, (list(state[0]), state[1], state[2])) for key, state in self._values.items()]
+
+        lines = []
+        for key, (bucket_counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(key, ('le', _format_value(bound)))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, ('le', '+Inf'))} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(round(total, 6))}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+class MetricCallback:
+    """Metric read at scrape time from state another service already keeps (cache stats, quota)"""
+
+    def __init__(self, name: str, documentation: str, read: Callable[[], Dict[LabelKey, float]],
+                 kind: str = "gauge"):
+        self.name = name
+        self.documentation = documentation
+        self.read = read
+        self.kind = kind
+
+    def samples(self) -> List[str]:
+        try:
+            values = self.read()
+        except Exception as e:
+            logger.warning(f"Could not read metric {self.name}: {e}")
+            return []
+        return [f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in values.items()]
+
+
+class MetricsRegistry:
+    """Process-wide metrics rendered in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str) -> Counter:
+        return self._register(Counter(name, documentation))
+
+    def histogram(self, name: str, documentation: str, buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, buckets))
+
+    def callback(self, name: str, documentation: str, read: Callable[[], Dict[LabelKey, float]],
+                 kind: str = "gauge") -> MetricCallback:
+        return self._register(MetricCallback(name, documentation, read, kind))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+_registry: Optional[MetricsRegistry] = None
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    global _registry
+    if _registry is None:
+        _registry = MetricsRegistry()
+    return _registry
+
+
+def labels(**values) -> LabelKey:
+    """Label key for MetricCallback readers"""
+    return _label_key(values)
+
+
+STAGE_SECONDS = get_metrics_registry().histogram(
+    "resume_stage_seconds", "Time one resume spent being processed by a pipeline stage"
+)
+QUEUE_WAIT_SECONDS = get_metrics_registry().histogram(
+    "resume_queue_wait_seconds", "Time one resume waited for a worker before a pipeline stage"
+)
+STAGE_ITEMS = get_metrics_registry().counter(
+    "resume_stage_items_total", "Resumes that left a pipeline stage, by outcome"
+)
+TASKS = get_metrics_registry().counter("resume_tasks_total", "Background scoring tasks, by final status")
+
+
+class StageTimer:
+    """Timings for one task: per-stage aggregates plus each resume's own timings.
+
+    Per-resume timings are keyed by ``upload_id``, since filenames need not be
+    unique within a batch. Every observation also feeds the process-wide
+    histograms behind ``/metrics``.
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, dict] = {}
+        self.items: Dict[int, Dict[str, float]] = {}
+
+    def _aggregate(self, name: str, seconds: float, upload_id: Optional[int]):
+        stage = self.stages.setdefault(name, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+        stage["count"] += 1
+        stage["total_seconds"] += seconds
+        stage["max_seconds"] = max(stage["max_seconds"], seconds)
+        if upload_id is not None:
+            self.items.setdefault(upload_id, {})[f"{name}_seconds"] = round(seconds, 4)
+
+    def observe(self, stage: str, seconds: float, upload_id: Optional[int] = None, outcome: str = "success"):
+        STAGE_SECONDS.observe(seconds, stage=stage)
+        STAGE_ITEMS.inc(stage=stage, outcome=outcome)
+        self._aggregate(stage, seconds, upload_id)
+
+    def observe_wait(self, stage: str, seconds: float, upload_id: Optional[int] = None):
+        QUEUE_WAIT_SECONDS.observe(seconds, stage=stage)
+        self._aggregate(f"{stage}_queue_wait", seconds, upload_id)
+
+    def item_timings(self, upload_id: int) -> Dict[str, float]:
+        return dict(self.items.get(upload_id, {}))
+
+    def summary(self) -> Dict[str, dict]:
+        return {
+            name: {
+                "count": stage["count"],
+                "total_seconds": round(stage["total_seconds"], 3),
+                "mean_seconds": round(stage["total_seconds"] / stage["count"], 4),
+                "max_seconds": round(stage["max_seconds"], 4),
+            }
+            for name, stage in self.stages.items()
+        }
+
+
+class EventLoopMonitor:
+    """Measures how late the event loop wakes a short sleep, i.e. how long it was blocked"""
+
+    def __init__(self, interval: float = 0.05, blocked_threshold: float = 0.1):
+        self.interval = interval
+        self.blocked_threshold = blocked_threshold
+        registry = get_metrics_registry()
+        self.lag = registry.histogram("event_loop_lag_seconds", "Event loop wake-up delay", LAG_BUCKETS)
+        self.blocked = registry.counter(
+            "event_loop_blocked_seconds_total", "Event loop time lost to stalls longer than the threshold"
+        )
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.monotonic() - started - self.interval)
+            self.lag.observe(lag)
+            if lag >= self.blocked_threshold:
+                self.blocked.inc(lag)
+                logger.warning(f"Event loop was blocked for {lag * 1000:.0f}ms")
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+_event_loop_monitor: Optional[EventLoopMonitor] = None
+
+
+def get_event_loop_monitor() -> EventLoopMonitor:
+    global _event_loop_monitor
+    if _event_loop_monitor is None:
+        _event_loop_monitor = EventLoopMonitor()
+    return _event_loop_monitor
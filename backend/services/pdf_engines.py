@@ -0,0 +1,112 @@
+import os
+import threading
+from abc import ABC, abstractmethod
+from io import BytesIO
+from typing import Dict, List, Tuple, Union
+import logging
+
+from PyPDF2 import PdfReader
+
+from services.pdf_ocr import OCR_MAX_PAGES, OCR_MIN_PAGE_CHARS, OCR_RENDER_DPI, scanned_page_images
+
+logger = logging.getLogger(__name__)
+
+# "pypdf2" (default, pure Python) or "pdfium" (pypdfium2; faster, and renders scanned pages for OCR)
+PDF_ENGINE = os.getenv("PDF_ENGINE", "pypdf2").lower()
+# Pages read per resume; the rest of a long portfolio is skipped
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "10"))
+# Larger files are stored but not extracted
+PDF_MAX_BYTES = int(os.getenv("PDF_MAX_BYTES", str(10 * 1024 * 1024)))
+
+PdfSource = Union[bytes, str]
+# (text of each extracted page, scanned page images by index, total pages in the file)
+ExtractedPages = Tuple[List[str], Dict[int, List[bytes]], int]
+
+
+class PDFEngine(ABC):
+    """Text extraction backend; ``extract`` runs inside the extraction worker pool"""
+
+    name = ""
+
+    @abstractmethod
+    def extract(self, source: PdfSource, max_pages: int, with_scans: bool = False) -> ExtractedPages:
+        """Read up to ``max_pages`` pages of a PDF given as bytes or a file path.
+
+        With ``with_scans``, pages without a text layer also return images to OCR.
+        """
+
+
+class PyPDF2Engine(PDFEngine):
+    name = "pypdf2"
+
+    def extract(self, source: PdfSource, max_pages: int, with_scans: bool = False) -> ExtractedPages:
+        if isinstance(source, bytes):
+            return self._extract(PdfReader(BytesIO(source)), max_pages, with_scans)
+        with open(source, "rb") as f:
+            return self._extract(PdfReader(f), max_pages, with_scans)
+
+    @staticmethod
+    def _extract(reader: PdfReader, max_pages: int, with_scans: bool) -> ExtractedPages:
+        total_pages = len(reader.pages)
+        pages = [reader.pages[index].extract_text() or "" for index in range(min(total_pages, max_pages))]
+        # Only scanned pages send their images back to the parent for OCR
+        return pages, scanned_page_images(reader, pages) if with_scans else {}, total_pages
+
+
+# PDFium is not thread-safe; in thread mode extraction through it is serialized
+_pdfium_lock = threading.Lock()
+
+
+class PdfiumEngine(PDFEngine):
+    name = "pdfium"
+
+    def __init__(self):
+        try:
+            import pypdfium2
+        except ImportError as e:
+            raise ImportError("PDF_ENGINE=pdfium needs the pypdfium2 package") from e
+        self.pdfium = pypdfium2
+
+    def extract(self, source: PdfSource, max_pages: int, with_scans: bool = False) -> ExtractedPages:
+        pages, scans = [], {}
+        with _pdfium_lock:
+            document = self.pdfium.PdfDocument(source)
+            try:
+                total_pages = len(document)
+                for index in range(min(total_pages, max_pages)):
+                    page = document[index]
+                    try:
+                        textpage = page.get_textpage()
+                        # Whole text layer, like PyPDF2; the bounded variant drops text running off the page
+                        text = textpage.get_text_range().replace("\r\n", "\n")
+                        textpage.close()
+                        pages.append(text)
+                        if with_scans and len(scans) < OCR_MAX_PAGES and len(text.strip()) < OCR_MIN_PAGE_CHARS:
+                            scans[index] = [self._render(page)]
+                    finally:
+                        page.close()
+            finally:
+                document.close()
+        return pages, scans, total_pages
+
+    @staticmethod
+    def _render(page) -> bytes:
+        """The whole page as a grayscale PNG, so vector scans are OCR'd too"""
+        image = page.render(scale=OCR_RENDER_DPI / 72).to_pil().convert("L")
+        out = BytesIO()
+        image.save(out, format="PNG")
+        return out.getvalue()
+
+
+ENGINES = {engine.name: engine for engine in (PyPDF2Engine, PdfiumEngine)}
+_engines: Dict[str, PDFEngine] = {}
+
+
+def get_engine(name: str = PDF_ENGINE) -> PDFEngine:
+    """Shared engine instance per name (one per process, including pool workers)"""
+    engine = _engines.get(name)
+    if engine is None:
+        if name not in ENGINES:
+            raise ValueError(f"Unknown PDF_ENGINE {name!r}; expected one of {', '.join(ENGINES)}")
+        engine = _engines[name] = ENGINES[name]()
+    return engine
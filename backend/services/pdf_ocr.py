@@ -0,0 +1,136 @@
+import asyncio
+import hashlib
+import os
+import shutil
+from io import BytesIO
+from typing import Dict, List, Optional
+import logging
+
+from services.cache_store import TieredCache, get_cache_store, make_cache_key
+
+logger = logging.getLogger(__name__)
+
+# Pages without a text layer (scans) are OCR'd with Tesseract; PDF_OCR=0 drops them as before
+OCR_ENABLED = os.getenv("PDF_OCR", "1") == "1"
+OCR_WORKERS = int(os.getenv("PDF_OCR_WORKERS", str(max(1, (os.cpu_count() or 1) // 2))))
+OCR_PAGE_TIMEOUT = float(os.getenv("PDF_OCR_PAGE_TIMEOUT", "20"))
+OCR_LANG = os.getenv("PDF_OCR_LANG", "eng")
+# Pages with fewer extracted characters than this are treated as having no text layer
+OCR_MIN_PAGE_CHARS = int(os.getenv("PDF_OCR_MIN_PAGE_CHARS", "20"))
+# Scanned pages OCR'd per file; resumes rarely need more
+OCR_MAX_PAGES = int(os.getenv("PDF_OCR_MAX_PAGES", "5"))
+# Smaller images (icons, logos, signatures) are not worth recognizing
+OCR_MIN_IMAGE_PIXELS = 200 * 200
+# Resolution scanned pages are rendered at by engines that can rasterize (pdfium)
+OCR_RENDER_DPI = int(os.getenv("PDF_OCR_RENDER_DPI", "200"))
+
+_ocr_cache: Optional[TieredCache] = None
+_tesseract_available: Optional[bool] = None
+
+
+def get_ocr_cache() -> TieredCache:
+    """OCR text keyed by the hash of a page's images, shared across tasks"""
+    global _ocr_cache
+    if _ocr_cache is None:
+        _ocr_cache = TieredCache("ocr_pages", store=get_cache_store(), max_memory_bytes=8 * 1024 * 1024)
+    return _ocr_cache
+
+
+def tesseract_available() -> bool:
+    global _tesseract_available
+    if _tesseract_available is None:
+        try:
+            import pytesseract
+            _tesseract_available = shutil.which(pytesseract.pytesseract.tesseract_cmd) is not None
+        except ImportError:
+            _tesseract_available = False
+        if not _tesseract_available:
+            logger.warning("Tesseract is not installed; scanned PDF pages will not be OCR'd")
+    return _tesseract_available
+
+
+def scanned_page_images(reader, page_texts: List[str]) -> Dict[int, List[bytes]]:
+    """Embedded images of the pages of a PyPDF2 reader that have no text layer, by page index.
+
+    A scanned page is stored as one or more images, so these are the page
+    itself; PyPDF2 cannot rasterize, the pdfium engine renders pages instead.
+    """
+    scans = {}
+    for index, text in enumerate(page_texts):
+        if len(scans) >= OCR_MAX_PAGES:
+            break
+        if len(text.strip()) >= OCR_MIN_PAGE_CHARS:
+            continue
+        try:
+            images = [image.data for image in reader.pages[index].images]
+        except Exception as e:
+            logger.debug(f"Could not read images of page {index + 1}: {e}")
+            continue
+        if images:
+            scans[index] = images
+    return scans
+
+
+def page_hash(images: List[bytes]) -> str:
+    digest = hashlib.sha256()
+    for data in images:
+        digest.update(hashlib.sha256(data).digest())
+    return digest.hexdigest()
+
+
+def ocr_images(images: List[bytes], lang: str = OCR_LANG, timeout: float = OCR_PAGE_TIMEOUT) -> str:
+    """Recognize the text of one page's images (module level so it can run in a worker process)"""
+    import pytesseract
+    from PIL import Image
+
+    texts = []
+    for data in images:
+        with Image.open(BytesIO(data)) as image:
+            if image.width * image.height < OCR_MIN_IMAGE_PIXELS:
+                continue
+            # Tesseract is killed once the page's budget is used up
+            texts.append(pytesseract.image_to_string(image, lang=lang, timeout=timeout))
+    return "\n".join(text.strip() for text in texts if text.strip())
+
+
+class PageOCR:
+    """OCRs scanned pages in a WorkerPool, one job and one timeout per page.
+
+    Results are cached by the hash of the page's images, so the same scan
+    uploaded again (or shared by several resumes) is recognized only once.
+    """
+
+    def __init__(self, pool, page_timeout: float = OCR_PAGE_TIMEOUT, lang: str = OCR_LANG,
+                 cache: Optional[TieredCache] = None):
+        self.pool = pool
+        self.page_timeout = page_timeout
+        self.lang = lang
+        self.cache = cache if cache is not None else get_ocr_cache()
+
+    @property
+    def available(self) -> bool:
+        return tesseract_available()
+
+    async def recognize(self, scans: Dict[int, List[bytes]], filename: str) -> Dict[int, str]:
+        """OCR text by page index; pages that fail or time out are left out"""
+        async def recognize_page(index: int, images: List[bytes]) -> Optional[str]:
+            key = make_cache_key(self.lang, page_hash(images))
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+            try:
+                # Timed from when a worker is free; the slack over Tesseract's own timeout covers image decoding
+                async with self.pool.slot() as slot:
+                    text = await slot.run(ocr_images, images, self.lang, self.page_timeout, timeout=self.page_timeout + 5)
+            except asyncio.TimeoutError:
+                logger.warning(f"OCR of {filename} page {index + 1} exceeded {self.page_timeout}s")
+                return None
+            except Exception as e:
+                logger.warning(f"OCR of {filename} page {index + 1} failed: {e}")
+                return None
+            self.cache.set(key, text)
+            return text
+
+        indexes = list(scans)
+        texts = await asyncio.gather(*[recognize_page(index, scans[index]) for index in indexes])
+        return {index: text for index, text in zip(indexes, texts) if text is not None}
@@ -1,49 +1,152 @@
-from PyPDF2 import PdfReader
-from typing import List, Dict
-from io import BytesIO
+from typing import List, Dict, AsyncIterator, Optional
+import asyncio
+import time
+import os
 import logging
+
+from services.text_compactor import (
+    PAGE_SEPARATOR, RESUME_COMPACTION_ENABLED, DEFAULT_RESUME_MAX_TOKENS, compact_resume_text
+)
+from services.pdf_ocr import OCR_ENABLED, OCR_WORKERS, PageOCR
+from services.pdf_engines import PDF_ENGINE, PDF_MAX_BYTES, PDF_MAX_PAGES, ExtractedPages, PdfSource, get_engine
+from services.worker_pool import WorkerPool, get_worker_pool
+
 logger = logging.getLogger(__name__)
 
+DEFAULT_EXTRACTION_WORKERS = int(os.getenv("PDF_EXTRACTION_WORKERS", str(os.cpu_count() or 1)))
+DEFAULT_EXTRACTION_TIMEOUT = float(os.getenv("PDF_EXTRACTION_TIMEOUT", "30"))
+DEFAULT_EXTRACTION_MODE = os.getenv("PDF_EXTRACTION_MODE", "process")  # "process" or "thread"
+
+
+def extract_pages(source: PdfSource, engine: str = PDF_ENGINE, max_pages: int = PDF_MAX_PAGES,
+                  with_scans: bool = False) -> ExtractedPages:
+    """Per-page text of a PDF given as bytes or a path (module level so it can run in a worker process)"""
+    return get_engine(engine).extract(source, max_pages, with_scans)
+
+
 class PDFProcessor:
-    
-    def extract_from_file_contents(self, file_data_list):
-        """Extract text from file contents (for background processing)"""
-        results = []
-        
-        for file_data in file_data_list:
+
+    def __init__(self, max_workers: Optional[int] = None, file_timeout: Optional[float] = None,
+                 mode: Optional[str] = None, compact: bool = RESUME_COMPACTION_ENABLED,
+                 max_tokens: int = DEFAULT_RESUME_MAX_TOKENS, ocr: bool = OCR_ENABLED,
+                 engine: str = PDF_ENGINE, max_pages: int = PDF_MAX_PAGES, max_bytes: int = PDF_MAX_BYTES):
+        self.max_workers = max_workers or DEFAULT_EXTRACTION_WORKERS
+        self.file_timeout = file_timeout or DEFAULT_EXTRACTION_TIMEOUT
+        self.mode = mode or DEFAULT_EXTRACTION_MODE
+        # Fails here, not in every worker, when the engine is unknown or not installed
+        self.engine = get_engine(engine).name
+        self.max_pages = max_pages
+        self.max_bytes = max_bytes
+        # Scanned pages are OCR'd in their own pool so they never hold up text extraction
+        self.ocr = PageOCR(get_worker_pool(self.mode, OCR_WORKERS, "ocr")) if ocr else None
+        # Compaction runs on every extraction so prompts never see raw page text
+        self.compact = compact
+        self.max_tokens = max_tokens
+
+    async def iter_extract_from_file_contents(self, file_data_list: List[Dict]) -> AsyncIterator[Dict]:
+        """Extract text in a worker pool, yielding each result as soon as its file finishes"""
+        # Files wait for a free worker slot first, so the per-file timeout
+        # measures extraction time rather than time spent queued
+        pool = get_worker_pool(self.mode, self.max_workers, "extract")
+
+        tasks = [
+            asyncio.ensure_future(self._extract_in_executor(pool, file_data))
+            for file_data in file_data_list
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _extract_in_executor(self, pool: WorkerPool, file_data: Dict) -> Dict:
+        filename = file_data.get("filename", "unknown")
+        queued_at = time.monotonic()
+        rejected = self._check_size(file_data)
+        if rejected is not None:
+            return self._tag_upload(dict(rejected, extraction_wait_seconds=0.0, extraction_seconds=0.0), file_data)
+
+        with_scans = self.ocr is not None and self.ocr.available
+        pages = None
+        async with pool.slot() as slot:
+            started = time.monotonic()
             try:
-                filename = file_data["filename"]
-                content = file_data["content"]
-                
-                # Extract PDF text
-                text = self._extract_pdf_from_bytes(content)
-                
-                results.append({
-                    "filename": filename,
-                    "text_content": text.strip(),
-                    "extraction_success": len(text.strip()) > 0,
-                    "text_length": len(text.strip())
-                })
-                
+                # Spooled files are passed by path so their bytes are never pickled
+                source = file_data["content"] if file_data.get("content") is not None else file_data["path"]
+                pages, scans, total_pages = await slot.run(
+                    extract_pages, source, self.engine, self.max_pages, with_scans, timeout=self.file_timeout
+                )
+
+            except asyncio.TimeoutError:
+                logger.warning(f"Extraction of {filename} exceeded {self.file_timeout}s")
+                result = self._build_error(filename, f"Extraction timed out after {self.file_timeout}s")
+
             except Exception as e:
-                results.append({
-                    "filename": file_data.get("filename", "unknown"),
-                    "extraction_success": False,
-                    "error": str(e),
-                    "text_content": "",
-                    "text_length": 0
-                })
-        
-        return results
-    
-    def _extract_pdf_from_bytes(self, content: bytes) -> str:
-        """Extract text from PDF bytes"""
-        
-        pdf_file = BytesIO(content)
-        reader = PdfReader(pdf_file)
-        
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() or ""
-        return text
+                result = self._build_error(filename, str(e))
+        extraction_seconds = time.monotonic() - started
+
+        if pages is not None:
+            ocr_stats = {}
+            if scans:
+                # Outside the extraction slot: OCR has its own pool and per-page timeouts
+                ocr_started = time.monotonic()
+                recognized = await self.ocr.recognize(scans, filename)
+                for index, text in recognized.items():
+                    pages[index] = text
+                ocr_stats = {"ocr_pages": len(recognized), "ocr_seconds": time.monotonic() - ocr_started}
+            # Pages stay distinguishable so repeated headers/footers can be removed
+            result = self._build_result(filename, PAGE_SEPARATOR.join(pages))
+            result.update(ocr_stats, page_count=total_pages)
+            if total_pages > len(pages):
+                result["pages_skipped"] = total_pages - len(pages)
+
+        result["extraction_wait_seconds"] = started - queued_at
+        result["extraction_seconds"] = extraction_seconds
+        return self._tag_upload(result, file_data)
+
+    @staticmethod
+    def _tag_upload(result: Dict, file_data: Dict) -> Dict:
+        """Carry the caller's per-upload id, which tells apart files that share a name"""
+        if "upload_id" in file_data:
+            result["upload_id"] = file_data["upload_id"]
+        return result
+
+    def _check_size(self, file_data: Dict) -> Optional[Dict]:
+        """Error result for a file over ``max_bytes``, which is not worth extracting"""
+        if file_data.get("content") is not None:
+            size = len(file_data["content"])
+        else:
+            size = file_data.get("size") or os.path.getsize(file_data["path"])
+        if size <= self.max_bytes:
+            return None
+        logger.warning(f"Skipping extraction of {file_data.get('filename')}: {size} bytes is over {self.max_bytes}")
+        return self._build_error(
+            file_data.get("filename", "unknown"), f"File is larger than {self.max_bytes} bytes; not extracted"
+        )
+
+    def _build_result(self, filename: str, text: str) -> Dict:
+        token_stats = {}
+        if self.compact:
+            text, token_stats = compact_resume_text(text, self.max_tokens)
+        else:
+            text = text.replace(PAGE_SEPARATOR, "\n")
+
+        text = text.strip()
+        return {
+            "filename": filename,
+            "text_content": text,
+            "extraction_success": len(text) > 0,
+            "text_length": len(text),
+            **token_stats
+        }
 
+    @staticmethod
+    def _build_error(filename: str, error: str) -> Dict:
+        return {
+            "filename": filename,
+            "extraction_success": False,
+            "error": error,
+            "text_content": "",
+            "text_length": 0
+        }
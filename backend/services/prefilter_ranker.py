@@ -0,0 +1,162 @@
+import os
+import re
+from typing import List, Dict, Optional, Tuple
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Candidates escalated to Gemini: the top N by lexical score, plus anyone at or
+# above the threshold (0-100 scale). Both unset disables the pre-filter.
+DEFAULT_PREFILTER_TOP_N = int(os.getenv("PREFILTER_TOP_N", "0")) or None
+DEFAULT_PREFILTER_MIN_SCORE = float(os.getenv("PREFILTER_MIN_SCORE", "0")) or None
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]")
+_STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or our that the their this to
+we will with you your who what which be been being were was able etc
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens; keeps tech terms like c++, c#, node.js intact"""
+    return [t for t in _TOKEN_PATTERN.findall(text.lower()) if t not in _STOPWORDS]
+
+
+def _flatten_values(value) -> List[str]:
+    if isinstance(value, dict):
+        return [text for item in value.values() for text in _flatten_values(item)]
+    if isinstance(value, list):
+        return [text for item in value for text in _flatten_values(item)]
+    return [str(value)] if value is not None else []
+
+
+def resume_search_text(resume_data: Dict) -> str:
+    """Text used for lexical matching: raw resume text (if present) plus parsed values"""
+    parts = [resume_data.get("text_content", "")]
+    parsed = resume_data.get("parsed_data") or {}
+    if isinstance(parsed, dict):
+        parts.extend(_flatten_values(parsed))
+        skills = parsed.get("skills")
+        if isinstance(skills, list):
+            # Listed skills count twice so an explicit skill outweighs a passing mention
+            parts.extend(_flatten_values(skills))
+    return " ".join(parts)
+
+
+class BM25Ranker:
+    """Okapi BM25 over a single batch, vectorised with NumPy.
+
+    The job description is the query and every resume in the batch is a
+    document; IDF is computed from the batch itself.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+
+    def score(self, query: str, documents: List[str]) -> np.ndarray:
+        query_terms = sorted(set(tokenize(query)))
+        if not documents or not query_terms:
+            return np.zeros(len(documents))
+
+        term_index = {term: i for i, term in enumerate(query_terms)}
+        tf = np.zeros((len(documents), len(query_terms)), dtype=np.float64)
+        doc_lengths = np.zeros(len(documents), dtype=np.float64)
+
+        for row, document in enumerate(documents):
+            tokens = tokenize(document)
+            doc_lengths[row] = len(tokens)
+            for token in tokens:
+                column = term_index.get(token)
+                if column is not None:
+                    tf[row, column] += 1
+
+        return self.score_matrix(tf, doc_lengths, np.count_nonzero(tf, axis=0), len(documents), doc_lengths.mean())
+
+    def score_matrix(self, tf: np.ndarray, doc_lengths: np.ndarray, doc_freq: np.ndarray,
+                     total_documents: int, avg_length: float) -> np.ndarray:
+        """BM25 from a documents × query-terms frequency matrix and collection statistics"""
+        idf = np.log1p((total_documents - doc_freq + 0.5) / (doc_freq + 0.5))
+        norm = self.k1 * (1 - self.b + self.b * doc_lengths / (avg_length or 1.0))
+        weights = tf * (self.k1 + 1) / (tf + norm[:, None])
+        return weights @ idf
+
+    def score_normalized(self, query: str, documents: List[str]) -> np.ndarray:
+        """0-100 score blending query-term coverage with BM25 relative to the batch best"""
+        raw = self.score(query, documents)
+        query_terms = set(tokenize(query))
+        if not query_terms or not raw.size:
+            return raw
+
+        # Coverage (share of JD terms present) is comparable across batches;
+        # relative BM25 breaks ties by how strongly those terms are present
+        coverage = np.array([
+            len(query_terms & set(tokenize(document))) / len(query_terms) for document in documents
+        ])
+        return blend_scores(coverage, raw)
+
+
+def blend_scores(coverage: np.ndarray, raw: np.ndarray) -> np.ndarray:
+    """0-100 score: 70% share of query terms present, 30% BM25 relative to the best document"""
+    relative = raw / raw.max() if raw.size and raw.max() > 0 else raw
+    return np.round(100 * (0.7 * coverage + 0.3 * relative), 1)
+
+
+def prefilter_candidates(job_description: str, parsed_resumes: List[Dict],
+                         top_n: Optional[int] = DEFAULT_PREFILTER_TOP_N,
+                         min_score: Optional[float] = DEFAULT_PREFILTER_MIN_SCORE) -> Tuple[List[Dict], List[Dict]]:
+    """Split parsed resumes into (escalate to LLM, keep local score).
+
+    Every resume gets a ``prefilter_score``. Resumes in the top ``top_n`` or at or
+    above ``min_score`` are escalated; the rest are returned as finished result
+    entries scored locally. ``top_n`` is at least 1 and ``min_score`` is clamped
+    to the 0-100 score range.
+    """
+    if not parsed_resumes or (top_n is None and min_score is None):
+        return parsed_resumes, []
+    if top_n is not None:
+        top_n = max(1, top_n)
+    if min_score is not None:
+        min_score = min(max(min_score, 0.0), 100.0)
+
+    scores = BM25Ranker().score_normalized(
+        job_description, [resume_search_text(resume_data) for resume_data in parsed_resumes]
+    )
+    order = np.argsort(-scores, kind="stable")
+
+    escalate_mask = np.zeros(len(parsed_resumes), dtype=bool)
+    if top_n is not None:
+        escalate_mask[order[:top_n]] = True
+    if min_score is not None:
+        escalate_mask |= scores >= min_score
+
+    escalated, local = [], []
+    for index in order:
+        resume_data = dict(parsed_resumes[index], prefilter_score=float(scores[index]))
+        if escalate_mask[index]:
+            escalated.append(resume_data)
+        else:
+            local.append(local_result_entry(resume_data))
+
+    logger.info(f"Pre-filter escalated {len(escalated)}/{len(parsed_resumes)} resumes to LLM scoring")
+    return escalated, local
+
+
+def local_result_entry(resume_data: Dict) -> Dict:
+    """Result row for a resume that was ranked locally and not sent to Gemini"""
+    score = resume_data["prefilter_score"]
+    entry = {
+        "filename": resume_data["filename"],
+        "candidate_name": (resume_data.get("parsed_data") or {}).get("name", "Unknown"),
+        "match_score": score,
+        "scored_by": "prefilter",
+        "detailed_scores": {
+            "match_score": score,
+            "overall_fit": "very low" if score < 25 else "low",
+        },
+    }
+    if "upload_id" in resume_data:
+        entry["upload_id"] = resume_data["upload_id"]
+    return entry
@@ -0,0 +1,288 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Optional
+import logging
+
+from services.cache_store import DEFAULT_CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REQUESTS_PER_MINUTE = int(os.getenv("GEMINI_RPM", "4"))
+DEFAULT_TOKENS_PER_MINUTE = int(os.getenv("GEMINI_TPM", "250000"))
+# "memory" limits each process on its own; "sqlite" makes every process on the
+# host (API and job workers) draw from one bucket; the default with TASK_EXECUTOR=queue.
+# TASK_EXECUTOR is read here directly so the Gemini client does not import the job queue
+QUOTA_BACKEND = os.getenv(
+    "GEMINI_QUOTA_BACKEND", "sqlite" if os.getenv("TASK_EXECUTOR", "inline").lower() == "queue" else "memory"
+).lower()
+QUOTA_PATH = os.getenv("GEMINI_QUOTA_PATH", os.path.join(DEFAULT_CACHE_DIR, "quota.sqlite3"))
+
+
+class TokenBucketRateLimiter:
+    """Async token bucket that enforces both requests/minute and tokens/minute.
+
+    Callers ``await acquire(estimated_tokens)`` before each API call and may
+    report the real usage afterwards with ``record_usage`` so the token bucket
+    tracks what the API actually billed. Usage is reported from the Gemini
+    worker threads, so the window and counters are guarded by a thread lock.
+    """
+
+    def __init__(self, requests_per_minute: int = DEFAULT_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: Optional[int] = DEFAULT_TOKENS_PER_MINUTE):
+        if requests_per_minute <= 0:
+            raise ValueError("requests_per_minute must be positive")
+
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute if tokens_per_minute and tokens_per_minute > 0 else None
+
+        self._request_rate = requests_per_minute / 60.0
+        self._token_rate = self.tokens_per_minute / 60.0 if self.tokens_per_minute else None
+
+        # Buckets start full so a fresh batch can burst up to the minute quota
+        self._request_allowance = float(requests_per_minute)
+        self._token_allowance = float(self.tokens_per_minute or 0)
+        self._last_refill = time.monotonic()
+
+        # Sliding one-minute window used only for reporting
+        self._window = deque()
+        self._total_requests = 0
+        self._total_tokens = 0
+        self._total_wait_seconds = 0.0
+        self._prompt_tokens = 0
+        self._output_tokens = 0
+
+        self._lock = asyncio.Lock()
+        # Guards the window, allowances and totals shared with the reporting threads
+        self._usage_lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        self._last_refill = now
+
+        self._request_allowance = min(
+            float(self.requests_per_minute),
+            self._request_allowance + elapsed * self._request_rate
+        )
+        if self._token_rate:
+            self._token_allowance = min(
+                float(self.tokens_per_minute),
+                self._token_allowance + elapsed * self._token_rate
+            )
+
+    def _seconds_until_available(self, tokens: int) -> float:
+        wait = 0.0
+        if self._request_allowance < 1:
+            wait = (1 - self._request_allowance) / self._request_rate
+        if self._token_rate and self._token_allowance < tokens:
+            wait = max(wait, (tokens - self._token_allowance) / self._token_rate)
+        return wait
+
+    async def _take(self, tokens: int) -> float:
+        """Deduct one request of ``tokens`` if it fits now, else return the seconds to wait"""
+        with self._usage_lock:
+            self._refill()
+            wait = self._seconds_until_available(tokens)
+            if wait <= 0:
+                self._request_allowance -= 1
+                if self._token_rate:
+                    self._token_allowance -= tokens
+        return wait
+
+    async def acquire(self, tokens: int = 0) -> float:
+        """Wait until a request of ``tokens`` estimated tokens fits in the quota.
+
+        Returns the number of seconds spent waiting.
+        """
+        if self.tokens_per_minute:
+            # A single oversized request can never fit; let it through on a full bucket
+            tokens = min(tokens, self.tokens_per_minute)
+
+        waited = 0.0
+        # The lock keeps waiters in FIFO order while one of them sleeps
+        async with self._lock:
+            while True:
+                wait = await self._take(tokens)
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+                waited += wait
+
+            with self._usage_lock:
+                self._window.append([time.monotonic(), tokens])
+                self._total_requests += 1
+                self._total_tokens += tokens
+                self._total_wait_seconds += waited
+
+        if waited > 0:
+            logger.debug(f"Rate limiter delayed request by {waited:.2f}s")
+        return waited
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: Optional[int]):
+        """Correct the token bucket once the real token count is known"""
+        if actual_tokens is None:
+            return
+
+        delta = actual_tokens - estimated_tokens
+        with self._usage_lock:
+            if self._token_rate:
+                self._charge_tokens(delta)
+            self._total_tokens += delta
+
+            # Attribute the correction to the most recent matching window entry
+            for entry in reversed(self._window):
+                if entry[1] == estimated_tokens:
+                    entry[1] = actual_tokens
+                    break
+
+    def _charge_tokens(self, tokens: int):
+        self._token_allowance -= tokens
+
+    def record_response(self, estimated_tokens: int, response):
+        """Account for a Gemini response using its usage metadata, when present"""
+        usage = getattr(response, "usage_metadata", None)
+        prompt_tokens = getattr(usage, "prompt_token_count", None) if usage else None
+        output_tokens = getattr(usage, "candidates_token_count", None) if usage else None
+        total_tokens = getattr(usage, "total_token_count", None) if usage else None
+
+        with self._usage_lock:
+            self._prompt_tokens += prompt_tokens or 0
+            self._output_tokens += output_tokens or 0
+        logger.debug(
+            f"Gemini request tokens: estimated={estimated_tokens} prompt={prompt_tokens} "
+            f"output={output_tokens} total={total_tokens}"
+        )
+        self.record_usage(estimated_tokens, total_tokens)
+
+    def quota_status(self) -> dict:
+        """Report usage over the last minute relative to the configured quota"""
+        now = time.monotonic()
+        with self._usage_lock:
+            while self._window and now - self._window[0][0] > 60:
+                self._window.popleft()
+
+            requests_last_minute = len(self._window)
+            tokens_last_minute = sum(entry[1] for entry in self._window)
+            totals = (self._total_requests, self._total_tokens, self._prompt_tokens,
+                      self._output_tokens, self._total_wait_seconds)
+
+        status = {
+            "requests_per_minute_limit": self.requests_per_minute,
+            "requests_last_minute": requests_last_minute,
+            "request_quota_used_pct": round(100 * requests_last_minute / self.requests_per_minute, 1),
+            "tokens_per_minute_limit": self.tokens_per_minute,
+            "tokens_last_minute": tokens_last_minute,
+            "token_quota_used_pct": (
+                round(100 * tokens_last_minute / self.tokens_per_minute, 1)
+                if self.tokens_per_minute else None
+            ),
+            "total_requests": totals[0],
+            "total_tokens": totals[1],
+            "total_prompt_tokens": totals[2],
+            "total_output_tokens": totals[3],
+            "total_wait_seconds": round(totals[4], 2),
+            "shared": False,
+        }
+        return status
+
+
+class SQLiteRateLimiter(TokenBucketRateLimiter):
+    """Token bucket kept in SQLite so every process on the host shares one Gemini quota.
+
+    Waiting and usage reporting stay per process; only the allowances live in
+    the database, refilled from wall-clock time under a write lock.
+    """
+
+    BUCKET = "gemini"
+
+    def __init__(self, db_path: str = QUOTA_PATH, requests_per_minute: int = DEFAULT_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: Optional[int] = DEFAULT_TOKENS_PER_MINUTE):
+        super().__init__(requests_per_minute, tokens_per_minute)
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS buckets (
+                name TEXT PRIMARY KEY,
+                request_allowance REAL NOT NULL,
+                token_allowance REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute(
+            "INSERT OR IGNORE INTO buckets VALUES (?, ?, ?, ?)",
+            (self.BUCKET, float(requests_per_minute), float(self.tokens_per_minute or 0), time.time())
+        )
+        self._db_lock = threading.Lock()
+
+    def _take_shared(self, tokens: int) -> float:
+        with self._db_lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                requests, token_allowance, updated_at = self._conn.execute(
+                    "SELECT request_allowance, token_allowance, updated_at FROM buckets WHERE name = ?",
+                    (self.BUCKET,)
+                ).fetchone()
+                now = time.time()
+                elapsed = max(0.0, now - updated_at)
+                self._request_allowance = min(float(self.requests_per_minute), requests + elapsed * self._request_rate)
+                if self._token_rate:
+                    self._token_allowance = min(
+                        float(self.tokens_per_minute), token_allowance + elapsed * self._token_rate
+                    )
+
+                wait = self._seconds_until_available(tokens)
+                if wait <= 0:
+                    self._request_allowance -= 1
+                    if self._token_rate:
+                        self._token_allowance -= tokens
+                self._conn.execute(
+                    "UPDATE buckets SET request_allowance = ?, token_allowance = ?, updated_at = ? WHERE name = ?",
+                    (self._request_allowance, self._token_allowance, now, self.BUCKET)
+                )
+                self._conn.execute("COMMIT")
+                return wait
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    async def _take(self, tokens: int) -> float:
+        return await asyncio.to_thread(self._take_shared, tokens)
+
+    def _charge_tokens(self, tokens: int):
+        with self._db_lock:
+            self._conn.execute(
+                "UPDATE buckets SET token_allowance = token_allowance - ? WHERE name = ?", (tokens, self.BUCKET)
+            )
+
+    def quota_status(self) -> dict:
+        status = super().quota_status()
+        status["shared"] = True
+        return status
+
+
+_shared_limiter: Optional[TokenBucketRateLimiter] = None
+
+
+def get_shared_rate_limiter() -> TokenBucketRateLimiter:
+    """Process-wide limiter so concurrent tasks share one Gemini quota"""
+    global _shared_limiter
+    if _shared_limiter is None:
+        if QUOTA_BACKEND == "sqlite":
+            _shared_limiter = SQLiteRateLimiter(QUOTA_PATH, DEFAULT_REQUESTS_PER_MINUTE, DEFAULT_TOKENS_PER_MINUTE)
+        elif QUOTA_BACKEND == "memory":
+            _shared_limiter = TokenBucketRateLimiter(DEFAULT_REQUESTS_PER_MINUTE, DEFAULT_TOKENS_PER_MINUTE)
+        else:
+            raise ValueError(f"Unknown GEMINI_QUOTA_BACKEND: {QUOTA_BACKEND}")
+    return _shared_limiter
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) used before a call is made"""
+    return max(1, len(text) // 4)
@@ -0,0 +1,267 @@
+import asyncio
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter
+from typing import Awaitable, Callable, Optional, TypeVar
+import logging
+
+from google.api_core import exceptions as google_exceptions
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+DEFAULT_MAX_ATTEMPTS = int(os.getenv("GEMINI_MAX_ATTEMPTS", "5"))
+DEFAULT_RETRY_BASE_SECONDS = float(os.getenv("GEMINI_RETRY_BASE_SECONDS", "1"))
+DEFAULT_RETRY_MAX_SECONDS = float(os.getenv("GEMINI_RETRY_MAX_SECONDS", "60"))
+# A second, identical request is sent when the first has not answered within
+# this many seconds; 0 disables hedging (every hedge costs quota)
+DEFAULT_HEDGE_AFTER_SECONDS = float(os.getenv("GEMINI_HEDGE_AFTER_SECONDS", "0"))
+# Consecutive quota/overload errors that open the breaker, and its first pause
+DEFAULT_BREAKER_THRESHOLD = int(os.getenv("GEMINI_BREAKER_THRESHOLD", "5"))
+DEFAULT_BREAKER_COOLDOWN_SECONDS = float(os.getenv("GEMINI_BREAKER_COOLDOWN_SECONDS", "30"))
+MAX_BREAKER_COOLDOWN_SECONDS = 300.0
+
+# Quota and overload errors: retried, and counted by the circuit breaker
+_THROTTLE_ERRORS = (google_exceptions.TooManyRequests, google_exceptions.ServiceUnavailable)
+# Everything else worth another attempt
+_TRANSIENT_ERRORS = (
+    google_exceptions.ServerError, google_exceptions.DeadlineExceeded,
+    ConnectionError, TimeoutError, asyncio.TimeoutError
+)
+_RETRY_DELAY_PATTERNS = (
+    re.compile(r"retry in ([\d.]+)\s*s", re.IGNORECASE),
+    re.compile(r"retry_delay\s*\{\s*seconds:\s*(\d+)", re.IGNORECASE),
+)
+
+
+def is_throttle_error(exc: BaseException) -> bool:
+    return isinstance(exc, _THROTTLE_ERRORS)
+
+
+def is_retryable(exc: BaseException) -> bool:
+    return isinstance(exc, _THROTTLE_ERRORS + _TRANSIENT_ERRORS)
+
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """Server-suggested wait, from a Retry-After header, RetryInfo detail or the message"""
+    response = getattr(exc, "response", None)
+    header = getattr(response, "headers", {}).get("Retry-After") if response is not None else None
+    if header:
+        try:
+            return float(header)
+        except ValueError:
+            pass
+
+    for detail in getattr(exc, "details", None) or []:
+        delay = getattr(detail, "retry_delay", None)
+        if delay is not None:
+            return delay.seconds + delay.nanos / 1e9
+
+    for pattern in _RETRY_DELAY_PATTERNS:
+        match = pattern.search(str(exc))
+        if match:
+            return float(match.group(1))
+    return None
+
+
+class CircuitBreaker:
+    """Pauses every caller after sustained quota errors instead of letting them pile on.
+
+    After ``threshold`` consecutive throttle errors the breaker opens for a
+    cooldown. When it expires one probe request is let through (half-open): a
+    success closes the breaker, another throttle error reopens it with twice the
+    cooldown. Callers wait rather than fail, so the pipeline resumes on its own.
+    """
+
+    def __init__(self, threshold: int = DEFAULT_BREAKER_THRESHOLD,
+                 cooldown: float = DEFAULT_BREAKER_COOLDOWN_SECONDS):
+        self.threshold = threshold
+        self.base_cooldown = cooldown
+        self.cooldown = cooldown
+
+        self.state = "closed"
+        self.opens = 0
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def seconds_until_allowed(self) -> float:
+        """0 when a request may start now (claiming the probe slot if half-open)"""
+        with self._lock:
+            if self.state == "closed":
+                return 0.0
+            remaining = self._opened_at + self.cooldown - time.monotonic()
+            if remaining > 0:
+                return remaining
+            if self._probe_in_flight:
+                # Someone else is probing; check back shortly
+                return min(1.0, self.cooldown)
+            self.state = "half_open"
+            self._probe_in_flight = True
+            return 0.0
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed":
+                logger.info("Gemini circuit breaker closed")
+            self.state = "closed"
+            self.cooldown = self.base_cooldown
+            self._consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self, exc: BaseException):
+        if not is_throttle_error(exc):
+            with self._lock:
+                self._probe_in_flight = False
+            return
+
+        with self._lock:
+            self._consecutive_failures += 1
+            if self.state == "half_open":
+                self.cooldown = min(self.cooldown * 2, MAX_BREAKER_COOLDOWN_SECONDS)
+                self._open()
+            elif self.state == "closed" and self._consecutive_failures >= self.threshold:
+                self._open()
+
+    def _open(self):
+        self.state = "open"
+        self.opens += 1
+        self._opened_at = time.monotonic()
+        self._probe_in_flight = False
+        logger.warning(
+            f"Gemini circuit breaker open for {self.cooldown:.0f}s after "
+            f"{self._consecutive_failures} consecutive quota errors"
+        )
+
+    def status(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._consecutive_failures,
+            "cooldown_seconds": self.cooldown,
+            "opens": self.opens,
+        }
+
+
+class ResilientCaller:
+    """Retries with exponential backoff and full jitter, honouring server retry hints.
+
+    Optionally hedges slow async calls, and defers to a shared circuit breaker.
+    Non-retryable errors and exhausted retries are raised to the caller; nothing
+    is turned into a default value here.
+    """
+
+    def __init__(self, max_attempts: int = DEFAULT_MAX_ATTEMPTS, base_delay: float = DEFAULT_RETRY_BASE_SECONDS,
+                 max_delay: float = DEFAULT_RETRY_MAX_SECONDS, hedge_after: float = DEFAULT_HEDGE_AFTER_SECONDS,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge_after = hedge_after
+        self.breaker = breaker or CircuitBreaker()
+
+        self.metrics = Counter()
+        self.errors = Counter()
+        self._lock = threading.Lock()
+
+    def backoff_delay(self, attempt: int, exc: BaseException) -> float:
+        """Delay before retry number ``attempt`` (1-based)"""
+        hinted = retry_after_seconds(exc)
+        if hinted is not None:
+            # The server knows when quota frees up; jitter only spreads the herd
+            return hinted + random.uniform(0, min(self.base_delay, hinted))
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def _count(self, name: str, amount: float = 1):
+        with self._lock:
+            self.metrics[name] += amount
+
+    def _record_error(self, exc: BaseException):
+        with self._lock:
+            self.errors[type(exc).__name__] += 1
+        self.breaker.record_failure(exc)
+
+    def _should_retry(self, attempt: int, exc: BaseException, label: str) -> Optional[float]:
+        """Delay before the next attempt, or None if ``exc`` should be raised"""
+        self._record_error(exc)
+        if not is_retryable(exc) or attempt >= self.max_attempts:
+            self._count("failures")
+            return None
+
+        delay = self.backoff_delay(attempt, exc)
+        self._count("retries")
+        self._count("backoff_seconds", delay)
+        logger.warning(f"Gemini {label} attempt {attempt} failed ({exc}); retrying in {delay:.1f}s")
+        return delay
+
+    async def call(self, operation: Callable[[], Awaitable[T]], label: str = "request") -> T:
+        attempt = 0
+        while True:
+            attempt += 1
+            await self._wait_for_breaker()
+            self._count("attempts")
+            try:
+                result = await self._hedged(operation)
+            except Exception as e:
+                delay = self._should_retry(attempt, e, label)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+
+            self.breaker.record_success()
+            self._count("successes")
+            return result
+
+    async def _wait_for_breaker(self):
+        wait = self.breaker.seconds_until_allowed()
+        if wait > 0:
+            self._count("breaker_waits")
+        while wait > 0:
+            await asyncio.sleep(wait)
+            wait = self.breaker.seconds_until_allowed()
+
+    async def _hedged(self, operation: Callable[[], Awaitable[T]]) -> T:
+        primary = asyncio.ensure_future(operation())
+        if not self.hedge_after or self.breaker.state != "closed":
+            return await primary
+
+        done, _ = await asyncio.wait({primary}, timeout=self.hedge_after)
+        if done:
+            return primary.result()
+
+        self._count("hedges")
+        hedge = asyncio.ensure_future(operation())
+        pending = {primary, hedge}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for finished in done:
+                    if finished.exception() is None:
+                        if finished is hedge:
+                            self._count("hedge_wins")
+                        return finished.result()
+                if not pending:
+                    # Both failed; surface the primary's error
+                    return primary.result()
+        finally:
+            # The losing SDK call keeps its worker thread, but its result is dropped
+            for future in pending:
+                future.cancel()
+
+    def status(self) -> dict:
+        with self._lock:
+            metrics = dict(self.metrics)
+            errors = dict(self.errors)
+        metrics["backoff_seconds"] = round(metrics.get("backoff_seconds", 0), 2)
+        return {
+            "max_attempts": self.max_attempts,
+            "hedge_after_seconds": self.hedge_after or None,
+            "breaker": self.breaker.status(),
+            "counters": metrics,
+            "errors": errors,
+        }
@@ -0,0 +1,99 @@
+import os
+from typing import Dict, Hashable, List, Optional, Tuple
+import logging
+
+import numpy as np
+
+from services.cache_store import make_cache_key
+from services.prefilter_ranker import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Near-identical resumes within one upload (same CV renamed, re-exported or lightly
+# edited) are parsed and scored once; RESUME_DEDUP=0 sends every file to Gemini.
+# Across tasks only identical text is reused, through the parse cache, so an
+# updated resume is never scored on its older version
+RESUME_DEDUP_ENABLED = os.getenv("RESUME_DEDUP", "1") == "1"
+# Estimated Jaccard similarity of word shingles at which two resumes count as copies
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.9"))
+
+SHINGLE_WORDS = 4
+NUM_PERMUTATIONS = 64
+# 16 bands of 4 rows: pairs above ~0.5 similarity share a band and get compared
+LSH_BANDS = 16
+_ROWS_PER_BAND = NUM_PERMUTATIONS // LSH_BANDS
+_PRIME = np.uint64(4294967291)  # largest prime below 2**32, so a * h + b fits in uint64
+
+# Fixed seed, so the same text always gets the same signature
+_random = np.random.RandomState(20240601)
+_PERMUTATION_A = _random.randint(1, int(_PRIME), size=NUM_PERMUTATIONS).astype(np.uint64)
+_PERMUTATION_B = _random.randint(0, int(_PRIME), size=NUM_PERMUTATIONS).astype(np.uint64)
+SIGNATURE_VERSION = make_cache_key("minhash", str(SHINGLE_WORDS), str(NUM_PERMUTATIONS), str(LSH_BANDS))[:12]
+
+
+def minhash_signature(text: str) -> np.ndarray:
+    """MinHash of the text's word shingles; equal positions estimate Jaccard similarity"""
+    tokens = tokenize(text)
+    shingles = {" ".join(tokens[i:i + SHINGLE_WORDS]) for i in range(max(1, len(tokens) - SHINGLE_WORDS + 1))}
+    hashes = np.array(
+        [int(make_cache_key(shingle)[:8], 16) for shingle in shingles], dtype=np.uint64
+    ) % _PRIME
+    return ((np.outer(hashes, _PERMUTATION_A) + _PERMUTATION_B) % _PRIME).min(axis=0)
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.mean(a == b))
+
+
+def band_keys(signature: np.ndarray) -> List[str]:
+    return [
+        f"{SIGNATURE_VERSION}:{band}:" + make_cache_key(
+            signature[band * _ROWS_PER_BAND:(band + 1) * _ROWS_PER_BAND].tobytes().hex()
+        )[:16]
+        for band in range(LSH_BANDS)
+    ]
+
+
+class NearDuplicateIndex:
+    """In-memory LSH index mapping new signatures to the first similar one seen"""
+
+    def __init__(self, threshold: float = DEDUP_THRESHOLD):
+        self.threshold = threshold
+        self._buckets: Dict[str, List[Tuple[Hashable, np.ndarray]]] = {}
+
+    def find(self, signature: np.ndarray, keys: Optional[List[str]] = None) -> Optional[Hashable]:
+        best, best_similarity = None, self.threshold
+        for key in keys or band_keys(signature):
+            for item, other in self._buckets.get(key, []):
+                score = similarity(signature, other)
+                if score >= best_similarity:
+                    best, best_similarity = item, score
+        return best
+
+    def add(self, item: Hashable, signature: np.ndarray, keys: Optional[List[str]] = None):
+        for key in keys or band_keys(signature):
+            self._buckets.setdefault(key, []).append((item, signature))
+
+
+class ResumeDeduplicator:
+    """Groups the extracted resumes of one task into near-duplicate clusters.
+
+    ``representative`` returns the ``upload_id`` of an earlier resume in the
+    same task that an extraction copies, so the pipeline can reuse that result.
+    """
+
+    def __init__(self, threshold: float = DEDUP_THRESHOLD):
+        self.threshold = threshold
+        self._task_index = NearDuplicateIndex(threshold)
+
+    def representative(self, extraction: Dict) -> Optional[int]:
+        text = extraction.get("text_content", "").strip()
+        if not text:
+            return None
+        signature = minhash_signature(text)
+        keys = band_keys(signature)
+
+        original = self._task_index.find(signature, keys)
+        if original is None:
+            self._task_index.add(extraction["upload_id"], signature, keys)
+        return original
@@ -1,24 +1,17 @@
-import google.generativeai as genai
 import os
 import json
-from typing import List, Dict, Any
+from typing import Dict, Any, Optional
 from dotenv import load_dotenv
 import logging
+
+from services.cache_store import TieredCache, get_cache_store, make_cache_key
+from services.gemini_client import GeminiClient, get_gemini_client
+from services.rate_limiter import estimate_tokens
+
 logger = logging.getLogger(__name__)
 load_dotenv()
 
-class ResumeParser:
-    def __init__(self):
-        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-        self.model = genai.GenerativeModel("gemini-2.5-pro")
-        self.generation_config = genai.GenerationConfig(
-            response_mime_type="application/json",
-            temperature=0.1
-        )
-
-    def parse_resume(self, resume_text: str) -> dict[str, Any]:
-        """Parse a single resume text and return structured JSON"""
-        prompt = f"""
+PARSE_PROMPT_TEMPLATE = """
 You are a smart resume parser. Extract **all relevant information** from the resume text and return a structured and complete JSON object.
 
 Resume text:
@@ -35,10 +28,54 @@ Instructions:
 Return only the JSON object.
 """
 
+# Cached parses are keyed on the template itself, so editing the prompt
+# automatically invalidates every profile parsed with the old one
+PARSE_PROMPT_VERSION = make_cache_key(PARSE_PROMPT_TEMPLATE)[:16]
+# Expected size of the JSON profile returned, reserved against the TPM quota
+ESTIMATED_PARSE_OUTPUT_TOKENS = 1000
+
+_parse_cache: Optional[TieredCache] = None
+
+
+def get_parse_cache() -> TieredCache:
+    """Process-wide cache of parsed resumes, keyed by resume text hash"""
+    global _parse_cache
+    if _parse_cache is None:
+        _parse_cache = TieredCache(
+            "parsed_resumes",
+            store=get_cache_store(),
+            max_memory_bytes=int(os.getenv("PARSE_CACHE_MEMORY_BYTES", str(32 * 1024 * 1024)))
+        )
+    return _parse_cache
+
+
+class ResumeParser:
+    def __init__(self, cache: Optional[TieredCache] = None, client: Optional[GeminiClient] = None):
+        # The model is created by the shared client on the first request, not here
+        self.client = client or get_gemini_client()
+        self.cache = cache if cache is not None else get_parse_cache()
+
+    def cache_key(self, resume_text: str) -> str:
+        return make_cache_key(self.client.model_name("parse"), PARSE_PROMPT_VERSION, resume_text)
+
+    @staticmethod
+    def _build_prompt(resume_text: str) -> str:
+        return PARSE_PROMPT_TEMPLATE.format(resume_text=resume_text)
 
+    async def _parse_with_gemini_async(self, resume_text: str) -> dict[str, Any]:
         try:
-            response = self.model.generate_content(prompt, generation_config=self.generation_config)
+            prompt = self._build_prompt(resume_text)
+            response = await self.client.generate_async(
+                "parse", prompt, estimate_tokens(prompt) + ESTIMATED_PARSE_OUTPUT_TOKENS
+            )
+            return self._read_response(response)
+        except Exception as e:
+            logger.error(f"Gemini error: {e}")
+            return {"error": f"Gemini request failed: {str(e)}"}
 
+    @staticmethod
+    def _read_response(response) -> dict[str, Any]:
+        try:
             # Safely access content (Gemini sometimes returns candidate list)
             raw_text = response.candidates[0].content.parts[0].text.strip()
             # Parse JSON
@@ -48,61 +85,65 @@ Return only the JSON object.
             logger.warning(f"JSON parsing failed: {je}")
             return {"error": "Invalid JSON format from Gemini", "details": str(je)}
 
+    async def parse_resume_async(self, resume_text: str) -> dict[str, Any]:
+        """Parse one resume text into structured JSON, reusing cached parses.
+
+        Cache hits return immediately; misses wait for the shared Gemini quota and
+        run the SDK call on a worker thread. Only successful parses are cached.
+        """
+        key = self.cache_key(resume_text)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        parsed = await self._parse_with_gemini_async(resume_text)
+        if "error" not in parsed:
+            self.cache.set(key, parsed)
+        return parsed
+
+    async def parse_extracted_resume_async(self, pdf_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Parse one PDFProcessor result into the parser's result shape"""
+        filename = pdf_data.get("filename", "unknown")
+        try:
+            rejected = self.check_extraction(pdf_data)
+            if rejected:
+                return rejected
+            resume_text = pdf_data.get("text_content", "").strip()
+            return self.build_result(pdf_data, resume_text, await self.parse_resume_async(resume_text))
         except Exception as e:
-            logger.error(f"Gemini error: {e}")
-            return {"error": f"Gemini request failed: {str(e)}"}
-
-    def parse_multiple_resumes(self, pdf_processor_output: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Parse multiple resume texts and return structured JSON responses"""
-        parsed_results = []
-
-        for pdf_data in pdf_processor_output:
-            filename = pdf_data.get("filename", "unknown")
-
-            try:
-                if not pdf_data.get("extraction_success", False):
-                    parsed_results.append({
-                        "filename": filename,
-                        "parsing_success": False,
-                        "error": pdf_data.get("error", "Text extraction failed"),
-                        "parsed_data": {}
-                    })
-                    continue
-
-                resume_text = pdf_data.get("text_content", "").strip()
-
-                if len(resume_text) < 50:
-                    parsed_results.append({
-                        "filename": filename,
-                        "parsing_success": False,
-                        "error": "Insufficient text content for parsing",
-                        "parsed_data": {}
-                    })
-                    continue
-
-                parsed_data = self.parse_resume(resume_text)
-
-                if "error" in parsed_data:
-                    parsed_results.append({
-                        "filename": filename,
-                        "parsing_success": False,
-                        "error": parsed_data["error"],
-                        "parsed_data": {}
-                    })
-                else:
-                    parsed_results.append({
-                        "filename": filename,
-                        "parsing_success": True,
-                        "parsed_data": parsed_data,
-                        "text_length": pdf_data.get("text_length", len(resume_text))
-                    })
-
-            except Exception as e:
-                parsed_results.append({
-                    "filename": filename,
-                    "parsing_success": False,
-                    "error": str(e),
-                    "parsed_data": {}
-                })
-
-        return parsed_results
+            return self._build_error(filename, str(e))
+
+    def get_cached(self, resume_text: str) -> Optional[dict[str, Any]]:
+        """Previously parsed profile for this text, if any"""
+        return self.cache.get(self.cache_key(resume_text))
+
+    def check_extraction(self, pdf_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Failure result if this extraction cannot be parsed, otherwise None"""
+        filename = pdf_data.get("filename", "unknown")
+        if not pdf_data.get("extraction_success", False):
+            return self._build_error(filename, pdf_data.get("error", "Text extraction failed"))
+
+        if len(pdf_data.get("text_content", "").strip()) < 50:
+            return self._build_error(filename, "Insufficient text content for parsing")
+        return None
+
+    @staticmethod
+    def build_result(pdf_data: Dict[str, Any], resume_text: str, parsed_data: dict) -> Dict[str, Any]:
+        filename = pdf_data.get("filename", "unknown")
+        if "error" in parsed_data:
+            return ResumeParser._build_error(filename, parsed_data["error"])
+        return {
+            "filename": filename,
+            "parsing_success": True,
+            "parsed_data": parsed_data,
+            "text_length": pdf_data.get("text_length", len(resume_text))
+        }
+
+    @staticmethod
+    def _build_error(filename: str, error: str) -> Dict[str, Any]:
+        return {
+            "filename": filename,
+            "parsing_success": False,
+            "error": error,
+            "parsed_data": {}
+        }
@@ -0,0 +1,432 @@
+import asyncio
+import math
+import os
+import time
+from typing import List, Dict, Optional, Callable
+import logging
+
+from services.pdf_processor import PDFProcessor
+from services.resume_parser import ResumeParser
+from services.resume_scoring_service import (
+    RateLimitedResumeScorer, DEFAULT_SCORING_BATCH_SIZE, DEFAULT_SCORING_MODE, rank_key
+)
+from services.jd_profile import JobDescriptionProfiler
+from services.prefilter_ranker import prefilter_candidates
+from services.resume_dedup import RESUME_DEDUP_ENABLED, ResumeDeduplicator
+from services.metrics import StageTimer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PARSE_CONCURRENCY = int(os.getenv("PIPELINE_PARSE_CONCURRENCY", "4"))
+DEFAULT_SCORE_CONCURRENCY = int(os.getenv("PIPELINE_SCORE_CONCURRENCY", "4"))
+DEFAULT_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "16"))
+# How long a scoring worker waits to fill a batch when batched scoring is enabled
+DEFAULT_BATCH_LINGER_SECONDS = float(os.getenv("PIPELINE_BATCH_LINGER_SECONDS", "2"))
+
+_DONE = object()
+
+
+class PipelineError(RuntimeError):
+    """Raised when a whole stage produced nothing usable (e.g. no PDF could be read)"""
+
+
+def planned_gemini_requests(job_description: str, resume_count: int, prefilter_top_n: Optional[int] = None,
+                            combined: Optional[bool] = None, batch_size: int = DEFAULT_SCORING_BATCH_SIZE) -> int:
+    """Gemini requests a batch is expected to make, before cache hits and duplicates.
+
+    Separate mode parses every resume and scores the escalated ones in batches of
+    ``batch_size``; combined mode makes one request per escalated resume. A
+    pre-filter min score is not counted, since what it cuts is only known later.
+    """
+    combined = combined if combined is not None else DEFAULT_SCORING_MODE == "combined"
+    escalated = resume_count if prefilter_top_n is None else min(resume_count, max(1, prefilter_top_n))
+    requests = escalated if combined else resume_count + math.ceil(escalated / max(1, batch_size))
+    if resume_count and JobDescriptionProfiler().wants_profile(job_description):
+        requests += 1
+    return requests
+
+
+class ResumePipeline:
+    """Streams each resume through extract → parse → score on its own.
+
+    Stages are connected by bounded asyncio queues, so a slow stage applies
+    backpressure to the one before it, and each stage has its own worker count.
+    The first scored candidate is reported as soon as its resume clears all three
+    stages instead of after the whole batch has been parsed. The job description
+    is profiled alongside extraction, once per task.
+
+    When the local pre-filter is enabled, scoring has to see every parsed resume
+    before it can pick the top candidates, so that stage alone waits for parsing
+    to finish.
+
+    In combined mode the parse and score stages collapse into one request per
+    resume; the pre-filter then ranks the extracted text instead, after extraction.
+
+    Near-duplicate resumes are caught right after extraction: only the first
+    copy goes on to Gemini, and the others receive its result (marked with
+    ``duplicate_of``) and rank below every original. If that copy fails to
+    parse, the next one in its cluster is parsed instead. Every upload gets an
+    ``upload_id`` (its index in the batch), since filenames need not be unique.
+    """
+
+    def __init__(self, pdf_processor: Optional[PDFProcessor] = None, resume_parser: Optional[ResumeParser] = None,
+                 scorer: Optional[RateLimitedResumeScorer] = None, parse_concurrency: int = DEFAULT_PARSE_CONCURRENCY,
+                 score_concurrency: int = DEFAULT_SCORE_CONCURRENCY, queue_size: int = DEFAULT_QUEUE_SIZE,
+                 batch_linger: float = DEFAULT_BATCH_LINGER_SECONDS, combined: Optional[bool] = None,
+                 dedup: bool = RESUME_DEDUP_ENABLED):
+        self.pdf_processor = pdf_processor or PDFProcessor()
+        self.resume_parser = resume_parser or ResumeParser()
+        self.scorer = scorer or RateLimitedResumeScorer()
+        self.parse_concurrency = parse_concurrency
+        self.score_concurrency = score_concurrency
+        self.queue_size = queue_size
+        self.batch_linger = batch_linger
+        self.combined = combined if combined is not None else DEFAULT_SCORING_MODE == "combined"
+        self.dedup = dedup
+
+    async def run(self, job_description: str, file_data_list: List[Dict],
+                  on_extracted: Optional[Callable[[Dict], None]] = None,
+                  on_parsed: Optional[Callable[[Dict], None]] = None,
+                  on_scored: Optional[Callable[[Dict], None]] = None,
+                  prefilter_top_n: Optional[int] = None,
+                  prefilter_min_score: Optional[float] = None,
+                  timer: Optional[StageTimer] = None) -> Dict:
+        """Run the batch and return the same shape as ``score_resume_batch``.
+
+        Stage and queue-wait timings go to ``timer``; each result entry also
+        carries its own resume's timings.
+        """
+        timer = timer or StageTimer()
+        file_data_list = [dict(file_data, upload_id=index) for index, file_data in enumerate(file_data_list)]
+        # Queue items are (resume, enqueued_at) so workers can record queue wait
+        parse_queue = asyncio.Queue(maxsize=self.queue_size)
+        score_queue = asyncio.Queue(maxsize=self.queue_size)
+
+        results, locally_ranked, duplicates = [], [], []
+        counts = {
+            "extracted": 0, "extraction_failed": 0, "duplicates": 0,
+            "parsed": 0, "parsing_failed": 0, "scoring_failed": 0
+        }
+
+        deduplicator = ResumeDeduplicator() if self.dedup else None
+        # Copies waiting for their original's result, and originals already scored, by upload id
+        waiting_copies: Dict[int, List[Dict]] = {}
+        scored_originals: Dict[int, Dict] = {}
+        # Originals that failed parsing -> the copy parsed in their place (None until one arrives)
+        successors: Dict[int, Optional[int]] = {}
+
+        def copy_result(entry: Dict, extraction: Dict) -> Dict:
+            duplicate = dict(
+                entry, filename=extraction.get("filename"), upload_id=extraction["upload_id"],
+                duplicate_of=entry.get("filename")
+            )
+            duplicate["timings"] = timer.item_timings(extraction["upload_id"])
+            if duplicate.get("scoring_failed"):
+                counts["scoring_failed"] += 1
+            duplicates.append(duplicate)
+            return duplicate
+
+        def report_scored(entry: Dict):
+            if entry.get("scoring_failed"):
+                counts["scoring_failed"] += 1
+            entry["timings"] = timer.item_timings(entry["upload_id"])
+            results.append(entry)
+            if on_scored is not None:
+                on_scored(entry)
+            scored_originals[entry["upload_id"]] = entry
+            for extraction in waiting_copies.pop(entry["upload_id"], []):
+                report_duplicate(entry, extraction)
+
+        def report_duplicate(entry: Dict, extraction: Dict):
+            duplicate = copy_result(entry, extraction)
+            if on_scored is not None:
+                on_scored(duplicate)
+
+        def current_original(upload_id: int, extraction: Dict) -> Optional[int]:
+            """Original a new copy belongs to, or None if the copy has to be parsed itself"""
+            while successors.get(upload_id) is not None:
+                upload_id = successors[upload_id]
+            if upload_id in successors:
+                # Every earlier member failed parsing and none is waiting: this copy takes over
+                successors[upload_id] = extraction["upload_id"]
+                return None
+            return upload_id
+
+        def promote_copy(extraction: Dict) -> Optional[Dict]:
+            """The next copy in a failed original's cluster, which is parsed in its place"""
+            copies = waiting_copies.pop(extraction["upload_id"], [])
+            if not copies:
+                successors[extraction["upload_id"]] = None
+                return None
+            successor = copies[0]
+            successors[extraction["upload_id"]] = successor["upload_id"]
+            if copies[1:]:
+                waiting_copies[successor["upload_id"]] = copies[1:]
+            counts["duplicates"] -= 1
+            logger.info(f"{extraction.get('filename')} failed parsing; parsing its copy {successor.get('filename')}")
+            return successor
+
+        prefilter_enabled = prefilter_top_n is not None or prefilter_min_score is not None
+        # Combined mode has no parsed profile before scoring, so it pre-filters extracted text
+        prefilter_extractions = self.combined and prefilter_enabled
+
+        async def extract_stage():
+            extractions = []
+            async for extraction in self.pdf_processor.iter_extract_from_file_contents(file_data_list):
+                counts["extracted" if extraction.get("extraction_success") else "extraction_failed"] += 1
+                upload_id = extraction["upload_id"]
+                timer.observe_wait("extract", extraction.pop("extraction_wait_seconds", 0.0), upload_id)
+                timer.observe(
+                    "extract", extraction.pop("extraction_seconds", 0.0), upload_id,
+                    outcome="success" if extraction.get("extraction_success") else "failed"
+                )
+                if "ocr_seconds" in extraction:
+                    timer.observe("ocr", extraction.pop("ocr_seconds"), upload_id)
+                if on_extracted is not None:
+                    on_extracted(extraction)
+                if not extraction.get("extraction_success"):
+                    continue
+                if deduplicator is not None:
+                    started = time.monotonic()
+                    # MinHash signatures are CPU work; keep them off the event loop
+                    original = await asyncio.to_thread(deduplicator.representative, extraction)
+                    timer.observe("dedup", time.monotonic() - started, upload_id)
+                    if original is not None:
+                        original = current_original(original, extraction)
+                    if original is not None:
+                        counts["duplicates"] += 1
+                        if original in scored_originals:
+                            report_duplicate(scored_originals[original], extraction)
+                        else:
+                            waiting_copies.setdefault(original, []).append(extraction)
+                        continue
+                if prefilter_extractions:
+                    extractions.append(extraction)
+                else:
+                    await parse_queue.put((extraction, time.monotonic()))
+
+            if prefilter_extractions:
+                escalated, below_cut = prefilter_candidates(
+                    job_description, extractions, top_n=prefilter_top_n, min_score=prefilter_min_score
+                )
+                locally_ranked.extend(below_cut)
+                for extraction in escalated:
+                    await parse_queue.put((extraction, time.monotonic()))
+
+            for _ in range(self.parse_concurrency):
+                await parse_queue.put(_DONE)
+
+        async def next_extraction(stage: str):
+            item = await parse_queue.get()
+            if item is _DONE:
+                return None
+            extraction, enqueued_at = item
+            timer.observe_wait(stage, time.monotonic() - enqueued_at, extraction["upload_id"])
+            return extraction
+
+        async def parse_worker():
+            extraction = None
+            while True:
+                # A promoted copy is parsed right away, before taking new work
+                extraction = extraction or await next_extraction("parse")
+                if extraction is None:
+                    return
+                started = time.monotonic()
+                parsed = await self.resume_parser.parse_extracted_resume_async(extraction)
+                parsed["upload_id"] = extraction["upload_id"]
+                timer.observe(
+                    "parse", time.monotonic() - started, extraction["upload_id"],
+                    outcome="success" if parsed.get("parsing_success") else "failed"
+                )
+                counts["parsed" if parsed.get("parsing_success") else "parsing_failed"] += 1
+                if on_parsed is not None:
+                    on_parsed(parsed)
+                if parsed.get("parsing_success"):
+                    await score_queue.put((parsed, time.monotonic()))
+                    extraction = None
+                else:
+                    extraction = promote_copy(extraction)
+
+        async def combined_worker():
+            extraction = None
+            while True:
+                extraction = extraction or await next_extraction("parse_and_score")
+                if extraction is None:
+                    return
+                started = time.monotonic()
+                parsed, entry = await self._parse_and_score(job_description, extraction)
+                timer.observe(
+                    "parse_and_score", time.monotonic() - started, extraction["upload_id"],
+                    outcome="success" if entry is not None and not entry.get("scoring_failed") else "failed"
+                )
+                counts["parsed" if parsed.get("parsing_success") else "parsing_failed"] += 1
+                if on_parsed is not None:
+                    on_parsed(parsed)
+                if entry is not None:
+                    report_scored(entry)
+                    extraction = None
+                else:
+                    extraction = promote_copy(extraction)
+
+        async def parse_stage():
+            await asyncio.gather(*[parse_worker() for _ in range(self.parse_concurrency)])
+            for _ in range(self.score_concurrency):
+                await score_queue.put(_DONE)
+
+        async def score_group(group: List[Dict]):
+            started = time.monotonic()
+
+            def report_timed(entry: Dict):
+                timer.observe(
+                    "score", time.monotonic() - started, entry["upload_id"],
+                    outcome="failed" if entry.get("scoring_failed") else "success"
+                )
+                report_scored(entry)
+
+            await self.scorer.score_resume_batch(job_description, group, on_result=report_timed)
+
+        async def score_worker():
+            finished = False
+            while not finished:
+                timed_group, finished = await self._next_score_group(score_queue)
+                now = time.monotonic()
+                for parsed, enqueued_at in timed_group:
+                    timer.observe_wait("score", now - enqueued_at, parsed["upload_id"])
+                if timed_group:
+                    await score_group([parsed for parsed, _ in timed_group])
+
+        async def prefiltered_score_stage():
+            timed_resumes, done_workers = [], 0
+            while done_workers < self.score_concurrency:
+                item = await score_queue.get()
+                if item is _DONE:
+                    done_workers += 1
+                else:
+                    timed_resumes.append(item)
+
+            now = time.monotonic()
+            for parsed, enqueued_at in timed_resumes:
+                timer.observe_wait("score", now - enqueued_at, parsed["upload_id"])
+            escalated, below_cut = prefilter_candidates(
+                job_description, [parsed for parsed, _ in timed_resumes],
+                top_n=prefilter_top_n, min_score=prefilter_min_score
+            )
+            locally_ranked.extend(below_cut)
+            await score_group(escalated)
+
+        async def jd_profile_stage():
+            # Profile the job description while the first PDFs are still extracting,
+            # so scoring prompts find the requirements block ready
+            started = time.monotonic()
+            await self.scorer.prepare_job_description(job_description)
+            timer.observe("jd_profile", time.monotonic() - started)
+
+        if self.combined:
+            stage_coroutines = [
+                extract_stage(),
+                asyncio.gather(*[combined_worker() for _ in range(self.parse_concurrency)])
+            ]
+        elif prefilter_enabled:
+            stage_coroutines = [extract_stage(), parse_stage(), prefiltered_score_stage()]
+        else:
+            stage_coroutines = [
+                extract_stage(),
+                parse_stage(),
+                asyncio.gather(*[score_worker() for _ in range(self.score_concurrency)])
+            ]
+
+        stage_coroutines.append(jd_profile_stage())
+        stages = [asyncio.ensure_future(stage) for stage in stage_coroutines]
+        try:
+            await asyncio.gather(*stages)
+        except BaseException:
+            # A failed stage would leave its neighbours blocked on a queue forever
+            for stage in stages:
+                stage.cancel()
+            raise
+
+        if counts["extracted"] == 0:
+            raise PipelineError("No PDFs were successfully extracted for text.")
+        # In combined mode resumes below the pre-filter cut are ranked without being parsed
+        if counts["parsed"] == 0 and not locally_ranked:
+            raise PipelineError("No resumes could be parsed by Gemini API.")
+
+        for entry in locally_ranked:
+            entry["timings"] = timer.item_timings(entry["upload_id"])
+            for extraction in waiting_copies.pop(entry["upload_id"], []):
+                copy_result(entry, extraction)
+
+        results.sort(key=rank_key, reverse=True)
+        scored = [entry for entry in results if not entry.get("scoring_failed")]
+        failed = [entry for entry in results + duplicates if entry.get("scoring_failed")]
+        # Below the pre-filter cut, so these rank after every LLM-scored candidate;
+        # copies of another resume follow, and rows whose scoring failed have no rank and come last
+        results = scored + locally_ranked + [entry for entry in duplicates if not entry.get("scoring_failed")] + failed
+
+        logger.info(
+            f"Pipeline finished: {counts['extracted']}/{len(file_data_list)} extracted, "
+            f"{counts['duplicates']} duplicates, {counts['parsed']} parsed, {len(locally_ranked)} pre-filtered out, "
+            f"{len(results) - len(failed)} ranked, {len(failed)} failed scoring"
+        )
+        return {
+            "total_processed": len(results),
+            "processing_rate": f"{self.scorer.resumes_per_minute} resumes/minute",
+            "quota": self.scorer.quota_status(),
+            "stage_counts": counts,
+            "prefiltered_out": len(locally_ranked),
+            "timings": timer.summary(),
+            "results": results
+        }
+
+    async def _parse_and_score(self, job_description: str, extraction: Dict):
+        """One combined request per resume, or the two-step path when that is cheaper or fails.
+
+        Returns (parsed_result, result_entry or None).
+        """
+        rejected = self.resume_parser.check_extraction(extraction)
+        if rejected:
+            return rejected, None
+
+        # A cached profile makes the separate score call the only request needed
+        if self.resume_parser.get_cached(extraction["text_content"].strip()) is None:
+            try:
+                return await self.scorer.parse_and_score_resume(job_description, extraction)
+            except Exception as e:
+                logger.warning(f"Combined parse+score failed for {extraction.get('filename')}, using two requests: {e}")
+
+        parsed = await self.resume_parser.parse_extracted_resume_async(extraction)
+        parsed["upload_id"] = extraction["upload_id"]
+        if not parsed.get("parsing_success"):
+            return parsed, None
+
+        entries = []
+        await self.scorer.score_resume_batch(job_description, [parsed], on_result=entries.append)
+        return parsed, entries[0] if entries else None
+
+    async def _next_score_group(self, score_queue: asyncio.Queue):
+        """Take one queued item, or up to ``scorer.batch_size`` when batched scoring is on.
+
+        Returns ((resume, enqueued_at) items, saw_done_marker).
+        """
+        first = await score_queue.get()
+        if first is _DONE:
+            return [], True
+
+        group = [first]
+        if self.scorer.batch_size <= 1:
+            return group, False
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.batch_linger
+        while len(group) < self.scorer.batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(score_queue.get(), timeout=remaining)
+            except asyncio.TimeoutError:
+                break
+            if item is _DONE:
+                return group, True
+            group.append(item)
+        return group, False
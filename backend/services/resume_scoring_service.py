@@ -1,76 +1,31 @@
-import google.generativeai as genai
 import os
 import json
 import asyncio
+import heapq
+import itertools
+import re
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional, Callable
+import logging
 
-class RateLimitedResumeScorer:
-    def __init__(self):
-        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-        self.model = genai.GenerativeModel("gemini-2.5-pro")
-        
-        self.generation_config = genai.GenerationConfig(
-            response_mime_type="application/json",
-            temperature=0.1
-        )
-        
-        # Rate limiting: 4 resumes per minute
-        self.resumes_per_minute = 4
-        self.delay_between_requests = 10  # seconds
+from services.gemini_client import GeminiClient, get_gemini_client
+from services.rate_limiter import estimate_tokens
+from services.cache_store import TieredCache, get_cache_store, make_cache_key
+from services.jd_profile import JD_PROFILE_PROMPT_VERSION, JobDescriptionProfiler
 
-    async def score_resume_batch(self, job_description: str, parsed_resumes: List[Dict]) -> Dict:
-        """Score resumes using structured JSON data from resume parser"""
-        results = []
-        successful_resumes = [r for r in parsed_resumes if r.get("parsing_success", False)]
-        total_resumes = len(successful_resumes)
-        
-        for index, resume_data in enumerate(successful_resumes):
-            try:
-                score_result = await self.score_single_resume(
-                    job_description, 
-                    resume_data["parsed_data"],
-                    resume_data["filename"]
-                )
-                
-                results.append({
-                    "filename": resume_data["filename"],
-                    "candidate_name": resume_data["parsed_data"].get("name", "Unknown"),
-                    "match_score": score_result.get("match_score", 0),
-                    "detailed_scores": score_result,
-                    "processed_at": datetime.now().isoformat()
-                })
-                
-                # Rate limiting delay
-                if index < total_resumes - 1:
-                    await asyncio.sleep(self.delay_between_requests)
-                    
-            except Exception as e:
-                results.append({
-                    "filename": resume_data["filename"],
-                    "error": str(e),
-                    "match_score": 0
-                })
-        
-        # Sort by score
-        results.sort(key=lambda x: x.get("match_score", 0), reverse=True)
-        
-        return {
-            "total_processed": len(results),
-            "processing_rate": f"{self.resumes_per_minute} resumes/minute",
-            "results": results
-        }
+logger = logging.getLogger(__name__)
 
-    async def score_single_resume(self, job_description: str, parsed_resume_json: dict, filename: str) -> dict:
-        """Score resume using structured JSON data"""
-        prompt = f"""
-Compare this structured resume data against the job description:
+# Expected size of the JSON score object, used when reserving tokens up front
+ESTIMATED_OUTPUT_TOKENS = 256
 
-JOB DESCRIPTION:
-{job_description}
+# Every prompt is a prefix shared by the whole task (instructions, output format and
+# the job requirements) followed by the candidate-specific part, so the prefix can be
+# served from Gemini's prompt cache instead of being re-read for each resume
+SCORING_PROMPT_TEMPLATE = """
+Compare the candidate's structured resume data against the job requirements.
 
-CANDIDATE RESUME DATA:
-{json.dumps(parsed_resume_json, indent=2)}
+JOB REQUIREMENTS:
+{requirements}
 
 Return exact format:
 {{
@@ -83,8 +38,435 @@ Return exact format:
 }}
 """
 
+SCORING_CANDIDATE_TEMPLATE = """
+CANDIDATE RESUME DATA:
+{resume_json}
+"""
+
+BATCH_SCORING_PROMPT_TEMPLATE = """
+Compare each candidate's structured resume data against the job requirements.
+Score every candidate independently of the others.
+
+JOB REQUIREMENTS:
+{requirements}
+
+Return a JSON object with one entry per candidate, in the order the candidates are given, in this exact format:
+{{
+  "results": [
+    {{
+      "candidate_id": "c0",
+      "match_score": 85,
+      "skill_match_score": 90,
+      "experience_match_score": 80,
+      "education_match_score": 85,
+      "skillset_for_role": ["skill1", "skill2"],
+      "overall_fit": "perfect/high/low/very low"
+    }}
+  ]
+}}
+"""
+
+BATCH_SCORING_CANDIDATES_TEMPLATE = """
+CANDIDATES (JSON array, each with a "candidate_id" and its "resume"):
+{candidates_json}
+"""
+
+COMBINED_PROMPT_TEMPLATE = """
+You are a smart resume parser and recruiter. In one pass, extract the candidate's profile from the resume text and score it against the job requirements.
+
+JOB REQUIREMENTS:
+{requirements}
+
+Instructions for "profile":
+- Include all clearly identified fields like name, email, phone, skills, education, experience, projects, certifications, languages, links, etc.
+- If any field is missing in the resume, skip it (do not insert null or empty fields).
+- Use intuitive field names and keep lists for repeated fields (e.g., skills, education, experience).
+- Keep text clean — remove newlines and unnecessary whitespace.
+
+Return only a JSON object in this exact format:
+{{
+  "profile": {{"name": "...", "skills": ["..."], "education": [], "experience": []}},
+  "scores": {{
+    "match_score": 85,
+    "skill_match_score": 90,
+    "experience_match_score": 80,
+    "education_match_score": 85,
+    "skillset_for_role": ["skill1", "skill2"],
+    "overall_fit": "perfect/high/low/very low"
+  }}
+}}
+"""
+
+COMBINED_RESUME_TEMPLATE = """
+RESUME TEXT:
+{resume_text}
+"""
+
+# Profile plus score object, reserved against the TPM quota for a combined call
+ESTIMATED_COMBINED_OUTPUT_TOKENS = 1500
+
+# Scoring mode used by the pipeline: "separate" (parse, then score) or
+# "combined" (one request returns both the profile and the scores)
+DEFAULT_SCORING_MODE = os.getenv("SCORING_MODE", "separate").lower()
+
+# Cached scores are keyed on the templates themselves, so editing a prompt
+# automatically invalidates every score produced by the old one
+SCORING_PROMPT_VERSION = make_cache_key(
+    SCORING_PROMPT_TEMPLATE, SCORING_CANDIDATE_TEMPLATE, BATCH_SCORING_PROMPT_TEMPLATE,
+    BATCH_SCORING_CANDIDATES_TEMPLATE, COMBINED_PROMPT_TEMPLATE, COMBINED_RESUME_TEMPLATE, JD_PROFILE_PROMPT_VERSION
+)[:16]
+
+# Batched scoring packs up to SCORING_BATCH_SIZE resumes into one request,
+# limited so the estimated prompt stays under SCORING_BATCH_TOKEN_BUDGET
+DEFAULT_SCORING_BATCH_SIZE = int(os.getenv("SCORING_BATCH_SIZE", "1"))
+DEFAULT_SCORING_BATCH_TOKEN_BUDGET = int(os.getenv("SCORING_BATCH_TOKEN_BUDGET", "24000"))
+
+# Candidates kept ranked while a batch is still being scored
+DEFAULT_RESULTS_TOP_K = int(os.getenv("RESULTS_TOP_K", "100"))
+
+_score_cache: Optional[TieredCache] = None
+
+
+def get_score_cache() -> TieredCache:
+    """Process-wide cache of scores per (job description, parsed resume) pair"""
+    global _score_cache
+    if _score_cache is None:
+        _score_cache = TieredCache(
+            "resume_scores",
+            store=get_cache_store(),
+            max_memory_bytes=int(os.getenv("SCORE_CACHE_MEMORY_BYTES", str(16 * 1024 * 1024))),
+            max_entries=int(os.getenv("SCORE_CACHE_MAX_ENTRIES", "50000")),
+            ttl_seconds=float(os.getenv("SCORE_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+        )
+    return _score_cache
+
+
+def normalize_job_description(job_description: str) -> str:
+    """Whitespace-insensitive form of a job description used for fingerprinting"""
+    return re.sub(r"\s+", " ", job_description).strip()
+
+
+def score_cache_key(requirements: str, parsed_resume_json: dict, model_name: str) -> str:
+    return make_cache_key(
+        model_name,
+        SCORING_PROMPT_VERSION,
+        normalize_job_description(requirements),
+        json.dumps(parsed_resume_json, sort_keys=True, separators=(",", ":"))
+    )
+
+
+def plan_scoring_batches(job_description: str, resumes: List[Dict], max_batch_size: int,
+                         token_budget: int) -> List[List[Dict]]:
+    """Greedily pack resumes into groups whose estimated prompt fits the token budget"""
+    fixed_tokens = estimate_tokens(BATCH_SCORING_PROMPT_TEMPLATE) + estimate_tokens(job_description)
+    batches, current, current_tokens = [], [], fixed_tokens
+
+    for resume_data in resumes:
+        resume_tokens = estimate_tokens(json.dumps(resume_data["parsed_data"], separators=(",", ":")))
+        if current and (len(current) >= max_batch_size or current_tokens + resume_tokens > token_budget):
+            batches.append(current)
+            current, current_tokens = [], fixed_tokens
+        current.append(resume_data)
+        current_tokens += resume_tokens
+
+    if current:
+        batches.append(current)
+    return batches
+
+
+def with_upload_id(entry: Dict, source: Dict) -> Dict:
+    """Copy the pipeline's per-upload id (filenames need not be unique within a batch)"""
+    if "upload_id" in source:
+        entry["upload_id"] = source["upload_id"]
+    return entry
+
+
+def rank_key(entry: Dict):
+    """Sort key for result rows: scored candidates by score, then copies of another resume, failed rows last"""
+    score = entry.get("match_score")
+    return (score is not None, not entry.get("duplicate_of"), score or 0)
+
+
+class RunningTopK:
+    """The best ``k`` result rows by ``rank_key``, kept up to date as rows arrive.
+
+    A min-heap holds the current top ``k`` with the weakest row at the root, so
+    each new row costs O(log k) instead of re-sorting everything scored so far.
+    Among equal scores the earlier row ranks first.
+    """
+
+    def __init__(self, k: int = DEFAULT_RESULTS_TOP_K):
+        self.k = max(1, k)
+        self.total = 0
+        self._heap = []
+        self._order = itertools.count()
+        self._ranked: Optional[List[Dict]] = []
+
+    def push(self, entry: Dict) -> bool:
+        """Add a row; True if it made the top ``k``"""
+        self.total += 1
+        item = (rank_key(entry), -next(self._order), entry)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, item)
+        elif item[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, item)
+        else:
+            return False
+        self._ranked = None
+        return True
+
+    def ranked(self) -> List[Dict]:
+        """Top rows, best first"""
+        if self._ranked is None:
+            self._ranked = [item[2] for item in sorted(self._heap, key=lambda item: item[:2], reverse=True)]
+        return self._ranked
+
+    def rank(self, entry: Dict) -> Optional[int]:
+        """1-based rank of ``entry`` if it is in the top ``k``"""
+        for position, ranked_entry in enumerate(self.ranked(), start=1):
+            if ranked_entry is entry:
+                return position
+        return None
+
+
+def _is_valid_score(score) -> bool:
+    return isinstance(score, dict) and isinstance(score.get("match_score"), (int, float))
+
+class RateLimitedResumeScorer:
+    def __init__(self, client: Optional[GeminiClient] = None, max_concurrency: Optional[int] = None,
+                 cache: Optional[TieredCache] = None, batch_size: Optional[int] = None,
+                 batch_token_budget: Optional[int] = None, profiler: Optional[JobDescriptionProfiler] = None):
+        # Model, worker pool and rate limiter all live on the shared client
+        self.client = client or get_gemini_client()
+        # One scorer serves one task, so its job description is profiled at most once
+        self.profiler = profiler or JobDescriptionProfiler(self.client)
+        self.rate_limiter = self.client.rate_limiter
+        self.resumes_per_minute = self.rate_limiter.requests_per_minute
+
+        self.max_concurrency = max_concurrency or self.client.max_concurrency
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        self.cache = cache if cache is not None else get_score_cache()
+
+        # batch_size > 1 enables packing several resumes into one scoring request
+        self.batch_size = batch_size or DEFAULT_SCORING_BATCH_SIZE
+        self.batch_token_budget = batch_token_budget or DEFAULT_SCORING_BATCH_TOKEN_BUDGET
+
+    async def prepare_job_description(self, job_description: str) -> str:
+        """Build the requirements block every scoring prompt starts with (cached across tasks)"""
+        return await self.profiler.requirements(job_description)
+
+    async def _prompt_prefix(self, template: str, job_description: str) -> str:
+        return template.format(requirements=await self.prepare_job_description(job_description))
+
+    async def score_resume_batch(self, job_description: str, parsed_resumes: List[Dict],
+                                 on_result: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """Score resumes concurrently, as fast as the configured quota allows
+
+        ``on_result`` is called with each candidate entry as soon as it is scored.
+        """
+        successful_resumes = [r for r in parsed_resumes if r.get("parsing_success", False)]
+
+        if self.batch_size > 1:
+            results = await self._score_in_batches(job_description, successful_resumes, on_result)
+        else:
+            async def score_and_report(resume_data: Dict) -> Dict:
+                entry = await self._score_entry(job_description, resume_data)
+                if on_result is not None:
+                    on_result(entry)
+                return entry
+
+            results = list(await asyncio.gather(*[
+                score_and_report(resume_data)
+                for resume_data in successful_resumes
+            ]))
+        
+        # Sort by score
+        results.sort(key=rank_key, reverse=True)
+        
+        return {
+            "total_processed": len(results),
+            "processing_rate": f"{self.resumes_per_minute} resumes/minute",
+            "quota": self.client.quota_status(),
+            "results": results
+        }
+
+    async def _score_entry(self, job_description: str, resume_data: Dict) -> Dict:
         try:
-            response = self.model.generate_content(prompt, generation_config=self.generation_config)
-            return json.loads(response.text)
+            score_result = await self.score_single_resume(
+                job_description, 
+                resume_data["parsed_data"],
+                resume_data["filename"]
+            )
+            return self._build_entry(resume_data, score_result)
+                
         except Exception as e:
-            return {"match_score": 0, "error": f"Scoring failed: {str(e)}"}
+            logger.warning(f"Scoring failed for {resume_data['filename']}: {e}")
+            # No score rather than 0, so a failure is never ranked as a weak candidate
+            return with_upload_id({
+                "filename": resume_data["filename"],
+                "candidate_name": resume_data["parsed_data"].get("name", "Unknown"),
+                "match_score": None,
+                "scoring_failed": True,
+                "error": f"Scoring failed: {str(e)}",
+                "processed_at": datetime.now().isoformat()
+            }, resume_data)
+
+    @staticmethod
+    def _build_entry(resume_data: Dict, score_result: dict) -> Dict:
+        return with_upload_id({
+            "filename": resume_data["filename"],
+            "candidate_name": resume_data["parsed_data"].get("name", "Unknown"),
+            "match_score": score_result.get("match_score", 0),
+            "detailed_scores": score_result,
+            "processed_at": datetime.now().isoformat()
+        }, resume_data)
+
+    async def _score_in_batches(self, job_description: str, resumes: List[Dict],
+                                on_result: Optional[Callable[[Dict], None]]) -> List[Dict]:
+        results = []
+
+        def report(entry: Dict):
+            results.append(entry)
+            if on_result is not None:
+                on_result(entry)
+
+        # Cached pairs never enter a batch
+        uncached = []
+        for resume_data in resumes:
+            cached = self.cache.get(await self._cache_key(job_description, resume_data["parsed_data"]))
+            if cached is not None:
+                report(self._build_entry(resume_data, cached))
+            else:
+                uncached.append(resume_data)
+
+        batches = plan_scoring_batches(job_description, uncached, self.batch_size, self.batch_token_budget)
+        logger.info(f"Scoring {len(uncached)} resumes in {len(batches)} batched requests")
+
+        async def score_batch(batch: List[Dict]):
+            for entry in await self.score_resume_group(job_description, batch):
+                report(entry)
+
+        await asyncio.gather(*[score_batch(batch) for batch in batches])
+        return results
+
+    async def score_resume_group(self, job_description: str, resumes: List[Dict]) -> List[Dict]:
+        """Score several parsed resumes with one request that sends the job description once.
+
+        If the response does not contain a valid score for every candidate, the
+        group falls back to one request per resume.
+        """
+        if len(resumes) == 1:
+            return [await self._score_entry(job_description, resumes[0])]
+
+        candidate_ids = [f"c{index}" for index in range(len(resumes))]
+        candidates = [
+            {"candidate_id": candidate_id, "resume": resume_data["parsed_data"]}
+            for candidate_id, resume_data in zip(candidate_ids, resumes)
+        ]
+        prefix = await self._prompt_prefix(BATCH_SCORING_PROMPT_TEMPLATE, job_description)
+        prompt = BATCH_SCORING_CANDIDATES_TEMPLATE.format(candidates_json=json.dumps(candidates, separators=(",", ":")))
+
+        try:
+            response = await self._generate(prompt, ESTIMATED_OUTPUT_TOKENS * len(resumes), prefix)
+            scores = self._validate_group_response(json.loads(response.text), candidate_ids)
+        except Exception as e:
+            logger.warning(f"Batched scoring of {len(resumes)} resumes failed, scoring individually: {e}")
+            return list(await asyncio.gather(*[
+                self._score_entry(job_description, resume_data) for resume_data in resumes
+            ]))
+
+        entries = []
+        for candidate_id, resume_data in zip(candidate_ids, resumes):
+            score = scores[candidate_id]
+            self.cache.set(await self._cache_key(job_description, resume_data["parsed_data"]), score)
+            entries.append(self._build_entry(resume_data, score))
+        return entries
+
+    async def parse_and_score_resume(self, job_description: str, extraction: Dict) -> tuple:
+        """Parse and score one extracted resume with a single request.
+
+        Returns ``(parsed_result, entry)`` in the same shapes ResumeParser and
+        score_resume_batch produce. Raises ValueError when the response is not a
+        usable profile plus score, so callers can fall back to two requests.
+        """
+        resume_text = extraction.get("text_content", "").strip()
+        prefix = await self._prompt_prefix(COMBINED_PROMPT_TEMPLATE, job_description)
+        prompt = COMBINED_RESUME_TEMPLATE.format(resume_text=resume_text)
+
+        response = await self._generate(prompt, ESTIMATED_COMBINED_OUTPUT_TOKENS, prefix)
+        payload = json.loads(response.text)
+
+        profile = payload.get("profile") if isinstance(payload, dict) else None
+        scores = payload.get("scores") if isinstance(payload, dict) else None
+        if not isinstance(profile, dict) or not profile or not _is_valid_score(scores):
+            raise ValueError("combined response is missing a profile or a valid score")
+
+        parsed_result = with_upload_id({
+            "filename": extraction.get("filename", "unknown"),
+            "parsing_success": True,
+            "parsed_data": profile,
+            "text_length": extraction.get("text_length", len(resume_text)),
+            "parsed_by": "combined"
+        }, extraction)
+        self.cache.set(await self._cache_key(job_description, profile), scores)
+        return parsed_result, self._build_entry(parsed_result, scores)
+
+    @staticmethod
+    def _validate_group_response(payload, candidate_ids: List[str]) -> Dict[str, dict]:
+        """Map candidate_id -> score, raising if any candidate is missing or malformed"""
+        items = payload.get("results") if isinstance(payload, dict) else payload
+        if not isinstance(items, list):
+            raise ValueError("response has no results array")
+
+        scores = {}
+        for item in items:
+            if _is_valid_score(item) and item.get("candidate_id") in candidate_ids:
+                score = dict(item)
+                scores[score.pop("candidate_id")] = score
+
+        missing = [candidate_id for candidate_id in candidate_ids if candidate_id not in scores]
+        if missing:
+            raise ValueError(f"missing or invalid scores for {', '.join(missing)}")
+        return scores
+
+    async def score_single_resume(self, job_description: str, parsed_resume_json: dict, filename: str) -> dict:
+        """Score resume using structured JSON data, reusing the score of an identical pair"""
+        key = await self._cache_key(job_description, parsed_resume_json)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        score = await self._score_with_gemini(job_description, parsed_resume_json, filename)
+        self.cache.set(key, score)
+        return score
+
+    async def _score_with_gemini(self, job_description: str, parsed_resume_json: dict, filename: str) -> dict:
+        prefix = await self._prompt_prefix(SCORING_PROMPT_TEMPLATE, job_description)
+        prompt = SCORING_CANDIDATE_TEMPLATE.format(
+            # Compact separators: indentation only costs input tokens
+            resume_json=json.dumps(parsed_resume_json, separators=(",", ":"), ensure_ascii=False)
+        )
+
+        response = await self._generate(prompt, ESTIMATED_OUTPUT_TOKENS, prefix)
+        score = json.loads(response.text)
+        if not _is_valid_score(score):
+            raise ValueError(f"response for {filename} has no numeric match_score")
+        return score
+
+    async def _cache_key(self, job_description: str, parsed_resume_json: dict) -> str:
+        # Keyed on the requirements block the prompt is built from, so a new profile
+        # (JD_PROFILE_MODE, JD model or profile prompt) never serves scores of the old one
+        requirements = await self.prepare_job_description(job_description)
+        return score_cache_key(requirements, parsed_resume_json, self.client.model_name("score"))
+
+    async def _generate(self, prompt: str, expected_output_tokens: int, prefix: Optional[str] = None):
+        """Run one rate-limited scoring call through the shared client"""
+        async with self._semaphore:
+            return await self.client.generate_async(
+                "score", prompt, estimate_tokens((prefix or "") + prompt) + expected_output_tokens, prefix=prefix
+            )
+
+    def quota_status(self) -> dict:
+        """How close the shared limiter is to the configured Gemini quota"""
+        return self.client.quota_status()
@@ -1,17 +1,26 @@
 import logging
+import asyncio
 import boto3
 import os
+import time
+from botocore.config import Config
 from botocore.exceptions import ClientError
+from boto3.s3.transfer import TransferConfig
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 import uuid
 from io import BytesIO
 from datetime import datetime
+from typing import List, Optional
 import re
 
 load_dotenv()
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
 
 class S3Uploader:
-    def __init__(self):
+    def __init__(self, max_workers: Optional[int] = None, transfer_config: Optional[TransferConfig] = None):
         # Validate environment variables
         required_vars = {
             "AWS_ACCESS_KEY_ID": os.getenv("AWS_ACCESS_KEY_ID"),
@@ -23,21 +32,39 @@ class S3Uploader:
         missing_vars = [key for key, value in required_vars.items() if not value]
         if missing_vars:
             raise ValueError(f"Missing required environment variables: {', '.join(missing_vars)}")
-        
-        # Initialize S3 client
+
+        self.max_workers = max_workers or int(os.getenv("S3_UPLOAD_WORKERS", "8"))
+        # Optional endpoint for S3-compatible stand-ins (moto server, MinIO, LocalStack)
+        self.endpoint_url = os.getenv("S3_ENDPOINT_URL") or None
+
+        # Initialize S3 client; the connection pool is sized for the upload workers
+        # plus the threads each multipart transfer may use
+        self.transfer_config = transfer_config or TransferConfig(
+            multipart_threshold=int(os.getenv("S3_MULTIPART_THRESHOLD_MB", "8")) * MB,
+            multipart_chunksize=int(os.getenv("S3_MULTIPART_CHUNKSIZE_MB", "8")) * MB,
+            max_concurrency=int(os.getenv("S3_TRANSFER_CONCURRENCY", "4")),
+            use_threads=True
+        )
         self.s3 = boto3.client(
             "s3",
             aws_access_key_id=required_vars["AWS_ACCESS_KEY_ID"],
             aws_secret_access_key=required_vars["AWS_SECRET_ACCESS_KEY"],
-            region_name=required_vars["AWS_REGION"]
+            region_name=required_vars["AWS_REGION"],
+            endpoint_url=self.endpoint_url,
+            config=Config(
+                max_pool_connections=self.max_workers * self.transfer_config.max_request_concurrency,
+                retries={"max_attempts": 5, "mode": "adaptive"}
+            )
         )
         self.bucket = required_vars["S3_BUCKET_NAME"]
         self.region = required_vars["AWS_REGION"]
 
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="s3-upload")
+
 
     # Generating Individual Folder For Every session
     
-
+    @staticmethod
     def generate_folder_name(job_description: str) -> str:
         """Generate folder name: JobDescription-YYYY-MM-DD-HH-MM-SS"""
         clean_desc = re.sub(r'[^\w\s-]', '', job_description)[:30]  # Keep only alphanumeric, spaces, hyphens
@@ -49,6 +76,10 @@ class S3Uploader:
         
         return f"{clean_desc}-Resume-List-{timestamp}"
 
+    def object_url(self, key: str) -> str:
+        if self.endpoint_url:
+            return f"{self.endpoint_url.rstrip('/')}/{self.bucket}/{key}"
+        return f"https://{self.bucket}.s3.{self.region}.amazonaws.com/{key}"
 
     def upload_file(self, file_obj, filename: str) -> str:
         """Upload file to S3 and return the URL"""
@@ -62,16 +93,49 @@ class S3Uploader:
                 ExtraArgs={
                     'ContentType': 'application/pdf',
                     'ServerSideEncryption': 'AES256'
-                }
+                },
+                Config=self.transfer_config
             )
             
-            return f"https://{self.bucket}.s3.{self.region}.amazonaws.com/{filename}"
+            return self.object_url(filename)
             
         except ClientError as e:
             raise RuntimeError(f"S3 upload failed: {str(e)}")
         except Exception as e:
             raise RuntimeError(f"Upload failed: {str(e)}")
 
+    def upload_path(self, path: str, filename: str) -> str:
+        """Upload a file from disk without reading it into memory"""
+        with open(path, "rb") as file_obj:
+            return self.upload_file(file_obj, filename)
+
+    async def upload_many(self, file_data_list: List[dict]) -> List[dict]:
+        """Upload a batch concurrently on the shared thread pool.
+
+        Each item needs ``s3_key`` plus ``path`` (or in-memory ``content``); on
+        success ``s3_url`` is set on the item, on failure ``s3_error``.
+        """
+        loop = asyncio.get_running_loop()
+
+        def upload(file_data: dict) -> str:
+            if file_data.get("content") is not None:
+                return self.upload_file(BytesIO(file_data["content"]), file_data["s3_key"])
+            return self.upload_path(file_data["path"], file_data["s3_key"])
+
+        async def upload_one(file_data: dict) -> dict:
+            started = time.monotonic()
+            try:
+                file_data["s3_url"] = await loop.run_in_executor(self.executor, upload, file_data)
+                logger.info("Uploaded %s → %s", file_data["filename"], file_data["s3_url"])
+            except Exception as e:
+                file_data["s3_error"] = str(e)
+                logger.error("Failed uploading %s: %s", file_data["filename"], e)
+            # Includes time queued for a worker thread
+            file_data["upload_seconds"] = time.monotonic() - started
+            return file_data
+
+        return list(await asyncio.gather(*[upload_one(file_data) for file_data in file_data_list]))
+
 
 
     def test_s3_connection(self):
@@ -92,7 +156,13 @@ class S3Uploader:
         except:
             return False
 
-            
-    
+
+_shared_uploader: Optional[S3Uploader] = None
 
 
+def get_s3_uploader() -> S3Uploader:
+    """Long-lived uploader so every request reuses one pooled client"""
+    global _shared_uploader
+    if _shared_uploader is None:
+        _shared_uploader = S3Uploader()
+    return _shared_uploader
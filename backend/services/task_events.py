@@ -0,0 +1,353 @@
+import asyncio
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import logging
+
+from services.cache_store import DEFAULT_CACHE_DIR
+from services.job_queue import TASK_EXECUTOR
+
+logger = logging.getLogger(__name__)
+
+# Events kept per task for clients that reconnect with Last-Event-ID
+EVENT_HISTORY_LIMIT = int(os.getenv("TASK_EVENT_HISTORY", "2000"))
+# How long a finished task's events stay replayable
+EVENT_RETENTION_SECONDS = float(os.getenv("TASK_EVENT_RETENTION_SECONDS", "900"))
+HEARTBEAT_SECONDS = float(os.getenv("TASK_EVENT_HEARTBEAT_SECONDS", "15"))
+# How often a stream checks the shared event log for events from other processes
+EVENT_POLL_SECONDS = float(os.getenv("TASK_EVENT_POLL_SECONDS", "0.25"))
+# Events of a task that never closed (its worker died for good) are dropped after this long
+EVENT_MAX_AGE_SECONDS = float(os.getenv("TASK_EVENT_MAX_AGE_SECONDS", str(24 * 3600)))
+
+Event = Tuple[int, str, dict]
+
+
+class TaskEventLog:
+    """Append-only, bounded event history for one task"""
+
+    def __init__(self, max_events: int = EVENT_HISTORY_LIMIT):
+        self.events = deque(maxlen=max_events)
+        self.next_id = 1
+        self.closed_at: Optional[float] = None
+        self._changed = asyncio.Event()
+
+    @property
+    def closed(self) -> bool:
+        return self.closed_at is not None
+
+    def append(self, event: str, data: dict) -> int:
+        event_id = self.next_id
+        self.next_id += 1
+        self.events.append((event_id, event, data))
+        self._notify()
+        return event_id
+
+    def close(self):
+        if self.closed_at is None:
+            self.closed_at = time.time()
+            self._notify()
+
+    def _notify(self):
+        # Wake everyone waiting on the current Event, then start a fresh one
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def since(self, last_event_id: int):
+        return [event for event in self.events if event[0] > last_event_id]
+
+    async def wait(self, timeout: float) -> bool:
+        changed = self._changed
+        try:
+            await asyncio.wait_for(changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+class TaskEventBroker:
+    """Fans out progress events published by background tasks to streaming clients.
+
+    Events live in this process only; a client connected to another worker
+    gets snapshots built from the task store instead (see the router).
+    """
+
+    # Whether subscribers see events published by other processes
+    shared = False
+
+    def __init__(self, retention_seconds: float = EVENT_RETENTION_SECONDS):
+        self.retention_seconds = retention_seconds
+        self._logs: Dict[str, TaskEventLog] = {}
+
+    def has_task(self, task_id: str) -> bool:
+        return task_id in self._logs
+
+    def open(self, task_id: str) -> TaskEventLog:
+        self._purge_expired()
+        log = self._logs.get(task_id)
+        if log is None:
+            log = self._logs[task_id] = TaskEventLog()
+        return log
+
+    def publish(self, task_id: str, event: str, data: dict) -> int:
+        return self.open(task_id).append(event, data)
+
+    def close(self, task_id: str):
+        log = self._logs.get(task_id)
+        if log is not None:
+            log.close()
+
+    async def subscribe(self, task_id: str, last_event_id: int = 0,
+                        heartbeat: float = HEARTBEAT_SECONDS) -> AsyncIterator[Optional[Event]]:
+        """Yield events after ``last_event_id`` until the task closes.
+
+        ``None`` is yielded after ``heartbeat`` seconds without events so the
+        caller can keep the connection alive.
+        """
+        log = self.open(task_id)
+        while True:
+            pending = log.since(last_event_id)
+            for event in pending:
+                last_event_id = event[0]
+                yield event
+            if pending:
+                continue
+            if log.closed:
+                return
+            if not await log.wait(heartbeat):
+                yield None
+
+    def _purge_expired(self):
+        cutoff = time.time() - self.retention_seconds
+        for task_id in [task_id for task_id, log in self._logs.items() if log.closed and log.closed_at < cutoff]:
+            del self._logs[task_id]
+
+
+class SQLiteTaskEventBroker:
+    """Event log shared by the API and the job workers through SQLite.
+
+    Event ids come from an autoincrement column, so they keep increasing across
+    processes and across reruns of a requeued task, and ``Last-Event-ID`` resumes
+    work against any worker. Publishing never touches the database on the
+    caller's thread: events are queued and written in batches by a writer
+    thread. Subscribers poll the log every ``poll_interval`` seconds.
+    """
+
+    shared = True
+
+    def __init__(self, db_path: str, retention_seconds: float = EVENT_RETENTION_SECONDS,
+                 max_events: int = EVENT_HISTORY_LIMIT, poll_interval: float = EVENT_POLL_SECONDS,
+                 max_age_seconds: float = EVENT_MAX_AGE_SECONDS):
+        self.db_path = db_path
+        self.retention_seconds = retention_seconds
+        self.max_events = max_events
+        self.poll_interval = poll_interval
+        self.max_age_seconds = max_age_seconds
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+
+        self._conn = self._connect()
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS task_events (
+                event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                task_id TEXT NOT NULL,
+                event TEXT NOT NULL,
+                data TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_task_events_task ON task_events (task_id, event_id)")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS task_event_streams (
+                task_id TEXT PRIMARY KEY,
+                opened_at REAL NOT NULL,
+                closed_at REAL
+            )
+        """)
+        self._lock = threading.Lock()
+        self._pending: "queue.Queue" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+        self._last_purge = 0.0
+        atexit.register(self.flush)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def has_task(self, task_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM task_event_streams WHERE task_id = ?", (task_id,)
+            ).fetchone()
+        return row is not None
+
+    def open(self, task_id: str):
+        """Register the task's stream before its first event"""
+        self._enqueue(("open", task_id, None, None, time.time()))
+
+    def publish(self, task_id: str, event: str, data: dict):
+        self._enqueue(("event", task_id, event, json.dumps(data, default=str), time.time()))
+
+    def close(self, task_id: str):
+        self._enqueue(("close", task_id, None, None, time.time()))
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until everything published so far is written; False on timeout"""
+        if self._writer is None:
+            return True
+        written = threading.Event()
+        self._pending.put(written)
+        return written.wait(timeout)
+
+    def _enqueue(self, item: tuple):
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="task-events-writer", daemon=True)
+                self._writer.start()
+        self._pending.put(item)
+
+    def _write_loop(self):
+        conn = self._connect()
+        while True:
+            batch = [self._pending.get()]
+            while True:
+                try:
+                    batch.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+            items = [item for item in batch if isinstance(item, tuple)]
+            try:
+                if items:
+                    self._write(conn, items)
+            except Exception as e:
+                logger.error(f"Failed to write {len(items)} task events: {e}")
+            for marker in batch:
+                if isinstance(marker, threading.Event):
+                    marker.set()
+
+    def _write(self, conn: sqlite3.Connection, items: List[tuple]):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for kind, task_id, event, data, at in items:
+                if kind == "event":
+                    # A requeued task that publishes again is streamed again
+                    conn.execute(
+                        "INSERT INTO task_event_streams (task_id, opened_at) VALUES (?, ?) "
+                        "ON CONFLICT (task_id) DO UPDATE SET closed_at = NULL",
+                        (task_id, at)
+                    )
+                    conn.execute(
+                        "INSERT INTO task_events (task_id, event, data, created_at) VALUES (?, ?, ?, ?)",
+                        (task_id, event, data, at)
+                    )
+                elif kind == "open":
+                    conn.execute(
+                        "INSERT INTO task_event_streams (task_id, opened_at) VALUES (?, ?) "
+                        "ON CONFLICT (task_id) DO NOTHING",
+                        (task_id, at)
+                    )
+                else:
+                    conn.execute("UPDATE task_event_streams SET closed_at = ? WHERE task_id = ?", (at, task_id))
+                    # History is trimmed once per task, when it closes
+                    conn.execute("""
+                        DELETE FROM task_events WHERE task_id = ? AND event_id <= (
+                            SELECT event_id FROM task_events WHERE task_id = ?
+                            ORDER BY event_id DESC LIMIT 1 OFFSET ?
+                        )
+                    """, (task_id, task_id, self.max_events))
+            if time.time() - self._last_purge > 60:
+                self._purge_expired(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _purge_expired(self, conn: sqlite3.Connection):
+        now = time.time()
+        self._last_purge = now
+        expired = """
+            SELECT task_id FROM task_event_streams
+            WHERE closed_at < ? OR (closed_at IS NULL AND opened_at < ?)
+        """
+        params = (now - self.retention_seconds, now - self.max_age_seconds)
+        conn.execute(f"DELETE FROM task_events WHERE task_id IN ({expired})", params)
+        conn.execute(f"DELETE FROM task_event_streams WHERE task_id IN ({expired})", params)
+
+    def _read(self, task_id: str, last_event_id: int) -> Tuple[List[Event], bool]:
+        with self._lock:
+            # Closed is read first: events committed before the close are then never missed
+            self._conn.execute("BEGIN")
+            try:
+                row = self._conn.execute(
+                    "SELECT closed_at FROM task_event_streams WHERE task_id = ?", (task_id,)
+                ).fetchone()
+                rows = self._conn.execute(
+                    "SELECT event_id, event, data FROM task_events WHERE task_id = ? AND event_id > ? "
+                    "ORDER BY event_id LIMIT ?",
+                    (task_id, last_event_id, self.max_events)
+                ).fetchall()
+            finally:
+                self._conn.execute("COMMIT")
+        events = [(event_id, event, json.loads(data)) for event_id, event, data in rows]
+        return events, row is not None and row[0] is not None
+
+    async def subscribe(self, task_id: str, last_event_id: int = 0,
+                        heartbeat: float = HEARTBEAT_SECONDS) -> AsyncIterator[Optional[Event]]:
+        """Yield events after ``last_event_id`` until the task closes.
+
+        A task with no events yet (still queued) is waited for. ``None`` is
+        yielded after ``heartbeat`` seconds without events.
+        """
+        idle = 0.0
+        while True:
+            events, closed = await asyncio.to_thread(self._read, task_id, last_event_id)
+            for event in events:
+                last_event_id = event[0]
+                yield event
+            if events:
+                idle = 0.0
+                continue
+            if closed:
+                return
+            if idle >= heartbeat:
+                idle = 0.0
+                yield None
+            await asyncio.sleep(self.poll_interval)
+            idle += self.poll_interval
+
+
+def format_sse(event_id: Optional[int], event: str, data: dict) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'), default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+_task_event_broker = None
+
+
+def get_task_event_broker():
+    """Broker selected by TASK_EVENTS_BACKEND ("memory" or "sqlite"); defaults to the task store's backend"""
+    global _task_event_broker
+    if _task_event_broker is None:
+        # Job workers publish events that the API process streams, so queue mode shares them through SQLite
+        default = os.getenv("TASK_STORE_BACKEND", "sqlite" if TASK_EXECUTOR == "queue" else "memory")
+        backend = os.getenv("TASK_EVENTS_BACKEND", default).lower()
+        if backend == "memory" and TASK_EXECUTOR == "queue":
+            raise ValueError("TASK_EXECUTOR=queue needs shared task events; set TASK_EVENTS_BACKEND=sqlite")
+        if backend == "sqlite":
+            db_path = os.getenv("TASK_EVENTS_PATH", os.path.join(DEFAULT_CACHE_DIR, "task_events.sqlite3"))
+            _task_event_broker = SQLiteTaskEventBroker(db_path)
+        elif backend == "memory":
+            _task_event_broker = TaskEventBroker()
+        else:
+            raise ValueError(f"Unknown TASK_EVENTS_BACKEND: {backend}")
+    return _task_event_broker
@@ -0,0 +1,274 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional
+import logging
+
+from services.cache_store import DEFAULT_CACHE_DIR
+from services.job_queue import TASK_EXECUTOR
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TASK_TTL_SECONDS = float(os.getenv("TASK_TTL_SECONDS", str(7 * 24 * 3600)))
+DEFAULT_MAX_TASKS = int(os.getenv("TASK_STORE_MAX_TASKS", "1000"))
+# A running task writes its progress to the store at most this often (seconds)
+PROGRESS_WRITE_INTERVAL = float(os.getenv("TASK_PROGRESS_WRITE_INTERVAL", "0.5"))
+
+
+class TaskStore(ABC):
+    """Storage for background task state.
+
+    Task metadata (status, progress counters, timestamps) is kept apart from the
+    potentially large ``results`` payload so status reads and progress writes
+    never have to touch the results.
+    """
+
+    @abstractmethod
+    def create(self, task_id: str, task: dict):
+        ...
+
+    @abstractmethod
+    def get(self, task_id: str, include_results: bool = True) -> Optional[dict]:
+        """Return a copy of the task, or None if it is unknown or expired"""
+
+    @abstractmethod
+    def update(self, task_id: str, **fields):
+        """Merge ``fields`` into the task; a ``results`` field replaces the stored results"""
+
+    @abstractmethod
+    def delete(self, task_id: str):
+        ...
+
+    def __contains__(self, task_id: str) -> bool:
+        return self.get(task_id, include_results=False) is not None
+
+
+class InMemoryTaskStore(TaskStore):
+    """Per-process store bounded by task count and age (oldest tasks evicted first)"""
+
+    def __init__(self, max_tasks: int = DEFAULT_MAX_TASKS, ttl_seconds: float = DEFAULT_TASK_TTL_SECONDS):
+        self.max_tasks = max_tasks
+        self.ttl_seconds = ttl_seconds
+        self._tasks = OrderedDict()  # task_id -> (meta, results, updated_at)
+        self._lock = threading.Lock()
+
+    def _evict(self):
+        cutoff = time.time() - self.ttl_seconds
+        while self._tasks:
+            task_id, (_, _, updated_at) = next(iter(self._tasks.items()))
+            if len(self._tasks) <= self.max_tasks and updated_at >= cutoff:
+                break
+            self._tasks.pop(task_id)
+
+    def create(self, task_id: str, task: dict):
+        meta = dict(task)
+        results = meta.pop("results", None)
+        with self._lock:
+            self._tasks[task_id] = (meta, results, time.time())
+            self._evict()
+
+    def get(self, task_id: str, include_results: bool = True) -> Optional[dict]:
+        with self._lock:
+            entry = self._tasks.get(task_id)
+            if entry is None:
+                return None
+            meta, results, updated_at = entry
+            if time.time() - updated_at > self.ttl_seconds:
+                self._tasks.pop(task_id)
+                return None
+
+        task = dict(meta)
+        if include_results:
+            task["results"] = results
+        return task
+
+    def update(self, task_id: str, **fields):
+        with self._lock:
+            entry = self._tasks.pop(task_id, None)
+            if entry is None:
+                logger.warning(f"Update for unknown task {task_id} ignored")
+                return
+            meta, results, _ = entry
+            if "results" in fields:
+                results = fields.pop("results")
+            meta = {**meta, **fields}
+            # Re-inserting moves the task to the young end of the eviction order
+            self._tasks[task_id] = (meta, results, time.time())
+
+    def delete(self, task_id: str):
+        with self._lock:
+            self._tasks.pop(task_id, None)
+
+
+class SQLiteTaskStore(TaskStore):
+    """Durable store shared by every uvicorn worker on the host"""
+
+    def __init__(self, db_path: str, max_tasks: int = DEFAULT_MAX_TASKS,
+                 ttl_seconds: float = DEFAULT_TASK_TTL_SECONDS):
+        self.db_path = db_path
+        self.max_tasks = max_tasks
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                task_id TEXT PRIMARY KEY,
+                meta TEXT NOT NULL,
+                results TEXT,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_updated_at ON tasks (updated_at)")
+        self._lock = threading.Lock()
+
+    def _evict(self):
+        self._conn.execute("DELETE FROM tasks WHERE updated_at < ?", (time.time() - self.ttl_seconds,))
+        self._conn.execute("""
+            DELETE FROM tasks WHERE task_id NOT IN (
+                SELECT task_id FROM tasks ORDER BY updated_at DESC LIMIT ?
+            )
+        """, (self.max_tasks,))
+
+    def create(self, task_id: str, task: dict):
+        meta = dict(task)
+        results = meta.pop("results", None)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO tasks (task_id, meta, results, updated_at) VALUES (?, ?, ?, ?)",
+                    (task_id, json.dumps(meta), json.dumps(results), time.time())
+                )
+                self._evict()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def get(self, task_id: str, include_results: bool = True) -> Optional[dict]:
+        columns = "meta, results" if include_results else "meta"
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {columns} FROM tasks WHERE task_id = ? AND updated_at >= ?",
+                (task_id, time.time() - self.ttl_seconds)
+            ).fetchone()
+        if row is None:
+            return None
+
+        task = json.loads(row[0])
+        if include_results:
+            task["results"] = json.loads(row[1]) if row[1] is not None else None
+        return task
+
+    def update(self, task_id: str, **fields):
+        results_given = "results" in fields
+        results = fields.pop("results", None)
+
+        with self._lock:
+            # IMMEDIATE takes the write lock up front so concurrent workers
+            # cannot interleave their read-modify-write of the metadata
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT meta FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+                if row is None:
+                    self._conn.execute("ROLLBACK")
+                    logger.warning(f"Update for unknown task {task_id} ignored")
+                    return
+
+                meta = {**json.loads(row[0]), **fields}
+                if results_given:
+                    self._conn.execute(
+                        "UPDATE tasks SET meta = ?, results = ?, updated_at = ? WHERE task_id = ?",
+                        (json.dumps(meta), json.dumps(results), time.time(), task_id)
+                    )
+                else:
+                    self._conn.execute(
+                        "UPDATE tasks SET meta = ?, updated_at = ? WHERE task_id = ?",
+                        (json.dumps(meta), time.time(), task_id)
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def delete(self, task_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM tasks WHERE task_id = ?", (task_id,))
+
+
+class TaskProgressWriter:
+    """Coalesces one task's progress updates into at most one store write per interval.
+
+    Called from the event loop; writes run on a worker thread, one at a time
+    and in order. A field may be given as a callable, evaluated only when the
+    write happens, so an expensive value (the ranked top-K) is built once per
+    write rather than once per update.
+    """
+
+    def __init__(self, store: TaskStore, task_id: str, interval: float = PROGRESS_WRITE_INTERVAL):
+        self.store = store
+        self.task_id = task_id
+        self.interval = interval
+        self._pending = {}
+        self._last_write = 0.0
+        self._scheduled: Optional[asyncio.Task] = None
+        self._write_lock = asyncio.Lock()
+
+    def update(self, **fields):
+        """Queue ``fields`` for the next write"""
+        self._pending.update(fields)
+        if self._scheduled is None:
+            delay = max(0.0, self._last_write + self.interval - time.monotonic())
+            self._scheduled = asyncio.get_running_loop().create_task(self._write_later(delay))
+
+    async def flush(self, **fields):
+        """Write ``fields`` and everything pending now, e.g. a final status"""
+        self._pending.update(fields)
+        await self._write()
+
+    async def _write_later(self, delay: float):
+        await asyncio.sleep(delay)
+        self._scheduled = None
+        try:
+            await self._write()
+        except Exception as e:
+            # Progress is best effort; the next write carries the latest values
+            logger.warning(f"Progress write for task {self.task_id} failed: {e}")
+
+    async def _write(self):
+        async with self._write_lock:
+            fields, self._pending = self._pending, {}
+            if not fields:
+                return
+            fields = {name: value() if callable(value) else value for name, value in fields.items()}
+            self._last_write = time.monotonic()
+            await asyncio.to_thread(self.store.update, self.task_id, **fields)
+
+
+_task_store: Optional[TaskStore] = None
+
+
+def get_task_store() -> TaskStore:
+    """Store selected by TASK_STORE_BACKEND ("memory" or "sqlite")"""
+    global _task_store
+    if _task_store is None:
+        # Job workers report progress to the API process through the store
+        backend = os.getenv("TASK_STORE_BACKEND", "sqlite" if TASK_EXECUTOR == "queue" else "memory").lower()
+        if backend == "memory" and TASK_EXECUTOR == "queue":
+            raise ValueError("TASK_EXECUTOR=queue needs a shared task store; set TASK_STORE_BACKEND=sqlite")
+        if backend == "sqlite":
+            db_path = os.getenv("TASK_STORE_PATH", os.path.join(DEFAULT_CACHE_DIR, "tasks.sqlite3"))
+            _task_store = SQLiteTaskStore(db_path)
+        elif backend == "memory":
+            _task_store = InMemoryTaskStore()
+        else:
+            raise ValueError(f"Unknown TASK_STORE_BACKEND: {backend}")
+        logger.info(f"Using {type(_task_store).__name__} for background tasks")
+    return _task_store
@@ -0,0 +1,102 @@
+import os
+import re
+from collections import Counter
+from typing import List, Tuple
+import logging
+
+from services.rate_limiter import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+PAGE_SEPARATOR = "\f"
+DEFAULT_RESUME_MAX_TOKENS = int(os.getenv("RESUME_MAX_TOKENS", "6000"))
+RESUME_COMPACTION_ENABLED = os.getenv("RESUME_COMPACTION", "1") == "1"
+
+# Lines this close to the top or bottom of a page are header/footer candidates
+_EDGE_LINES = 3
+_PAGE_NUMBER = re.compile(r"^(page\s*)?\d{1,3}(\s*(of|/)\s*\d{1,3})?$", re.IGNORECASE)
+_INLINE_SPACE = re.compile(r"[ \t ]+")
+_DIGITS = re.compile(r"\d+")
+TRUNCATION_MARKER = "[... truncated ...]"
+
+
+def _edge_signature(line: str) -> str:
+    # Page numbers inside a repeated footer ("Jane Doe - CV - 2") should still match
+    return _DIGITS.sub("#", line.lower())
+
+
+def _edge_count(lines: List[str]) -> int:
+    # Short pages are mostly "edge", so only their outermost lines qualify
+    return max(1, min(_EDGE_LINES, len(lines) // 3))
+
+
+def _clean_page(page: str) -> List[str]:
+    lines = []
+    for raw_line in page.splitlines():
+        line = _INLINE_SPACE.sub(" ", raw_line).strip()
+        if line:
+            lines.append(line)
+    return lines
+
+
+def _repeated_edge_lines(pages: List[List[str]]) -> set:
+    """Signatures of lines that sit at a page edge on most pages"""
+    if len(pages) < 2:
+        return set()
+
+    counts = Counter()
+    for lines in pages:
+        edge = _edge_count(lines)
+        edges = set(lines[:edge]) | set(lines[-edge:])
+        counts.update({_edge_signature(line) for line in edges})
+
+    threshold = max(2, int(len(pages) * 0.6 + 0.5))
+    return {signature for signature, count in counts.items() if count >= threshold}
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> Tuple[str, bool]:
+    """Cut text to roughly max_tokens, on a line boundary where possible"""
+    if estimate_tokens(text) <= max_tokens:
+        return text, False
+
+    max_chars = max_tokens * 4 - len(TRUNCATION_MARKER) - 1
+    cut = text.rfind("\n", 0, max_chars)
+    if cut < max_chars // 2:
+        cut = max_chars
+    return text[:cut].rstrip() + "\n" + TRUNCATION_MARKER, True
+
+
+def compact_resume_text(text: str, max_tokens: int = DEFAULT_RESUME_MAX_TOKENS) -> Tuple[str, dict]:
+    """Shrink extracted resume text before it is put into a prompt.
+
+    Collapses whitespace, drops page numbers and repeats of header/footer lines
+    found on most pages, removes consecutive duplicate lines and truncates to
+    the token budget. Returns the compacted text and token statistics.
+    """
+    pages = [_clean_page(page) for page in text.split(PAGE_SEPARATOR)]
+    pages = [lines for lines in pages if lines]
+    repeated = _repeated_edge_lines(pages)
+
+    kept, seen_repeated = [], set()
+    for lines in pages:
+        edge = _edge_count(lines)
+        for index, line in enumerate(lines):
+            at_edge = index < edge or index >= len(lines) - edge
+            if at_edge and _PAGE_NUMBER.match(line):
+                continue
+            if at_edge and _edge_signature(line) in repeated:
+                # The first occurrence stays: a repeated header is often the candidate's name
+                if _edge_signature(line) in seen_repeated:
+                    continue
+                seen_repeated.add(_edge_signature(line))
+            if kept and kept[-1] == line:
+                continue
+            kept.append(line)
+
+    compacted, truncated = truncate_to_tokens("\n".join(kept), max_tokens)
+    stats = {
+        "original_tokens": estimate_tokens(text),
+        "token_count": estimate_tokens(compacted),
+        "truncated": truncated,
+    }
+    return compacted, stats
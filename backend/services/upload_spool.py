@@ -0,0 +1,102 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+from typing import Optional
+import logging
+
+from fastapi import UploadFile
+
+from services.cache_store import DEFAULT_CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR", os.path.join(DEFAULT_CACHE_DIR, "uploads"))
+SPOOL_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+MIN_UPLOAD_BYTES = 100
+# Spool directories older than this are assumed to belong to a crashed task
+STALE_SPOOL_SECONDS = float(os.getenv("UPLOAD_SPOOL_STALE_SECONDS", str(24 * 3600)))
+
+
+class UploadRejected(ValueError):
+    """Raised when an upload is not a PDF we are willing to process"""
+
+
+def task_spool_dir(task_id: str) -> str:
+    return os.path.join(SPOOL_DIR, task_id)
+
+
+async def spool_upload(file: UploadFile, spool_dir: str, filename: str) -> dict:
+    """Stream an upload to disk chunk by chunk, validating as it goes.
+
+    Only one chunk is held in memory at a time. The returned dict carries the
+    spooled ``path`` instead of the file contents; later stages read it lazily.
+    """
+    os.makedirs(spool_dir, exist_ok=True)
+    size = 0
+
+    fd, path = await asyncio.to_thread(_make_spool_file, spool_dir)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await file.read(SPOOL_CHUNK_SIZE)
+                if not chunk:
+                    break
+                if size == 0 and not chunk.startswith(b"%PDF"):
+                    raise UploadRejected("file is not a PDF")
+
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    raise UploadRejected(f"file exceeds {MAX_UPLOAD_BYTES} bytes")
+
+                await asyncio.to_thread(out.write, chunk)
+
+        if size < MIN_UPLOAD_BYTES:
+            raise UploadRejected("file is empty or too small")
+
+    except BaseException:
+        _remove_quietly(path)
+        raise
+
+    return {
+        "filename": filename,
+        "path": path,
+        "size": size
+    }
+
+
+def cleanup_spool(spool_dir: str):
+    shutil.rmtree(spool_dir, ignore_errors=True)
+
+
+def purge_stale_spools(max_age: float = STALE_SPOOL_SECONDS) -> int:
+    """Remove spool directories left behind by tasks that never cleaned up"""
+    if not os.path.isdir(SPOOL_DIR):
+        return 0
+
+    removed = 0
+    cutoff = time.time() - max_age
+    for entry in os.scandir(SPOOL_DIR):
+        try:
+            if entry.is_dir() and entry.stat().st_mtime < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+        except OSError:
+            continue
+    if removed:
+        logger.info(f"Removed {removed} stale upload spool directories")
+    return removed
+
+
+def _make_spool_file(spool_dir: str):
+    return tempfile.mkstemp(suffix=".pdf", dir=spool_dir)
+
+
+def _remove_quietly(path: Optional[str]):
+    if path:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,126 @@
+import asyncio
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _consume(future: asyncio.Future):
+    # Late failures of abandoned jobs are expected; don't log them as never retrieved
+    if not future.cancelled():
+        future.exception()
+
+
+class PoolSlot:
+    """One worker of a WorkerPool, held by the caller while its job runs"""
+
+    def __init__(self, pool: "WorkerPool", slots: asyncio.Semaphore):
+        self.pool = pool
+        self._slots = slots
+        self._held_by_job = False
+
+    async def run(self, fn: Callable, *args, timeout: float):
+        """Run ``fn(*args)`` on the pool; raises asyncio.TimeoutError after ``timeout`` seconds.
+
+        A process-pool job that times out is killed with its pool, and jobs that
+        were sharing that pool rerun once on the fresh one. A thread cannot be
+        stopped, so it keeps this slot until it really finishes.
+        """
+        loop = asyncio.get_running_loop()
+        for attempt in range(2):
+            executor = self.pool.executor
+            job = loop.run_in_executor(executor, fn, *args)
+            job.add_done_callback(_consume)
+            try:
+                # Shielded, so a timed-out thread's future still completes when the thread does
+                return await asyncio.wait_for(asyncio.shield(job), timeout)
+            except asyncio.TimeoutError:
+                if self.pool.mode == "process":
+                    self.pool.recycle(executor)
+                else:
+                    self._held_by_job = True
+                    job.add_done_callback(lambda _: self._slots.release())
+                raise
+            except BrokenProcessPool:
+                # A worker died, killed by another job's timeout or by a crash of its own
+                self.pool.recycle(executor)
+                if attempt:
+                    raise
+
+    def release(self):
+        if not self._held_by_job:
+            self._slots.release()
+
+
+class WorkerPool:
+    """Long-lived thread or process pool for CPU-bound work, with per-job timeouts.
+
+    Callers take a ``slot`` before running a job, so there are never more jobs
+    in the pool than workers and a job's timeout measures its own run time,
+    not time spent queued behind others. A timed-out job never keeps holding a
+    worker that the next job is waiting for.
+    """
+
+    def __init__(self, mode: str, max_workers: int, name: str):
+        self.mode = mode
+        self.max_workers = max_workers
+        self.name = name
+        self.recycled = 0
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                if self.mode == "process":
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix=f"pdf-{self.name}"
+                    )
+            return self._executor
+
+    def recycle(self, executor: Executor):
+        """Kill a process pool with a stuck worker; the next job starts a fresh one"""
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+            self.recycled += 1
+        processes = list((getattr(executor, "_processes", None) or {}).values())
+        executor.shutdown(wait=False)
+        for process in processes:
+            process.terminate()
+        logger.warning(f"Restarted the {self.name} process pool to free a worker stuck on a timed-out job")
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[PoolSlot]:
+        # Semaphores belong to one event loop; a new loop gets its own
+        loop = asyncio.get_running_loop()
+        if self._slots_loop is not loop:
+            self._slots, self._slots_loop = asyncio.Semaphore(self.max_workers), loop
+        slots = self._slots
+        await slots.acquire()
+        slot = PoolSlot(self, slots)
+        try:
+            yield slot
+        finally:
+            slot.release()
+
+
+_pools: Dict[Tuple[str, str, int], WorkerPool] = {}
+
+
+def get_worker_pool(mode: str, max_workers: int, name: str) -> WorkerPool:
+    """Pools are long-lived so worker processes are not re-spawned per batch"""
+    key = (name, mode, max_workers)
+    if key not in _pools:
+        _pools[key] = WorkerPool(mode, max_workers, name)
+    return _pools[key]
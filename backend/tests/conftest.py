@@ -0,0 +1,83 @@
+import os
+import shutil
+import sys
+import tempfile
+
+# Must be set before the services are imported
+os.environ.setdefault("GOOGLE_API_KEY", "fake")
+os.environ["CACHE_DIR"] = tempfile.mkdtemp(prefix="resume-tests-")
+os.environ["CACHE_DISABLE_DISK"] = "1"
+os.environ.setdefault("PDF_EXTRACTION_MODE", "thread")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from benchmarks.fake_gemini import FakeGeminiBackend, FakeGeminiClient
+from benchmarks.local_s3 import install_local_s3
+from benchmarks.synthetic_corpus import build_corpus
+from routers.resume_scoring_router import router
+from services import gemini_client
+from services.cache_store import TieredCache
+from services.jd_profile import JobDescriptionProfiler
+from services.pdf_processor import PDFProcessor
+from services.rate_limiter import TokenBucketRateLimiter
+from services.resume_parser import ResumeParser
+from services.resume_pipeline import ResumePipeline
+from services.resume_scoring_service import RateLimitedResumeScorer
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(os.environ["CACHE_DIR"], ignore_errors=True)
+
+
+@pytest.fixture
+def fake_client():
+    """Gemini client answered by the benchmark fake, with no latency and its own quota"""
+    return FakeGeminiClient(
+        backend=FakeGeminiBackend(latency=0.0, jitter=0.0),
+        rate_limiter=TokenBucketRateLimiter(6000, None)
+    )
+
+
+@pytest.fixture
+def make_pipeline(fake_client):
+    """Pipeline factory with fresh in-memory caches, so tests never share parses or scores"""
+    def make(parser_class=ResumeParser, **kwargs):
+        return ResumePipeline(
+            pdf_processor=PDFProcessor(mode="thread", max_workers=2),
+            resume_parser=parser_class(cache=TieredCache("parsed_resumes"), client=fake_client),
+            scorer=RateLimitedResumeScorer(
+                client=fake_client, cache=TieredCache("resume_scores"),
+                profiler=JobDescriptionProfiler(fake_client, cache=TieredCache("jd_profiles"))
+            ),
+            **kwargs
+        )
+    return make
+
+
+@pytest.fixture
+def api(fake_client, tmp_path, monkeypatch):
+    """Client for the scoring API, backed by the fake Gemini client and a local S3 bucket.
+
+    Background tasks run before each response is returned, so a submitted batch
+    is finished by the time ``post`` returns.
+    """
+    install_local_s3(str(tmp_path / "s3"))
+    monkeypatch.setattr(gemini_client, "_gemini_client", fake_client)
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app)
+
+
+@pytest.fixture
+def submit(api):
+    """Submit ``count`` synthetic resumes for a job description; returns the task id"""
+    def submit(count=3, job_description="Python engineer with AWS and Docker experience", seed=0, **form):
+        files = [("files", (name, content, "application/pdf")) for name, content in build_corpus(count, 1, seed=seed)]
+        response = api.post("/api/scoring/process-batch", data={"job_description": job_description, **form},
+                            files=files)
+        assert response.status_code == 200, response.text
+        return response.json()["task_id"]
+    return submit
@@ -0,0 +1,47 @@
+import time
+
+from services.cache_store import SQLiteCacheStore, TieredCache
+
+
+def test_disk_tier_serves_a_fresh_process(tmp_path):
+    store = SQLiteCacheStore(str(tmp_path / "cache.sqlite3"))
+    TieredCache("scores", store=store).set("key", {"match_score": 80})
+
+    cache = TieredCache("scores", store=store)
+    assert cache.get("key") == {"match_score": 80}
+    assert cache.get("key") == {"match_score": 80}
+    stats = cache.stats()
+    assert (stats["disk_hits"], stats["memory_hits"], stats["misses"]) == (1, 1, 0)
+
+
+def test_namespaces_are_separate(tmp_path):
+    store = SQLiteCacheStore(str(tmp_path / "cache.sqlite3"))
+    TieredCache("scores", store=store).set("key", 1)
+    assert TieredCache("parses", store=store).get("key") is None
+
+
+def test_values_are_copies():
+    cache = TieredCache("scores")
+    value = {"skills": ["python"]}
+    cache.set("key", value)
+    value["skills"].append("java")
+    cache.get("key")["skills"].append("go")
+    assert cache.get("key") == {"skills": ["python"]}
+
+
+def test_entries_expire_in_both_tiers(tmp_path):
+    store = SQLiteCacheStore(str(tmp_path / "cache.sqlite3"))
+    cache = TieredCache("scores", store=store, ttl_seconds=0.05)
+    cache.set("key", 1)
+    assert cache.get("key") == 1
+    time.sleep(0.1)
+    assert cache.get("key") is None
+    assert TieredCache("scores", store=store, ttl_seconds=0.05).get("key") is None
+
+
+def test_memory_tier_is_bounded():
+    cache = TieredCache("scores", max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.set(key, key)
+    assert cache.get("a") is None
+    assert cache.get("c") == "c"
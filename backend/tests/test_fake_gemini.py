@@ -0,0 +1,34 @@
+import json
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+from benchmarks.fake_gemini import FakeGeminiBackend
+from services.resume_parser import PARSE_PROMPT_TEMPLATE
+
+RESUME = "Jane Doe\njane@example.com\n6 years of Python, AWS and Docker"
+
+
+def test_answers_are_deterministic():
+    backend = FakeGeminiBackend(latency=0.0, jitter=0.0)
+    prompt = PARSE_PROMPT_TEMPLATE.format(resume_text=RESUME)
+    first = json.loads(backend.generate(prompt).text)
+
+    assert first == json.loads(FakeGeminiBackend(latency=0.0, jitter=0.0, seed=7).generate(prompt).text)
+    assert first["name"] == "Jane Doe"
+    assert first["email"] == "jane@example.com"
+    assert first["skills"] == ["python", "aws", "docker"]
+    assert backend.calls == 1
+
+
+def test_responses_carry_usage_metadata():
+    response = FakeGeminiBackend(latency=0.0, jitter=0.0).generate(PARSE_PROMPT_TEMPLATE.format(resume_text=RESUME))
+    usage = response.usage_metadata
+    assert usage.total_token_count == usage.prompt_token_count + usage.candidates_token_count
+
+
+def test_simulated_quota_errors():
+    backend = FakeGeminiBackend(latency=0.0, jitter=0.0, error_rate=1.0)
+    with pytest.raises(google_exceptions.ResourceExhausted):
+        backend.generate("anything")
+    assert backend.errors == 1
@@ -0,0 +1,46 @@
+import asyncio
+
+from benchmarks.fake_gemini import FakeGeminiBackend, FakeGeminiClient
+from services.cache_store import TieredCache
+from services.jd_profile import JobDescriptionProfiler
+from services.rate_limiter import TokenBucketRateLimiter
+
+JOB = "Backend engineer\nPython, AWS and Docker, five years of experience"
+
+
+def _profiler(latency=0.0):
+    client = FakeGeminiClient(
+        backend=FakeGeminiBackend(latency=latency, jitter=0.0), rate_limiter=TokenBucketRateLimiter(6000, None)
+    )
+    return JobDescriptionProfiler(client, cache=TieredCache("jd_profiles"), mode="always")
+
+
+def test_concurrent_callers_share_one_request():
+    profiler = _profiler(latency=0.05)
+
+    async def scenario():
+        return await asyncio.gather(*[profiler.profile(JOB) for _ in range(3)])
+
+    profiles = asyncio.run(scenario())
+    assert profiles[0]["must_have_skills"] == ["python", "aws", "docker"]
+    assert profiles == [profiles[0]] * 3
+    assert profiler.client.backend.calls == 1
+    assert profiler._in_flight == {}
+
+
+def test_cancelling_the_first_caller_leaves_the_others_waiting():
+    profiler = _profiler(latency=0.1)
+
+    async def scenario():
+        first = asyncio.ensure_future(profiler.profile(JOB))
+        await asyncio.sleep(0.01)
+        second = asyncio.ensure_future(profiler.profile(JOB))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second, first.cancelled()
+
+    profile, cancelled = asyncio.run(scenario())
+    assert cancelled
+    assert profile is not None
+    assert profiler.client.backend.calls == 1
+    assert profiler.cache.get(profiler.cache_key(JOB)) == profile
@@ -0,0 +1,74 @@
+from services.job_queue import SQLiteJobQueue
+
+
+def _queue(tmp_path, **kwargs):
+    return SQLiteJobQueue(str(tmp_path / "jobs.sqlite3"), **kwargs)
+
+
+def test_claims_share_running_slots_between_tenants(tmp_path):
+    queue = _queue(tmp_path, max_running=2)
+    queue.enqueue("a1", "A", {"n": 1})
+    queue.enqueue("a2", "A", {"n": 2})
+    queue.enqueue("b1", "B", {"n": 3})
+
+    first = queue.claim("w1")
+    assert (first["job_id"], first["payload"], first["attempt"]) == ("a1", {"n": 1}, 1)
+    # B has nothing running, so its job goes ahead of A's older one
+    assert queue.claim("w1")["job_id"] == "b1"
+    # Both global slots are taken
+    assert queue.claim("w2") is None
+
+    queue.finish("a1", "w1")
+    assert queue.claim("w2")["job_id"] == "a2"
+    stats = queue.stats()
+    assert (stats["queued"], stats["running"], stats["done"]) == (0, 2, 1)
+
+
+def test_expired_leases_are_requeued(tmp_path):
+    queue = _queue(tmp_path)
+    queue.enqueue("job", "A", {})
+    queue.claim("dead-worker", lease_seconds=-1)
+
+    assert queue.recover() == {"requeued": ["job"], "failed": []}
+    # The lost worker can no longer renew or finish it
+    assert not queue.renew("job", "dead-worker")
+
+    claimed = queue.claim("w2")
+    assert (claimed["job_id"], claimed["attempt"]) == ("job", 2)
+    assert queue.renew("job", "w2")
+
+
+def test_live_leases_are_left_alone(tmp_path):
+    queue = _queue(tmp_path)
+    queue.enqueue("job", "A", {})
+    queue.claim("w1", lease_seconds=60)
+    assert queue.recover() == {"requeued": [], "failed": []}
+
+
+def test_jobs_are_failed_after_max_attempts(tmp_path):
+    queue = _queue(tmp_path, max_attempts=2)
+    queue.enqueue("job", "A", {})
+    for _ in range(2):
+        queue.claim("w1", lease_seconds=-1)
+        recovered = queue.recover()
+    assert recovered == {"requeued": [], "failed": ["job"]}
+    assert queue.claim("w1") is None
+
+
+def test_recover_takes_back_every_job_of_a_worker(tmp_path):
+    queue = _queue(tmp_path)
+    queue.enqueue("j1", "A", {})
+    queue.enqueue("j2", "B", {})
+    queue.claim("w1")
+    queue.claim("w2")
+    assert queue.recover("w1") == {"requeued": ["j1"], "failed": []}
+
+
+def test_queue_position(tmp_path):
+    queue = _queue(tmp_path)
+    for job_id in ("j1", "j2", "j3"):
+        queue.enqueue(job_id, "A", {})
+    assert queue.position("j3") == 3
+    queue.claim("w1")
+    assert queue.position("j1") is None
+    assert queue.position("j3") == 2
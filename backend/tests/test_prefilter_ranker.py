@@ -0,0 +1,53 @@
+from services.prefilter_ranker import BM25Ranker, prefilter_candidates, tokenize
+
+
+def _parsed(name, skills, upload_id):
+    return {
+        "filename": f"{name}.pdf", "upload_id": upload_id, "parsing_success": True,
+        "parsed_data": {"name": name, "skills": skills},
+    }
+
+
+RESUMES = [
+    _parsed("cook", ["cooking", "baking"], 0),
+    _parsed("dev", ["python", "aws", "docker"], 1),
+    _parsed("analyst", ["python", "sql"], 2),
+]
+JOB = "Python engineer with AWS and Docker experience"
+
+
+def test_tokenize_keeps_technical_terms():
+    assert tokenize("C++, Node.js and C# on AWS") == ["c++", "node.js", "c#", "aws"]
+
+
+def test_bm25_scores_matching_documents_higher():
+    scores = BM25Ranker().score("python aws", ["python aws docker", "python", "cooking"])
+    assert scores[0] > scores[1] > scores[2] == 0
+
+
+def test_prefilter_escalates_the_top_n():
+    escalated, local = prefilter_candidates(JOB, RESUMES, top_n=1, min_score=None)
+
+    assert [resume["filename"] for resume in escalated] == ["dev.pdf"]
+    assert {entry["filename"] for entry in local} == {"cook.pdf", "analyst.pdf"}
+    for entry in local:
+        assert entry["scored_by"] == "prefilter"
+        assert entry["match_score"] == entry["detailed_scores"]["match_score"]
+        assert "upload_id" in entry
+
+
+def test_prefilter_escalates_everything_above_the_min_score():
+    escalated, local = prefilter_candidates(JOB, RESUMES, top_n=None, min_score=1)
+    assert {resume["filename"] for resume in escalated} == {"dev.pdf", "analyst.pdf"}
+    assert [entry["filename"] for entry in local] == ["cook.pdf"]
+
+
+def test_prefilter_off_passes_everything_through():
+    assert prefilter_candidates(JOB, RESUMES, top_n=None, min_score=None) == (RESUMES, [])
+
+
+def test_prefilter_clamps_out_of_range_limits():
+    escalated, _ = prefilter_candidates(JOB, RESUMES, top_n=-1, min_score=None)
+    assert [resume["filename"] for resume in escalated] == ["dev.pdf"]
+    escalated, local = prefilter_candidates(JOB, RESUMES, top_n=None, min_score=-5)
+    assert len(escalated) == 3 and local == []
@@ -0,0 +1,95 @@
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from services.rate_limiter import SQLiteRateLimiter, TokenBucketRateLimiter
+
+
+def test_waits_for_token_refill():
+    limiter = TokenBucketRateLimiter(requests_per_minute=1000, tokens_per_minute=600)
+
+    async def scenario():
+        first = await limiter.acquire(600)
+        second = await limiter.acquire(5)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first == 0
+    # 10 tokens refill per second, so 5 more take about half a second
+    assert 0.3 < second < 1.0
+
+
+def test_oversized_request_fits_a_full_bucket():
+    limiter = TokenBucketRateLimiter(requests_per_minute=10, tokens_per_minute=600)
+    assert asyncio.run(limiter.acquire(10_000)) == 0
+
+
+def test_usage_reported_from_threads_while_acquiring():
+    limiter = TokenBucketRateLimiter(requests_per_minute=100_000, tokens_per_minute=10 ** 9)
+    stop = threading.Event()
+    errors, reports = [], [0]
+
+    def reporter():
+        while not stop.is_set():
+            try:
+                limiter.record_usage(10, 12)
+            except Exception as e:
+                errors.append(e)
+                return
+            reports[0] += 1
+
+    async def scenario():
+        for index in range(5000):
+            await limiter.acquire(10)
+            if index % 25 == 0:
+                limiter.quota_status()
+
+    thread = threading.Thread(target=reporter)
+    thread.start()
+    try:
+        asyncio.run(scenario())
+    finally:
+        stop.set()
+        thread.join()
+
+    assert errors == []
+    status = limiter.quota_status()
+    assert status["total_requests"] == 5000
+    # No update lost to the other thread
+    assert status["total_tokens"] == 5000 * 10 + reports[0] * 2
+
+
+def test_sqlite_limiter_shares_one_quota(tmp_path):
+    path = str(tmp_path / "quota.sqlite3")
+    first = SQLiteRateLimiter(path, requests_per_minute=2, tokens_per_minute=None)
+    second = SQLiteRateLimiter(path, requests_per_minute=2, tokens_per_minute=None)
+
+    assert first._take_shared(0) <= 0
+    assert second._take_shared(0) <= 0
+    # Both requests of the minute are used; another process has to wait for a refill
+    wait = first._take_shared(0)
+    assert 20 < wait <= 30
+
+
+def test_sqlite_limiter_charges_actual_usage(tmp_path):
+    limiter = SQLiteRateLimiter(str(tmp_path / "quota.sqlite3"), requests_per_minute=100, tokens_per_minute=1000)
+    started = time.monotonic()
+    asyncio.run(limiter.acquire(100))
+    limiter.record_usage(100, 900)
+
+    # 900 of 1000 tokens are spent, so 500 more need about 24 seconds of refill
+    assert limiter._take_shared(500) > 20
+    assert time.monotonic() - started < 5
+    assert limiter.quota_status()["total_tokens"] == 900
+
+
+def test_quota_backend_follows_the_executor_without_the_job_queue():
+    code = "import sys, services.rate_limiter as r; print(r.QUOTA_BACKEND, 'services.job_queue' in sys.modules)"
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {key: value for key, value in os.environ.items() if key != "GEMINI_QUOTA_BACKEND"}
+    output = subprocess.run([sys.executable, "-c", code], cwd=backend_dir, env=dict(env, TASK_EXECUTOR="queue"),
+                            capture_output=True, text=True, check=True).stdout
+    assert output.split() == ["sqlite", "False"]
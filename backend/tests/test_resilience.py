@@ -0,0 +1,58 @@
+import time
+
+from google.api_core import exceptions as google_exceptions
+
+from services.resilience import CircuitBreaker
+
+THROTTLED = google_exceptions.TooManyRequests("quota exceeded")
+
+
+def test_opens_after_consecutive_throttle_errors():
+    breaker = CircuitBreaker(threshold=2, cooldown=10)
+    breaker.record_failure(THROTTLED)
+    assert breaker.seconds_until_allowed() == 0
+    breaker.record_failure(THROTTLED)
+
+    assert breaker.state == "open"
+    assert 9 < breaker.seconds_until_allowed() <= 10
+
+
+def test_other_errors_and_successes_do_not_open_it():
+    breaker = CircuitBreaker(threshold=2, cooldown=10)
+    breaker.record_failure(ValueError("bad response"))
+    breaker.record_failure(THROTTLED)
+    breaker.record_success()
+    breaker.record_failure(THROTTLED)
+    assert breaker.state == "closed"
+
+
+def test_half_open_lets_one_probe_through():
+    breaker = CircuitBreaker(threshold=1, cooldown=0.05)
+    breaker.record_failure(THROTTLED)
+    time.sleep(0.06)
+
+    assert breaker.seconds_until_allowed() == 0
+    assert breaker.state == "half_open"
+    # Everyone else waits for the probe
+    assert breaker.seconds_until_allowed() > 0
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.seconds_until_allowed() == 0
+
+
+def test_failed_probe_reopens_with_a_longer_cooldown():
+    breaker = CircuitBreaker(threshold=1, cooldown=0.05)
+    breaker.record_failure(THROTTLED)
+    time.sleep(0.06)
+    breaker.seconds_until_allowed()
+    breaker.record_failure(THROTTLED)
+
+    assert breaker.state == "open"
+    assert breaker.cooldown == 0.1
+    assert breaker.opens == 2
+
+    time.sleep(0.11)
+    breaker.seconds_until_allowed()
+    breaker.record_success()
+    assert breaker.cooldown == 0.05
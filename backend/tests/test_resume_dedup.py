@@ -0,0 +1,37 @@
+from services.resume_dedup import ResumeDeduplicator, minhash_signature, similarity
+
+TEXT = (
+    "Jane Doe Senior Software Engineer jane@example.com Experience Acme Corp built data pipelines in "
+    "Python and Spark on AWS, led a team of five engineers and migrated services to Kubernetes. "
+    "Education BSc Computer Science State University. Skills Python Spark AWS Kubernetes SQL Docker"
+)
+
+
+def test_similar_texts_have_similar_signatures():
+    edited = TEXT.replace("team of five", "team of six")
+    unrelated = "Line cook with ten years in busy kitchens, pastry and bread baking, food safety certified"
+
+    assert similarity(minhash_signature(TEXT), minhash_signature(TEXT)) == 1.0
+    assert similarity(minhash_signature(TEXT), minhash_signature(edited)) > 0.7
+    assert similarity(minhash_signature(TEXT), minhash_signature(unrelated)) < 0.2
+
+
+def test_representative_is_the_first_upload_of_a_cluster():
+    dedup = ResumeDeduplicator()
+    assert dedup.representative({"upload_id": 0, "text_content": TEXT}) is None
+    assert dedup.representative({"upload_id": 1, "text_content": "Completely different resume text " * 5}) is None
+    assert dedup.representative({"upload_id": 2, "text_content": TEXT}) == 0
+
+
+def test_uploads_with_the_same_filename_stay_distinct():
+    dedup = ResumeDeduplicator()
+    assert dedup.representative({"upload_id": 0, "filename": "Resume.pdf", "text_content": TEXT}) is None
+    other = "Line cook with ten years in busy kitchens, pastry and bread baking, food safety certified"
+    assert dedup.representative({"upload_id": 1, "filename": "Resume.pdf", "text_content": other}) is None
+    assert dedup.representative({"upload_id": 2, "filename": "Resume.pdf", "text_content": other}) == 1
+
+
+def test_empty_text_is_never_a_duplicate():
+    dedup = ResumeDeduplicator()
+    assert dedup.representative({"upload_id": 0, "text_content": ""}) is None
+    assert dedup.representative({"upload_id": 1, "text_content": "  "}) is None
@@ -0,0 +1,103 @@
+import asyncio
+import random
+
+from benchmarks.synthetic_corpus import make_pdf, resume_lines
+from services.metrics import StageTimer
+from services.resume_parser import ResumeParser
+
+JOB = "Python engineer with AWS and Docker experience"
+
+
+class FailingParser(ResumeParser):
+    """Fails every resume uploaded as bad.pdf"""
+
+    async def parse_extracted_resume_async(self, pdf_data):
+        if pdf_data["filename"] == "bad.pdf":
+            return self._build_error(pdf_data["filename"], "parser failed")
+        return await super().parse_extracted_resume_async(pdf_data)
+
+
+def _resume_pdfs(count):
+    rng = random.Random(1)
+    return [make_pdf(resume_lines(rng, index, 1)[1]) for index in range(count)]
+
+
+def _by_upload(result):
+    return {entry["upload_id"]: entry for entry in result["results"]}
+
+
+def test_nothing_clearing_the_prefilter_still_ranks_every_resume(make_pipeline, fake_client):
+    files = [{"filename": f"{index}.pdf", "content": pdf} for index, pdf in enumerate(_resume_pdfs(3))]
+    for combined in (True, False):
+        result = asyncio.run(make_pipeline(combined=combined).run(JOB, files, prefilter_min_score=100))
+
+        assert result["total_processed"] == result["prefiltered_out"] == 3
+        assert sorted(_by_upload(result)) == [0, 1, 2]
+        assert all(entry["scored_by"] == "prefilter" for entry in result["results"])
+    # Combined mode sends nothing below the cut to Gemini; separate mode only parses
+    assert fake_client.backend.calls == 3
+
+
+def test_timings_are_kept_per_upload(make_pipeline):
+    files = [{"filename": "Resume.pdf", "content": pdf} for pdf in _resume_pdfs(2)]
+    timer = StageTimer()
+    result = asyncio.run(make_pipeline(dedup=False).run(JOB, files, timer=timer))
+
+    assert sorted(timer.items) == [0, 1]
+    for upload_id, entry in _by_upload(result).items():
+        assert entry["timings"] == timer.item_timings(upload_id)
+        assert {"extract_seconds", "parse_seconds", "score_seconds"} <= set(entry["timings"])
+
+
+def test_uploads_sharing_a_filename_are_scored_separately(make_pipeline):
+    first, second = _resume_pdfs(2)
+    files = [
+        {"filename": "Resume.pdf", "content": first},
+        {"filename": "Resume.pdf", "content": second},
+        {"filename": "Resume.pdf", "content": first},
+    ]
+    result = asyncio.run(make_pipeline().run(JOB, files))
+    entries = _by_upload(result)
+
+    assert sorted(entries) == [0, 1, 2]
+    assert entries[0]["candidate_name"] != entries[1]["candidate_name"]
+    assert entries[1].get("duplicate_of") is None
+    # Only the real copy is matched to the first upload
+    assert entries[2]["candidate_name"] == entries[0]["candidate_name"]
+    assert entries[2]["duplicate_of"] == "Resume.pdf"
+    assert result["stage_counts"]["duplicates"] == 1
+
+
+def test_copy_is_parsed_when_its_original_fails(make_pipeline):
+    (content,) = _resume_pdfs(1)
+    files = [
+        {"filename": "bad.pdf", "content": content},
+        {"filename": "copy1.pdf", "content": content},
+        {"filename": "copy2.pdf", "content": content},
+    ]
+    result = asyncio.run(make_pipeline(parser_class=FailingParser).run(JOB, files))
+    entries = _by_upload(result)
+
+    assert 0 not in entries
+    # The first copy takes the failed original's place and the other copy follows it
+    assert entries[1].get("duplicate_of") is None and entries[1]["match_score"] is not None
+    assert entries[2]["duplicate_of"] == "copy1.pdf"
+    assert entries[2]["match_score"] == entries[1]["match_score"]
+    assert result["stage_counts"]["parsing_failed"] == 1
+
+
+def test_combined_mode_and_prefilter_keep_uploads_apart(make_pipeline):
+    first, second = _resume_pdfs(2)
+    files = [
+        {"filename": "Resume.pdf", "content": first},
+        {"filename": "Resume.pdf", "content": second},
+        {"filename": "Resume.pdf", "content": first},
+    ]
+    combined = asyncio.run(make_pipeline(combined=True).run(JOB, files))
+    prefiltered = asyncio.run(make_pipeline().run(JOB, files, prefilter_top_n=1))
+
+    for result in (combined, prefiltered):
+        entries = _by_upload(result)
+        assert sorted(entries) == [0, 1, 2]
+        assert entries[0]["candidate_name"] != entries[1]["candidate_name"]
+        assert entries[2]["candidate_name"] == entries[0]["candidate_name"]
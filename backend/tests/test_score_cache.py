@@ -0,0 +1,35 @@
+import asyncio
+
+from services.cache_store import TieredCache
+from services.jd_profile import JobDescriptionProfiler
+from services.resume_scoring_service import RateLimitedResumeScorer
+
+JOB = "Python engineer with AWS and Docker experience"
+PARSED = {"name": "Jane Doe", "skills": ["python", "aws"]}
+
+
+def _scorer(client, profile_mode):
+    return RateLimitedResumeScorer(
+        client=client, cache=TieredCache("resume_scores"),
+        profiler=JobDescriptionProfiler(client, cache=TieredCache("jd_profiles"), mode=profile_mode)
+    )
+
+
+def test_key_ignores_job_description_whitespace(fake_client):
+    scorer = _scorer(fake_client, "off")
+    first = asyncio.run(scorer._cache_key(JOB, PARSED))
+    assert asyncio.run(scorer._cache_key(f"  {JOB.replace(' ', '  ')}\n", PARSED)) == first
+
+
+def test_key_follows_the_requirements_the_prompt_uses(fake_client):
+    verbatim = asyncio.run(_scorer(fake_client, "off")._cache_key(JOB, PARSED))
+    profiled = asyncio.run(_scorer(fake_client, "always")._cache_key(JOB, PARSED))
+    assert verbatim != profiled
+
+
+def test_scores_are_reused_for_the_same_pair(fake_client):
+    scorer = _scorer(fake_client, "off")
+    first = asyncio.run(scorer.score_single_resume(JOB, PARSED, "a.pdf"))
+    calls = fake_client.backend.calls
+    assert asyncio.run(scorer.score_single_resume(JOB, PARSED, "b.pdf")) == first
+    assert fake_client.backend.calls == calls
@@ -0,0 +1,44 @@
+import pytest
+
+from services.resume_scoring_service import RateLimitedResumeScorer, plan_scoring_batches
+
+
+def _resume(name, skills):
+    return {"filename": f"{name}.pdf", "parsed_data": {"name": name, "skills": skills}}
+
+
+def test_batches_respect_the_size_limit():
+    resumes = [_resume(str(index), ["python"]) for index in range(5)]
+    batches = plan_scoring_batches("Python developer", resumes, max_batch_size=2, token_budget=100_000)
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert [resume for batch in batches for resume in batch] == resumes
+
+
+def test_batches_respect_the_token_budget():
+    resumes = [_resume(str(index), ["skill"] * 200) for index in range(3)]
+    batches = plan_scoring_batches("Python developer", resumes, max_batch_size=10, token_budget=1)
+    # Every resume is over budget on its own, so each still gets a batch of one
+    assert [len(batch) for batch in batches] == [1, 1, 1]
+
+
+def test_group_response_maps_scores_by_candidate():
+    payload = {"results": [
+        {"candidate_id": "c1", "match_score": 80, "overall_fit": "high"},
+        {"candidate_id": "c2", "match_score": 20},
+    ]}
+    scores = RateLimitedResumeScorer._validate_group_response(payload, ["c1", "c2"])
+    assert scores == {"c1": {"match_score": 80, "overall_fit": "high"}, "c2": {"match_score": 20}}
+
+    # A bare list is accepted too
+    assert RateLimitedResumeScorer._validate_group_response(payload["results"], ["c2"])["c2"]["match_score"] == 20
+
+
+@pytest.mark.parametrize("payload", [
+    {"results": [{"candidate_id": "c1", "match_score": 80}]},
+    {"results": [{"candidate_id": "c1", "match_score": 80}, {"candidate_id": "c2", "match_score": "high"}]},
+    {"results": [{"candidate_id": "c1", "match_score": 80}, {"candidate_id": "c3", "match_score": 10}]},
+    {"scores": []},
+])
+def test_group_response_rejects_missing_or_malformed_scores(payload):
+    with pytest.raises(ValueError):
+        RateLimitedResumeScorer._validate_group_response(payload, ["c1", "c2"])
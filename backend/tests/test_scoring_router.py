@@ -0,0 +1,135 @@
+import asyncio
+
+import httpx
+import pytest
+
+from benchmarks.synthetic_corpus import build_corpus
+from routers import resume_scoring_router
+from services import candidate_index
+from services.resume_pipeline import planned_gemini_requests
+from services.resume_scoring_service import get_score_cache
+
+
+def test_results_of_a_finished_batch(api, submit):
+    task_id = submit(3)
+    results = api.get(f"/api/scoring/results/{task_id}").json()
+    assert results["status"] == "completed"
+    assert len(results["candidates"]) == 3
+
+
+def test_clearing_the_score_cache_rescores(api, submit, fake_client):
+    submit(3, seed=11)
+    calls = fake_client.backend.calls
+    # Identical resumes and job description: parses and scores all come from the caches
+    submit(3, seed=11)
+    assert fake_client.backend.calls == calls
+
+    assert api.delete("/api/scoring/cache/scores").json() == {"status": "cleared"}
+    assert len(get_score_cache().memory) == 0
+    submit(3, seed=11)
+    assert fake_client.backend.calls == calls + 3
+
+
+def test_estimate_counts_planned_gemini_requests(api, fake_client):
+    files = [("files", (name, content, "application/pdf")) for name, content in build_corpus(4, 1, seed=21)]
+    response = api.post("/api/scoring/process-batch", files=files,
+                        data={"job_description": "Go developer with Kafka", "prefilter_top_n": "2"}).json()
+    # Four parses and two scoring requests for the escalated resumes
+    assert response["planned_gemini_requests"] == 6
+    assert fake_client.backend.calls == 6
+    status = api.get(f"/api/scoring/status/{response['task_id']}").json()
+    assert status["estimated_time"] == response["estimated_completion_time"]
+
+
+def test_planned_requests_per_scoring_mode():
+    job_description = "Python engineer"
+    assert planned_gemini_requests(job_description, 10, combined=True) == 10
+    assert planned_gemini_requests(job_description, 10, prefilter_top_n=3, combined=True) == 3
+    assert planned_gemini_requests(job_description, 10, combined=False, batch_size=4) == 13
+    assert planned_gemini_requests(job_description, 0, combined=False) == 0
+
+
+@pytest.mark.parametrize("form", [{"prefilter_top_n": "0"}, {"prefilter_top_n": "-2"},
+                                  {"prefilter_min_score": "-1"}, {"prefilter_min_score": "101"}])
+def test_out_of_range_prefilter_limits_are_rejected(api, form):
+    files = [("files", (name, content, "application/pdf")) for name, content in build_corpus(1, 1)]
+    response = api.post("/api/scoring/process-batch", files=files,
+                        data={"job_description": "Python engineer", **form})
+    assert response.status_code == 422
+
+
+def test_event_stream_opened_before_the_first_event(api, monkeypatch):
+    async def not_started_yet(task_id, **job):
+        pass
+
+    # The batch is accepted but its background task has not published anything
+    monkeypatch.setattr(resume_scoring_router, "process_in_background", not_started_yet)
+    files = [("files", (name, content, "application/pdf")) for name, content in build_corpus(1, 1)]
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post("/api/scoring/process-batch", files=files,
+                                         data={"job_description": "Python engineer"})
+            task_id = response.json()["task_id"]
+            stream = asyncio.ensure_future(client.get(f"/api/scoring/events/{task_id}"))
+            await asyncio.sleep(0.05)
+            resume_scoring_router.task_events.publish(task_id, "completed", {"processed": 1})
+            resume_scoring_router.task_events.close(task_id)
+            return (await asyncio.wait_for(stream, timeout=5)).text
+
+    body = asyncio.run(scenario())
+    assert "id: 1\nevent: completed" in body
+
+
+def test_candidates_are_paged_and_filtered(api, submit):
+    task_id = submit(6, seed=5)
+    url = f"/api/scoring/results/{task_id}/candidates"
+    everyone = api.get(url, params={"limit": 50, "include_details": True}).json()["candidates"]
+    assert [entry["rank"] for entry in everyone] == [1, 2, 3, 4, 5, 6]
+    assert "detailed_scores" in everyone[0]
+
+    page = api.get(url, params={"offset": 2, "limit": 2}).json()
+    assert page["total_matched"] == 6 and page["partial"] is False
+    assert [(entry["rank"], entry["filename"]) for entry in page["candidates"]] == [
+        (entry["rank"], entry["filename"]) for entry in everyone[2:4]
+    ]
+    assert "detailed_scores" not in page["candidates"][0]
+
+    min_score = everyone[2]["match_score"]
+    filtered = api.get(url, params={"min_score": min_score}).json()["candidates"]
+    assert [entry["rank"] for entry in filtered] == [
+        entry["rank"] for entry in everyone if entry["match_score"] >= min_score
+    ]
+
+    fit = everyone[0]["detailed_scores"]["overall_fit"]
+    filtered = api.get(url, params={"overall_fit": f" {fit.upper()} ,unknown"}).json()["candidates"]
+    assert filtered and all(entry["overall_fit"] == fit for entry in filtered)
+
+    skill = everyone[0]["detailed_scores"]["skillset_for_role"][0]
+    filtered = api.get(url, params={"skill": skill[:3].upper()}).json()["candidates"]
+    assert filtered and all(any(skill[:3] in item for item in entry["skillset_for_role"]) for entry in filtered)
+
+    assert api.get("/api/scoring/results/missing/candidates").status_code == 404
+
+
+def test_stored_candidates_are_ranked_and_escalated(api, submit, monkeypatch, tmp_path, fake_client):
+    assert api.post("/api/scoring/candidates/rank", json={"job_description": "Python"}).status_code == 404
+
+    monkeypatch.setattr(resume_scoring_router, "CANDIDATE_INDEX_ENABLED", True)
+    monkeypatch.setattr(candidate_index, "_candidate_index", candidate_index.CandidateIndex(str(tmp_path / "index.db")))
+    submit(5, seed=31)
+
+    calls = fake_client.backend.calls
+    # A new job description, so the batch's cached scores do not apply
+    body = {"job_description": "Python developer with Kubernetes and SQL", "top_n": 4, "escalate_top": 2}
+    ranked = api.post("/api/scoring/candidates/rank", json=body).json()
+    assert ranked["total_candidates"] == 4 and ranked["escalated"] == 2
+    assert [entry["rank"] for entry in ranked["candidates"]] == [1, 2, 3, 4]
+    assert [entry["scored_by"] for entry in ranked["candidates"]] == ["gemini", "gemini", "index", "index"]
+    assert all("parsed_data" not in entry for entry in ranked["candidates"])
+    # One scoring request per escalated candidate
+    assert fake_client.backend.calls == calls + 2
+
+    blank = api.post("/api/scoring/candidates/rank", json={"job_description": "  "})
+    assert blank.status_code == 400
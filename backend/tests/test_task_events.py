@@ -0,0 +1,74 @@
+import asyncio
+
+from services.task_events import SQLiteTaskEventBroker, TaskEventBroker
+
+
+async def _drain(events):
+    return [event async for event in events]
+
+
+def _collect(broker, task_id, last_event_id=0):
+    return asyncio.run(_drain(broker.subscribe(task_id, last_event_id, heartbeat=60)))
+
+
+def test_memory_broker_replays_after_last_event_id():
+    broker = TaskEventBroker()
+
+    async def scenario():
+        broker.publish("t1", "started", {"total_files": 2})
+        broker.publish("t1", "scored", {"processed": 1})
+        broker.publish("t1", "completed", {})
+        broker.close("t1")
+        return await _drain(broker.subscribe("t1", 1))
+
+    assert asyncio.run(scenario()) == [(2, "scored", {"processed": 1}), (3, "completed", {})]
+
+
+def test_memory_broker_subscriber_waits_for_an_opened_task():
+    broker = TaskEventBroker()
+
+    async def scenario():
+        broker.open("t1")
+        subscriber = asyncio.ensure_future(asyncio.wait_for(_drain(broker.subscribe("t1", heartbeat=60)), timeout=5))
+        await asyncio.sleep(0.01)
+        broker.publish("t1", "started", {})
+        broker.close("t1")
+        return await subscriber
+
+    assert asyncio.run(scenario()) == [(1, "started", {})]
+
+
+def test_sqlite_broker_relays_events_between_processes(tmp_path):
+    path = str(tmp_path / "events.sqlite3")
+    worker, api = SQLiteTaskEventBroker(path), SQLiteTaskEventBroker(path, poll_interval=0.01)
+
+    worker.publish("t1", "started", {"total_files": 2})
+    worker.publish("t2", "started", {"total_files": 1})
+    worker.publish("t1", "completed", {"processed": 2})
+    worker.close("t1")
+    assert worker.flush()
+
+    assert api.has_task("t1")
+    events = _collect(api, "t1")
+    assert [(event, data) for _, event, data in events] == [
+        ("started", {"total_files": 2}), ("completed", {"processed": 2})
+    ]
+    assert events[0][0] < events[1][0]
+    # Reconnecting with the id of the first event replays only the rest
+    assert _collect(api, "t1", events[0][0]) == events[1:]
+
+
+def test_sqlite_broker_waits_for_a_queued_task(tmp_path):
+    path = str(tmp_path / "events.sqlite3")
+    worker, api = SQLiteTaskEventBroker(path), SQLiteTaskEventBroker(path, poll_interval=0.01)
+
+    async def scenario():
+        subscriber = asyncio.ensure_future(
+            asyncio.wait_for(_drain(api.subscribe("t1", heartbeat=60)), timeout=5)
+        )
+        await asyncio.sleep(0.05)
+        worker.publish("t1", "started", {})
+        worker.close("t1")
+        return await subscriber
+
+    assert [event for _, event, _ in asyncio.run(scenario())] == ["started"]
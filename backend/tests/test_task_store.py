@@ -0,0 +1,62 @@
+import asyncio
+
+from services.task_store import InMemoryTaskStore, SQLiteTaskStore, TaskProgressWriter
+
+
+class RecordingStore(InMemoryTaskStore):
+    def __init__(self):
+        super().__init__()
+        self.writes = []
+
+    def update(self, task_id, **fields):
+        self.writes.append(fields)
+        super().update(task_id, **fields)
+
+
+def test_sqlite_store_keeps_results_apart_from_metadata(tmp_path):
+    store = SQLiteTaskStore(str(tmp_path / "tasks.sqlite3"))
+    store.create("t1", {"status": "queued", "results": None})
+    store.update("t1", status="completed", results={"results": [1, 2]})
+    store.update("t1", processed=2)
+
+    assert store.get("t1") == {"status": "completed", "processed": 2, "results": {"results": [1, 2]}}
+    assert store.get("t1", include_results=False) == {"status": "completed", "processed": 2}
+    assert "t1" in SQLiteTaskStore(str(tmp_path / "tasks.sqlite3"))
+
+
+def test_progress_updates_are_coalesced():
+    store = RecordingStore()
+    store.create("t1", {"status": "processing"})
+    built = []
+
+    def ranked():
+        built.append(True)
+        return {"results": ["top"]}
+
+    async def scenario():
+        writer = TaskProgressWriter(store, "t1", interval=0.05)
+        for processed in range(1, 201):
+            writer.update(processed=processed, results=ranked)
+        await asyncio.sleep(0.1)
+        await writer.flush(status="completed")
+
+    asyncio.run(scenario())
+
+    assert store.writes == [{"processed": 200, "results": {"results": ["top"]}}, {"status": "completed"}]
+    # The callable is evaluated once per write, not once per update
+    assert len(built) == 1
+    assert store.get("t1")["status"] == "completed"
+
+
+def test_flush_includes_pending_updates():
+    store = RecordingStore()
+    store.create("t1", {"status": "processing"})
+
+    async def scenario():
+        writer = TaskProgressWriter(store, "t1", interval=60)
+        await writer.flush(parsed=1)
+        writer.update(parsed=2)
+        await writer.flush(status="failed")
+
+    asyncio.run(scenario())
+    assert store.writes == [{"parsed": 1}, {"parsed": 2, "status": "failed"}]
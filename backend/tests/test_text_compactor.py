@@ -0,0 +1,31 @@
+from services.text_compactor import PAGE_SEPARATOR, TRUNCATION_MARKER, compact_resume_text
+
+
+def _page(number, body):
+    return "\n".join(["Jane Doe  -  Resume", *body, f"Page {number} of 3"])
+
+
+def test_headers_page_numbers_and_repeats_are_removed():
+    text = PAGE_SEPARATOR.join([
+        _page(1, ["Experience", "Acme   Corp", "Acme Corp"]),
+        _page(2, ["Education", "State University"]),
+        _page(3, ["Skills", "Python"]),
+    ])
+    compacted, stats = compact_resume_text(text, max_tokens=1000)
+
+    lines = compacted.splitlines()
+    # The repeated header is kept once, since it is often the candidate's name
+    assert lines.count("Jane Doe - Resume") == 1
+    assert not any(line.startswith("Page ") for line in lines)
+    assert lines.count("Acme Corp") == 1
+    assert stats["token_count"] < stats["original_tokens"]
+    assert not stats["truncated"]
+
+
+def test_long_text_is_truncated_to_the_budget():
+    text = "\n".join(f"Line {index} of a long resume with many words" for index in range(500))
+    compacted, stats = compact_resume_text(text, max_tokens=100)
+
+    assert stats["truncated"]
+    assert compacted.endswith(TRUNCATION_MARKER)
+    assert stats["token_count"] <= 100
@@ -0,0 +1,32 @@
+from services.resume_scoring_service import RunningTopK
+
+
+def _row(name, score, **fields):
+    return {"filename": f"{name}.pdf", "candidate_name": name, "match_score": score, **fields}
+
+
+def test_running_top_k_keeps_the_best_rows_in_order():
+    top = RunningTopK(k=3)
+    for name, score in (("a", 40), ("b", 90), ("c", 70), ("d", 10), ("e", 80)):
+        top.push(_row(name, score))
+
+    assert [row["candidate_name"] for row in top.ranked()] == ["b", "e", "c"]
+    assert top.total == 5
+    assert top.rank(top.ranked()[1]) == 2
+
+
+def test_running_top_k_reports_whether_a_row_made_it():
+    top = RunningTopK(k=1)
+    assert top.push(_row("a", 50))
+    assert not top.push(_row("b", 40))
+    assert top.push(_row("c", 60))
+
+
+def test_running_top_k_orders_ties_copies_and_failures():
+    top = RunningTopK(k=10)
+    top.push(_row("failed", None))
+    top.push(_row("copy", 70, duplicate_of="first.pdf"))
+    top.push(_row("first", 70))
+    top.push(_row("second", 70))
+
+    assert [row["candidate_name"] for row in top.ranked()] == ["first", "second", "copy", "failed"]
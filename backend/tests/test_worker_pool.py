@@ -0,0 +1,47 @@
+import asyncio
+import time
+
+import pytest
+
+from services.worker_pool import WorkerPool
+
+
+def test_timed_out_thread_keeps_its_slot_until_it_finishes():
+    pool = WorkerPool("thread", max_workers=1, name="test-thread")
+
+    async def scenario():
+        started = time.monotonic()
+        async with pool.slot() as slot:
+            with pytest.raises(asyncio.TimeoutError):
+                await slot.run(time.sleep, 0.3, timeout=0.05)
+        async with pool.slot() as slot:
+            await slot.run(time.sleep, 0, timeout=1)
+        return time.monotonic() - started
+
+    # The second job could only start once the stuck thread was done
+    assert asyncio.run(scenario()) >= 0.3
+
+
+def test_timed_out_process_is_killed_and_others_rerun():
+    pool = WorkerPool("process", max_workers=2, name="test-process")
+
+    async def stuck():
+        async with pool.slot() as slot:
+            await slot.run(time.sleep, 30, timeout=0.5)
+
+    async def innocent():
+        await asyncio.sleep(0.1)
+        async with pool.slot() as slot:
+            return await slot.run(pow, 2, 10, timeout=10)
+
+    async def scenario():
+        started = time.monotonic()
+        results = await asyncio.gather(stuck(), innocent(), return_exceptions=True)
+        return results, time.monotonic() - started
+
+    (stuck_result, innocent_result), elapsed = asyncio.run(scenario())
+    assert isinstance(stuck_result, asyncio.TimeoutError)
+    assert innocent_result == 1024
+    assert pool.recycled == 1
+    assert elapsed < 10
+    pool.executor.shutdown()
@@ -0,0 +1,30 @@
+from dotenv import load_dotenv
+load_dotenv()  # <-- must run before using os.getenv()
+
+import asyncio
+import logging
+import signal
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - worker %(process)d - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+from routers.resume_scoring_router import process_in_background
+from services.job_worker import JobWorker
+
+
+async def main():
+    worker = JobWorker(process_in_background)
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, worker.stop)
+
+    await worker.run()
+
+
+# Run one or more next to the API with `TASK_EXECUTOR=queue python -m worker` from backend/
+# (a single-process API can supervise them itself with JOB_WORKERS > 0)
+if __name__ == "__main__":
+    asyncio.run(main())